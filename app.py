@@ -1,142 +1,331 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-import pandas as pd
-import ast
-from utils import min_max_scale_scores, calculate_chemistry_metric, create_player_tuples, get_chemistry_links, get_hate_links
-from openpyxl import Workbook
-import uuid
+from flask import Flask, render_template, request, redirect, url_for, session, flash, get_template_attribute, jsonify, Response, send_file, send_from_directory, request_started, request_finished, before_render_template, template_rendered, g
+from flask.sessions import SecureCookieSessionInterface
+from assets import load_manifest
+from speculation import Speculator
+from collections import OrderedDict
+from exports import ExportError, ExportJobs, STREAM_FORMATS, FILE_FORMATS, iter_csv, iter_json
+from draft_store import create_store
+from characters import encode_bits
+from draft_registry import DraftRegistry, PickError, StaleDraft, must_pick_captain
+from draft_feed import DraftFeed, board_state
+from draft_engine import upcoming_teams
+from metrics import metrics, span, server_timing, RequestProfiler
+from warmup import Warmup
+import os
+import threading
+import hashlib
+import json
+import time
+
+# numpy and the modules built on it (data_cache, scoring, chem_index, utils, fielding, roster_search)
+# are imported where they are used, after the character data has loaded (see load_character_data),
+# so the app starts serving without waiting for them
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 app.secret_key = 'your_secret_key'  # Required for session management
 
-# Load data
-chem_data = pd.read_excel('data/sortedmasterchem.xlsx')
-player_stats = pd.read_excel('data/Player Statistics.xlsx')
-season_data = pd.read_excel('data/Season Data.xlsx')
-
-# Convert Chemistry and Hate to python list instead of string
-chem_data['Chemistry'] = chem_data['Chemistry'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
-chem_data['Hate'] = chem_data['Hate'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
-
-# Hardcoded team names and initial picks
-teams = {
-    "Carby": [],
-    "BenT": [],
-    "Kircher": [],
-    "Julian": [],
-    "Jmo": [],
-    "HarryKirch": [],
-    "BenR": [],
-    "Jmo": []
-}
+# Requests sent with an X-Profile header are profiled when this is on (PROFILE_REQUESTS=1)
+app.config['PROFILE_REQUESTS'] = os.environ.get('PROFILE_REQUESTS') == '1'
+request_profiler = RequestProfiler(os.path.join(app.instance_path, 'profiles'))
+
+class TimedSessionInterface(SecureCookieSessionInterface):
+    # The cookie session, with its (de)serialization timed as stages of the request. Opening
+    # the session is the first thing Flask does for a request, so its timing starts here
+
+    def open_session(self, app, request):
+        metrics.start_request()
+        with span('session_load'):
+            return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with span('session_save'):
+            super().save_session(app, session, response)
+
+app.session_interface = TimedSessionInterface()
+
+def start_request_profile(sender, **extra):
+    if app.config['PROFILE_REQUESTS'] and request.headers.get('X-Profile'):
+        request.environ['draft.profile'] = request_profiler.start()
+
+def finish_request_timing(sender, response, **extra):
+    # Every response carries the time of its stages in Server-Timing, shown by browser dev tools
+    profile = request.environ.pop('draft.profile', None)
+    if profile is not None:
+        response.headers['X-Profile-Dump'] = request_profiler.stop(profile, request.endpoint or 'unmatched')
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    spans = metrics.end_request(route, request.method, response.status_code)
+    if spans:
+        response.headers['Server-Timing'] = server_timing(spans)
+
+def start_template_timing(sender, template, context, **extra):
+    g.setdefault('template_starts', []).append(time.perf_counter())
+
+def finish_template_timing(sender, template, context, **extra):
+    metrics.record('render_template', time.perf_counter() - g.template_starts.pop())
+
+request_started.connect(start_request_profile, app)
+request_finished.connect(finish_request_timing, app)
+before_render_template.connect(start_template_timing, app)
+template_rendered.connect(finish_template_timing, app)
+
+@app.teardown_request
+def discard_request_timing(error=None):
+    # A request that raised never reached request_finished
+    profile = request.environ.pop('draft.profile', None)
+    if profile is not None:
+        profile.disable()
+    metrics.discard_request()
+
+# Where draft state lives: 'sqlite' (shared by every worker on the machine) or 'memory' (single process)
+app.config['DRAFT_STORE'] = os.environ.get('DRAFT_STORE', 'sqlite')
+app.config['DRAFT_DB'] = os.environ.get('DRAFT_DB', os.path.join(app.instance_path, 'drafts.sqlite3'))
+
+def load_character_data():
+    """
+    Loads the character data and builds everything made from it, the module globals below: the
+    tables, the character registry, the draft store and registry, the fielding solver and the
+    roster search. Runs on the
+    warm-up thread started at the end of this module, and every route except the ones in
+    WITHOUT_CHARACTER_DATA waits for it first.
+    """
+    global tables, characters, chem_index, score_table, player_pool, draft_store, draft_registry, draft_feed
+    global fielding_solver, roster_search
+    from data_cache import load_tables
+    from fielding import FieldingSolver
+    from roster_search import RosterSearch
+
+    # Character data, compiled to memory-mapped arrays shared by every worker on the machine
+    # (rebuilt automatically when a spreadsheet changes)
+    tables = load_tables()
+    # Every character's integer ID, shared by the chemistry index and the draft store. A draft's
+    # remaining players and captains are ID bitsets, named only for pages and the JSON API
+    characters = tables.registry()
+    chem_index = tables.chem_index()
+    score_table = tables.score_table()
+    player_pool = tables.pool
+
+    # Server-side draft state, the session cookie only holds the draft_id
+    draft_store = create_store(characters, backend=app.config['DRAFT_STORE'], path=app.config['DRAFT_DB'])
+    # Every draft being run, each an independent league with its own teams
+    draft_registry = DraftRegistry(draft_store)
+    # Live pick events for spectators (the /live/<draft_id> board)
+    draft_feed = DraftFeed(draft_store.load, characters)
+
+    fielding_solver = FieldingSolver.from_tables(tables)
+    roster_search = RosterSearch.from_tables(tables)
+
+character_data = Warmup(load_character_data)
+
+# Endpoints served while the character data is loading (None: no route matched)
+WITHOUT_CHARACTER_DATA = {'index', 'static', 'readiness', 'metrics_endpoint', 'request_profile', None}
+# Seconds a request waits for the character data before it gets a 503
+CHARACTER_DATA_TIMEOUT = 30
+
+@app.before_request
+def wait_for_character_data():
+    if request.endpoint in WITHOUT_CHARACTER_DATA or character_data.ready:
+        return None
+    with span('wait_for_character_data'):
+        loaded = character_data.wait(CHARACTER_DATA_TIMEOUT)
+    if not loaded:
+        return jsonify(error="The app is starting, try again shortly"), 503, {'Retry-After': '1'}
+    return None
+
+# Team names of a new draft
+TEAM_NAMES = ["Carby", "BenT", "Kircher", "Julian", "Jmo", "HarryKirch", "BenR", "Tom"]
 
 # List of captains
 captains = ["Mario", "Luigi", "Peach", "Daisy", "Yoshi", "Birdo", "Wario", "Waluigi", "Donkey Kong", "Diddy Kong", "Bowser", "Bowser Jr"]
 
-# Initialize a dictionary to track if each team has a captain
-teams_with_captain = {team: False for team in teams}
-
-# Initialize draft order
-draft_order = list(teams.keys())
-remaining_players = list(player_stats['Character'])
-remaining_captains = [player for player in remaining_players if player in captains]
-
-# Function to reset the draft
-def reset_draft():
-    global teams, teams_with_captain, draft_order, remaining_players, remaining_captains
-    teams = {team: [] for team in teams}  # Reset all teams' rosters
-    teams_with_captain = {team: False for team in teams}  # Reset captain status
-    draft_order = list(teams.keys())  # Reset draft order
-    remaining_players = list(player_stats['Character'])  # Reset remaining players
-    remaining_captains = [player for player in remaining_players if player in captains]  # Reset remaining captains
-
-# Function to calculate player scores
-def calculate_scores(players, team_players, chem_data, player_stats, season_data):
-    # If there are no remaining players, return an empty list
-    if not players:
-        return []
-
-    scores = {}
-    for player in players:
-        chem_score = calculate_chemistry_metric(team_players, player, players, chem_data)
-        stats = player_stats.loc[player_stats['Character'] == player]
-        season_stats = season_data.loc[season_data['First Name'] == player]
-        
-        # Use 25% of average stats if player is missing in season_data
-        if season_stats.empty:
-            slugging = season_data['Slugging Percentage'].mean() * 0.25
-            home_runs = season_data['Home Runs'].mean() * 0.25
-        else:
-            slugging = season_stats['Slugging Percentage'].mean()
-            home_runs = season_stats['Home Runs'].sum()
-        
-        if stats.empty:
-            charge_hit_power = player_stats['Charge Hit Power'].mean() * 0.25
-            slap_hit_power = player_stats['Slap Hit Power'].mean() * 0.25
-            speed = player_stats['Speed'].mean() * 0.25
-            pitching_stamina = player_stats['Pitching Stamina'].mean() * 0.25
-        else:
-            charge_hit_power = stats['Charge Hit Power'].values[0]
-            slap_hit_power = stats['Slap Hit Power'].values[0]
-            speed = stats['Speed'].values[0]
-            pitching_stamina = stats['Pitching Stamina'].values[0]
-        
-        scores[player] = {
-            'chem_score': chem_score,
-            'slugging': slugging,
-            'charge_hit_power': charge_hit_power,
-            'slap_hit_power': slap_hit_power,
-            'speed': speed,
-            'home_runs': home_runs,
-            'pitching_stamina': pitching_stamina,
-        }
-    
-    scores = min_max_scale_scores(scores)
-    final_scores = create_player_tuples(scores)
-    return final_scores
-
-# Updated Function to recommend outfielders
-def recommend_outfielders(team_players, remaining_players, chem_data, player_stats, cf_player=None):
+# Content-hashed thumbnails and sprite sheet built from static/images (python assets.py). None
+# until built_assets has loaded it, pages rendered before then use the original images
+asset_manifest = None
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+def load_assets():
+    # Reads the asset manifest, building the assets first if they are missing or out of date
+    global asset_manifest
+    asset_manifest = load_manifest(app.static_folder)
+
+built_assets = Warmup(load_assets)
+
+@app.template_global()
+def asset_url(filename):
+    # URL of a static file, or of its content-hashed build when there is one
+    if asset_manifest is not None:
+        filename = asset_manifest['files'].get(filename, filename)
+    return url_for('static', filename=filename)
+
+@app.template_global()
+def sprite_class(player):
+    # CSS classes drawing the player from the sprite sheet, or None to use an <img>
+    if asset_manifest is None or not asset_manifest['sprite']:
+        return None
+    cell = asset_manifest['sprite']['cells'].get(player)
+    return None if cell is None else f"sprite sprite-{cell}"
+
+@app.template_global()
+def sprite_stylesheet():
+    # URL of the sprite sheet's stylesheet, or None when there is no sprite sheet
+    if asset_manifest is None or not asset_manifest['sprite']:
+        return None
+    return asset_url('sprite.css')
+
+@app.after_request
+def cache_built_assets(response):
+    # Built files are named by their content, so browsers can keep them until the name changes
+    if request.endpoint == 'static' and (request.view_args or {}).get('filename', '').startswith('build/'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+def new_draft_state(team_names=TEAM_NAMES):
+    teams = {team: [] for team in team_names}
+    return {
+        'teams': teams,
+        'teams_with_captain': {team: False for team in teams},
+        'draft_order': list(teams.keys()),
+        'remaining_players': characters.pool_mask,
+        'remaining_captains': characters.mask(player for player in player_pool if player in captains),
+        'cf_players': {},
+        'picks': [],
+        'on_clock': next(iter(teams)),
+    }
+
+# Draft result files, built in the background once per draft version
+export_jobs = ExportJobs(os.path.join(app.instance_path, 'exports'))
+
+# Incremental scoring state of the drafts this worker has rendered, least recently used first
+draft_scores = OrderedDict()
+draft_scores_lock = threading.Lock()
+MAX_CACHED_DRAFT_SCORES = 64
+
+def get_draft_scores(draft_id, state):
+    # Applies the picks made since this draft was last scored and takes back undone ones, or rebuilds
+    # if the state diverged.
+    # The DraftScores is updated in place, so callers hold draft_registry.lock(draft_id) while using it
+    with draft_scores_lock:
+        scores = draft_scores.pop(draft_id, None)
+    if scores is None or not scores.sync(state['teams']) or scores.remaining_count != state['remaining_players'].bit_count():
+        from scoring import DraftScores
+        scores = DraftScores(score_table, player_pool, state['teams'])
+    with draft_scores_lock:
+        draft_scores[draft_id] = scores
+        while len(draft_scores) > MAX_CACHED_DRAFT_SCORES:
+            draft_scores.popitem(last=False)
+    return scores
+
+# Rankings for the teams picking next, computed in the background while the current team decides
+speculator = Speculator(lambda roster, pool: sort_available_players(pool, roster, chem_index))
+
+# Rendered draft page cards, least recently used first. A card only depends on the player and the
+# roster members it links to, so one entry serves every roster with the same links (usually none)
+card_cache = OrderedDict()
+card_cache_lock = threading.Lock()
+MAX_CACHED_CARDS = 4096
+
+def render_cards(macro, players, roster):
+    # HTML for each player's card (a macro from _cards.html) annotated against roster
+    from utils import chemistry_annotations
+    with span('chemistry_links'):
+        annotations = chemistry_annotations(players, roster, chem_index)
+    cards = []
+    with span('render_cards'):
+        for player, chemistry_links, hate_links in annotations:
+            key = (macro, player, tuple(chemistry_links), tuple(hate_links))
+            with card_cache_lock:
+                card = card_cache.get(key)
+                if card is not None:
+                    card_cache.move_to_end(key)
+            if card is None:
+                card = get_template_attribute('_cards.html', macro)(player, chemistry_links, hate_links)
+                with card_cache_lock:
+                    card_cache[key] = card
+                    while len(card_cache) > MAX_CACHED_CARDS:
+                        card_cache.popitem(last=False)
+            cards.append(card)
+    return cards
+
+# Best fielding alignment of each roster the draft page has shown, least recently used first.
+# A roster only changes with a pick, so most page loads are a lookup
+alignment_cache = OrderedDict()
+alignment_cache_lock = threading.Lock()
+MAX_CACHED_ALIGNMENTS = 1024
+
+def best_alignment(roster, cf_player=None):
+    # The solver's alignment of roster, with the designated CF (if any) pinned to center field
+    key = (tuple(roster), cf_player)
+    with alignment_cache_lock:
+        alignment = alignment_cache.get(key)
+        if alignment is not None:
+            alignment_cache.move_to_end(key)
+            return alignment
+    with span('best_alignment'):
+        alignment = fielding_solver.solve(roster, fixed={'CF': cf_player} if cf_player else None)
+    with alignment_cache_lock:
+        alignment_cache[key] = alignment
+        while len(alignment_cache) > MAX_CACHED_ALIGNMENTS:
+            alignment_cache.popitem(last=False)
+    return alignment
+
+# Best achievable nine of each (roster, pool) the draft page has shown, least recently used first
+best_roster_cache = OrderedDict()
+best_roster_cache_lock = threading.Lock()
+MAX_CACHED_BEST_ROSTERS = 1024
+# Seconds one search may take: searches over the real pool finish well within it, much larger
+# pools get the best rosters found by then instead of stalling the page
+SEARCH_TIME_LIMIT = 0.5
+
+def best_rosters(roster, remaining, k=1, min_outfield_speed=None):
     """
-    Recommends outfielders (LF and RF) based on speed and chemistry with the designated CF.
-    - If a CF is designated, players with chemistry and speed >= 50 are shown first, followed by the fastest players.
-    - If no CF is designated, only the top 10 fastest players are shown.
+    The k best nines the team can still field: its picks plus remaining players (a bitset) with
+    exactly one captain, or once it has ROSTER_SIZE players, any nine of its players and the
+    remaining ones.
     """
-    # Get all players sorted by speed (highest first)
-    all_players_sorted = sorted(
-        remaining_players,
-        key=lambda x: player_stats.loc[player_stats['Character'] == x, 'Speed'].values[0],
-        reverse=True
-    )
-
-    # If a CF is designated, prioritize players with chemistry and speed >= 50
-    if cf_player:
-        # Get players with chemistry to the CF and speed >= 50
-        players_with_chem = []
-        for player in all_players_sorted:
-            speed = player_stats.loc[player_stats['Character'] == player, 'Speed'].values[0]
-            if speed >= 50:  # Only consider players with speed >= 50
-                chemistry_links = get_chemistry_links(player, [cf_player], chem_data)
-                if chemistry_links:
-                    players_with_chem.append((player, speed, f"(Chemistry with {cf_player})"))
-
-        # Get the remaining players (without chemistry or speed < 50) sorted by speed
-        players_without_chem = [
-            (player, player_stats.loc[player_stats['Character'] == player, 'Speed'].values[0], "")
-            for player in all_players_sorted
-            if player not in [p[0] for p in players_with_chem]  # Exclude players already in the chemistry list
-        ]
-
-        # Combine the two lists: chemistry players first, then the rest
-        recommendations = players_with_chem + players_without_chem
-    else:
-        # If no CF is designated, just return the top 10 players with their speed
-        recommendations = [
-            (player, player_stats.loc[player_stats['Character'] == player, 'Speed'].values[0], "")
-            for player in all_players_sorted[:10]
-        ]
-
-    # Return the top 10 players
-    return recommendations[:10]
+    key = (tuple(roster), remaining, k, min_outfield_speed)
+    with best_roster_cache_lock:
+        rosters = best_roster_cache.get(key)
+        if rosters is not None:
+            best_roster_cache.move_to_end(key)
+            return rosters
+    from roster_search import ROSTER_SIZE
+    exclude = characters.members(characters.pool_mask & ~remaining & ~characters.mask(roster))
+    with span('best_rosters'):
+        if len(roster) < ROSTER_SIZE:
+            rosters = roster_search.top_rosters(k, roster, exclude, captains, min_outfield_speed, time_limit=SEARCH_TIME_LIMIT)
+        else:
+            rosters = roster_search.top_rosters(k, [], exclude, captains, min_outfield_speed, time_limit=SEARCH_TIME_LIMIT)
+    with best_roster_cache_lock:
+        best_roster_cache[key] = rosters
+        while len(best_roster_cache) > MAX_CACHED_BEST_ROSTERS:
+            best_roster_cache.popitem(last=False)
+    return rosters
+
+def load_draft_state():
+    # Returns the state of this session's draft, or None if there is no active draft
+    if 'draft_id' not in session:
+        return None
+    with span('load_draft_state'):
+        return draft_store.load(session['draft_id'])
+
+def start_session_draft():
+    # Starts a new draft for this session, only the draft_id goes in the cookie
+    state = new_draft_state()
+    session['draft_id'] = draft_registry.create(state)
+    return state
+
+def end_draft():
+    # Deletes this session's draft and everything cached for it
+    draft_id = session.pop('draft_id', None)
+    if draft_id is not None:
+        draft_registry.delete(draft_id)
+        with draft_scores_lock:
+            draft_scores.pop(draft_id, None)
+        speculator.discard(draft_id)
+        export_jobs.discard(draft_id)
+        draft_feed.publish(draft_id, None)
 
 def sort_available_players(remaining_players, current_team, chem_data):
     """
@@ -146,24 +335,24 @@ def sort_available_players(remaining_players, current_team, chem_data):
     3. Hated Chemistry
     4. No Chemistry
     """
+    with span('sort_available_players'):
+        return _sort_available_players(remaining_players, current_team, chem_data)
+
+def _sort_available_players(remaining_players, current_team, chem_data):
     good_chem_players = []
     neutral_chem_players = []
     hated_chem_players = []
     no_chem_players = []
 
-    for player in remaining_players:
-        # Get the player's chemistry and hate data
-        player_chem_data = chem_data.loc[chem_data['Character Name'] == player]
-        if not player_chem_data.empty:
-            chemistry_list = player_chem_data['Chemistry'].values[0] if isinstance(player_chem_data['Chemistry'].values[0], (list, set)) else []
-            hate_list = player_chem_data['Hate'].values[0] if isinstance(player_chem_data['Hate'].values[0], (list, set)) else []
-        else:
-            chemistry_list = []
-            hate_list = []
+    # Chemistry and hate come from the index's bitsets instead of a DataFrame lookup per player
+    from chem_index import get_chem_index
+    chem_index = get_chem_index(chem_data)
+    team_mask = chem_index.mask(current_team)
 
+    for player in remaining_players:
         # Check chemistry and hate relationships with the current team
-        positive_chem = len(set(chemistry_list).intersection(current_team))
-        negative_chem = len(set(hate_list).intersection(current_team))
+        positive_chem = chem_index.chemistry_with(player, team_mask)
+        negative_chem = chem_index.hate_with(player, team_mask)
 
         if positive_chem > 0:
             good_chem_players.append((player, positive_chem, negative_chem))
@@ -190,83 +379,78 @@ def sort_available_players(remaining_players, current_team, chem_data):
 
 @app.route('/draft/<team>', methods=['GET', 'POST'])
 def draft(team):
-    if 'draft_id' not in session:
+    state = load_draft_state()
+    if state is None and 'draft_id' not in session:
+        # The index page was served while the character data was loading, so the draft starts here
+        state = start_session_draft()
+    if state is None:
         flash("No active draft session. Please start a new draft.", "warning")
         return redirect(url_for('index'))
 
-    # Retrieve session values
-    teams = session.get('teams', {})
-    remaining_players = session.get('remaining_players', [])
-    remaining_captains = session.get('remaining_captains', [])
-    teams_with_captain = session.get('teams_with_captain', {})
-    draft_order = session.get('draft_order', list(teams.keys()))
+    # Retrieve draft state
+    draft_id = session['draft_id']
+    teams = state['teams']
+    # The pool by name, in pool order, for the rankings and the page
+    remaining_players = characters.members(state['remaining_players'])
+    remaining_captains = characters.members(state['remaining_captains'])
+    teams_with_captain = state['teams_with_captain']
+    draft_order = state['draft_order']
 
     # Validate the team exists
     if team not in teams:
         flash("Invalid team selected!", "error")
         return redirect(url_for('index'))
 
-    # Identify teams that still need a captain
-    teams_missing_captain = [t for t, has_captain in teams_with_captain.items() if not has_captain]
-    must_pick_captain = len(teams_missing_captain) == len(remaining_captains)
-
     if request.method == 'POST':
         pick = request.form['pick']
-
-        # Ensure the pick is valid
-        if pick not in remaining_players:
-            flash("Invalid pick!", "error")
+        # The version the page was rendered at, so a second submit of the same page is rejected
+        version = request.form.get('version', type=int)
+        if version is None:
+            flash("The draft changed since this page was loaded, please pick again.", "warning")
             return redirect(url_for('draft', team=team))
 
-        # **STRICT CAPTAIN SELECTION RULES**
-        if must_pick_captain:
-            # If the team does not have a captain, they MUST pick a captain
-            if not teams_with_captain[team] and pick not in remaining_captains:
-                flash("You must pick a captain!", "warning")
-                return redirect(url_for('draft', team=team))
-            # If the team already has a captain, they CANNOT pick another captain
-            elif teams_with_captain[team] and pick in remaining_captains:
-                flash("You already have a captain and cannot pick another!", "error")
-                return redirect(url_for('draft', team=team))
-        else:
-            # If must_pick_captain is False, teams can pick any player (including captains)
-            pass
-
-        # Assign pick to the team
-        teams[team].append(pick)
-        remaining_players.remove(pick)
-        if pick in remaining_captains:
-            teams_with_captain[team] = True
-            remaining_captains.remove(pick)
-
-        # Determine the next team for the draft
-        current_index = draft_order.index(team)
-        if current_index == len(draft_order) - 1:
-            draft_order.reverse()  # Reverse for snake draft
-            next_team = draft_order[0]  # First team in new order
-        else:
-            next_team = draft_order[current_index + 1]
-
-        # Save updated session data
-        session['teams'] = teams
-        session['remaining_players'] = remaining_players
-        session['remaining_captains'] = remaining_captains
-        session['teams_with_captain'] = teams_with_captain
-        session['draft_order'] = draft_order
+        try:
+            with span('record_pick'):
+                state, next_team = draft_registry.record(draft_id, ['pick', team, pick], expected_version=version)
+        except PickError as error:
+            flash(str(error), error.category)
+            return redirect(url_for('draft', team=team))
+        except StaleDraft:
+            flash("The draft changed since this page was loaded, please pick again.", "warning")
+            return redirect(url_for('draft', team=team))
+        except KeyError:
+            flash("No active draft session. Please start a new draft.", "warning")
+            return redirect(url_for('index'))
+        draft_feed.publish(draft_id, state)
 
         return redirect(url_for('draft', team=next_team))
 
-    # Sort available players based on chemistry
-    sorted_players = sort_available_players(remaining_players, teams[team], chem_data)
+    # Sort available players based on chemistry, from the speculative cache when it was warmed
+    # for this roster, else from the draft's incrementally updated counts
+    with span('sort_players'):
+        sorted_players = speculator.get(draft_id, team, teams[team], remaining_players)
+        if sorted_players is None:
+            with draft_registry.lock(draft_id):
+                sorted_players = get_draft_scores(draft_id, state).sorted_players(team)
+
+    # Warm the next teams' rankings while this team decides (this team's own next turn depends on its pick)
+    for next_team in upcoming_teams(draft_order, draft_order.index(team), 3)[1:]:
+        if next_team != team:
+            speculator.speculate(draft_id, next_team, teams[next_team], remaining_players)
 
     return render_template(
         'draft.html',
         team=team,
         roster=teams[team],
-        must_pick_captain=must_pick_captain,
-        get_chemistry_links=get_chemistry_links,
-        get_hate_links=get_hate_links,
-        chem_data=chem_data,
+        roster_cards=render_cards('roster_card', teams[team], teams[team]),
+        player_cards=render_cards('player_button', sorted_players, teams[team]),
+        must_pick_captain=must_pick_captain(state),
+        alignment=best_alignment(teams[team], state['cf_players'].get(team)),
+        cf_player=state['cf_players'].get(team),
+        best_roster=next(iter(best_rosters(teams[team], state['remaining_players'])), None),
+        version=state.get('version', 0),
+        can_undo=state.get('head', 0) > 0,
+        can_redo=state.get('head', 0) < state.get('log_length', 0),
         remaining_players=sorted_players,
         remaining_captains=remaining_captains,
         teams_with_captain=teams_with_captain
@@ -274,67 +458,328 @@ def draft(team):
 
 @app.route('/')
 def index():
-    # Generate a unique draft session if one does not exist
-    if 'draft_id' not in session:
-        session['draft_id'] = str(uuid.uuid4())  # Assign a unique session ID
-        session['teams'] = {team: [] for team in ["Carby", "BenT", "Kircher", "Julian", "Jmo", "HarryKirch", "BenR", "Tom"]}
-        session['teams_with_captain'] = {team: False for team in session['teams']}
-        session['draft_order'] = list(session['teams'].keys())
-        session['remaining_players'] = list(player_stats['Character'])
-        session['remaining_captains'] = [p for p in session['remaining_players'] if p in captains]
-
-    return render_template('index.html', teams=session['teams'])
+    # Until the character data has loaded the page only shows the team names, and the first team
+    # page the session opens starts its draft
+    if not character_data.ready:
+        return render_template('index.html', teams=TEAM_NAMES, draft_id=session.get('draft_id'))
+
+    # Start a new draft if this session does not have one
+    state = load_draft_state()
+    if state is None:
+        state = start_session_draft()
+
+    return render_template('index.html', teams=state['teams'], draft_id=session['draft_id'])
+
+@app.route('/live/<draft_id>')
+def live_board(draft_id):
+    # Read-only board that follows a draft through its event stream
+    images = {player: asset_url('images/' + player + '.PNG') for player in draft_store.players}
+    return render_template('live.html', draft_id=draft_id, images=images)
+
+@app.route('/api/draft/<draft_id>/state')
+def draft_board_state(draft_id):
+    # ?at=<n> replays the draft's event log to how it was after its first n events
+    at = request.args.get('at', type=int)
+    try:
+        state = draft_store.load(draft_id) if at is None else draft_registry.state_at(draft_id, at)
+    except KeyError:
+        state = None
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+    if state is None:
+        return jsonify(error="No such draft"), 404
+    return jsonify(board_state(draft_id, state, characters))
+
+# Largest page of recommendations one request can ask for
+MAX_RECOMMENDATIONS = 200
+
+@app.route('/api/draft/<draft_id>/<team>/recommendations')
+def draft_recommendations(draft_id, team):
+    """
+    Ranked picks for team as JSON.
+    ?sort=score (calculate_scores total, default) | chemistry (sort_available_players order) | a metric
+    ?limit=5&offset=0 to page, ?min_<metric>=&max_<metric>= to filter on scaled (0-1) metrics.
+    The ETag changes only when the team's roster, the pool or the query does, so pollers
+    sending If-None-Match get a 304 without anything being scored.
+    """
+    from scoring import METRICS
+    state = draft_store.load(draft_id)
+    if state is None:
+        return jsonify(error="No such draft"), 404
+    if team not in state['teams']:
+        return jsonify(error="No such team"), 404
+
+    sort = request.args.get('sort', 'score')
+    if sort not in ('score', 'chemistry') and sort not in METRICS:
+        return jsonify(error=f"sort must be score, chemistry or one of {', '.join(METRICS)}"), 400
+    try:
+        limit = int(request.args.get('limit', 5))
+        offset = int(request.args.get('offset', 0))
+        filters = []
+        for metric in METRICS:
+            low = request.args.get(f'min_{metric}')
+            high = request.args.get(f'max_{metric}')
+            if low is not None or high is not None:
+                filters.append((metric, None if low is None else float(low), None if high is None else float(high)))
+    except ValueError:
+        return jsonify(error="limit, offset and metric bounds must be numbers"), 400
+    if not 1 <= limit <= MAX_RECOMMENDATIONS or offset < 0:
+        return jsonify(error=f"limit must be between 1 and {MAX_RECOMMENDATIONS} and offset at least 0"), 400
+
+    roster = state['teams'][team]
+    pool = encode_bits(state['remaining_players'])
+    etag = hashlib.sha1(json.dumps([draft_id, team, roster, pool, sort, limit, offset, filters]).encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    with draft_registry.lock(draft_id):
+        count, page = get_draft_scores(draft_id, state).recommendations(team, sort, filters, offset, limit)
+    response = jsonify({
+        'draft_id': draft_id,
+        'team': team,
+        'roster': roster,
+        'sort': sort,
+        'offset': offset,
+        'limit': limit,
+        'count': count,
+        'recommendations': [
+            {'player': player, 'score': score, 'metrics': dict(zip(METRICS, metrics)), 'chemistry': chemistry, 'hate': hate}
+            for player, score, metrics, chemistry, hate in page
+        ],
+    })
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # Clients revalidate with If-None-Match
+    return response
+
+@app.route('/api/draft/<draft_id>/<team>/best-rosters')
+def draft_best_rosters(draft_id, team):
+    """
+    The best nines team can still field as JSON, best first (see best_rosters).
+    ?k=5 rosters, ?min_outfield_speed= the Speed every outfielder needs.
+    """
+    state = draft_store.load(draft_id)
+    if state is None:
+        return jsonify(error="No such draft"), 404
+    if team not in state['teams']:
+        return jsonify(error="No such team"), 404
+    try:
+        k = int(request.args.get('k', 5))
+        min_outfield_speed = request.args.get('min_outfield_speed')
+        min_outfield_speed = None if min_outfield_speed is None else float(min_outfield_speed)
+    except ValueError:
+        return jsonify(error="k and min_outfield_speed must be numbers"), 400
+    if not 1 <= k <= MAX_RECOMMENDATIONS:
+        return jsonify(error=f"k must be between 1 and {MAX_RECOMMENDATIONS}"), 400
+
+    roster = state['teams'][team]
+    return jsonify({
+        'draft_id': draft_id,
+        'team': team,
+        'roster': roster,
+        'rosters': best_rosters(roster, state['remaining_players'], k, min_outfield_speed),
+    })
+
+@app.route('/api/draft/<draft_id>/events')
+def draft_events(draft_id):
+    # Server-sent events, resuming after ?after=<pick> or the browser's Last-Event-ID
+    seen = request.headers.get('Last-Event-ID') or request.args.get('after', '0')
+    try:
+        seen = max(int(seen), 0)
+    except ValueError:
+        seen = 0
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(draft_feed.stream(draft_id, seen), mimetype='text/event-stream', headers=headers)
 
 @app.route('/reset_draft')
 def reset_draft():
-    session.pop('draft_id', None)  # Clear the session
+    end_draft()
     return redirect(url_for('index'))
 
 @app.route('/roster/<team>')
 def roster(team):
-    return render_template('roster.html', team=team, roster=teams[team])
+    state = load_draft_state()
+    if state is None or team not in state['teams']:
+        flash("No such team in this draft.", "warning")
+        return redirect(url_for('index'))
+    return render_template('roster.html', team=team, roster=state['teams'][team])
 
 @app.route('/final_rosters')
 def final_rosters():
-    # Export the draft results to an Excel file
-    export_draft_results(teams)
-    
-    return render_template('final_rosters.html', teams=teams)
+    state = load_draft_state()
+    if state is None:
+        flash("No active draft session. Please start a new draft.", "warning")
+        return redirect(url_for('index'))
+
+    # Start building the Excel file now, so it is usually ready by the time it is downloaded
+    export_jobs.submit(session['draft_id'], state, 'xlsx')
+
+    return render_template('final_rosters.html', teams=state['teams'], draft_id=session['draft_id'])
+
+@app.route('/api/draft/<draft_id>/export.<fmt>')
+def export_draft(draft_id, fmt):
+    """
+    Downloads the draft results. CSV and JSON are streamed from the current state, xlsx is
+    served from the background-built file for the current version (202 while it is building,
+    503 if the build failed).
+    """
+    state = draft_store.load(draft_id)
+    if state is None:
+        return jsonify(error="No such draft"), 404
+    filename = f"draft_results.{fmt}"
+    disposition = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    if fmt == 'csv':
+        return Response(iter_csv(state['teams']), mimetype='text/csv', headers=disposition)
+    if fmt == 'json':
+        return Response(iter_json(draft_id, state), mimetype='application/json', headers=disposition)
+    if fmt not in FILE_FORMATS:
+        return jsonify(error=f"format must be one of {', '.join(STREAM_FORMATS + FILE_FORMATS)}"), 404
+
+    try:
+        export = export_jobs.wait(draft_id, state, fmt, timeout=5)
+    except ExportError as error:
+        # The failed build is dropped, so the retry builds it again
+        app.logger.exception("Export failed")
+        return jsonify(error=str(error)), 503, {'Retry-After': '1'}
+    if export is None:
+        return jsonify(status="building", version=state.get('version', 0)), 202, {'Retry-After': '1'}
+    return send_file(export, as_attachment=True, download_name=filename, max_age=0)
 
 @app.route('/reset_draft', methods=['POST'])
 def reset_draft_route():
-    reset_draft()
+    end_draft()
     flash("Draft has been reset!", "success")
     return redirect(url_for('index'))
 
 @app.route('/designate_cf/<team>', methods=['POST'])
 def designate_cf(team):
     cf_player = request.form['cf_player']
-    session[f'cf_player_{team}'] = cf_player  # Store the CF in the session for the current team
+
+    try:
+        state, _ = draft_registry.record(session.get('draft_id'), ['cf', team, cf_player])
+    except (PickError, KeyError):
+        flash("Invalid center fielder!", "error")
+    else:
+        draft_feed.publish(session['draft_id'], state)
     return redirect(url_for('draft', team=team))
 
-def export_draft_results(teams, filename='draft_results.xlsx'):
-    # Create a dictionary to store the picks for each round
-    draft_results = {}
-    
-    # Determine the maximum number of picks made by any team
-    max_picks = max(len(team) for team in teams.values())
-    
-    # Iterate through each round
-    for round_num in range(1, max_picks + 1):
-        round_picks = {}
-        for team, players in teams.items():
-            if len(players) >= round_num:
-                round_picks[team] = players[round_num - 1]
-            else:
-                round_picks[team] = None  # No pick made in this round
-        draft_results[f'Round {round_num}'] = round_picks
-    
-    # Convert the dictionary to a DataFrame
-    df = pd.DataFrame(draft_results)
-    
-    # Export the DataFrame to an Excel file
-    df.to_excel(filename, index=True)
+@app.route('/undo', methods=['POST'], endpoint='undo')
+@app.route('/redo', methods=['POST'], endpoint='redo')
+def undo_redo():
+    # Takes back (or replays) the session draft's last pick or CF designation, at the version
+    # the page was rendered at
+    draft_id = session.get('draft_id')
+    step = draft_registry.undo if request.endpoint == 'undo' else draft_registry.redo
+    version = request.form.get('version', type=int)
+    if version is None:
+        flash("The draft changed since this page was loaded, please try again.", "warning")
+        return redirect(request.referrer or url_for('index'))
+    try:
+        state, event = step(draft_id, expected_version=version)
+    except PickError as error:
+        flash(str(error), error.category)
+        return redirect(request.referrer or url_for('index'))
+    except StaleDraft:
+        flash("The draft changed since this page was loaded, please try again.", "warning")
+        return redirect(request.referrer or url_for('index'))
+    except KeyError:
+        flash("No active draft session. Please start a new draft.", "warning")
+        return redirect(url_for('index'))
+    draft_feed.publish(draft_id, state)
+    kind, team, player = event[:3]
+    what = f"{team}'s pick of {player}" if kind == 'pick' else f"{player} as {team}'s center fielder"
+    flash(f"{'Undid' if request.endpoint == 'undo' else 'Redid'} {what}.", "success")
+    return redirect(url_for('draft', team=state['on_clock']))
+
+@app.route('/api/drafts', methods=['POST'])
+def create_league():
+    """
+    Starts a new draft, independent of the session's. JSON body {"teams": [names]} (default TEAM_NAMES).
+    """
+    team_names = (request.get_json(silent=True) or {}).get('teams') or TEAM_NAMES
+    if not isinstance(team_names, list) or len(set(map(str, team_names))) != len(team_names) or len(team_names) < 2:
+        return jsonify(error="teams must be a list of at least two distinct names"), 400
+    draft_id = draft_registry.create(new_draft_state([str(team) for team in team_names]))
+    return jsonify(draft_id=draft_id, version=0), 201
+
+@app.route('/api/draft/<draft_id>/<team>/picks', methods=['POST'])
+def api_pick(draft_id, team):
+    """
+    Makes a pick from JSON {"player": name, "version": n}. The pick is only made if the draft
+    is still at version, so a retried or duplicated request cannot pick twice (409), and only
+    for the team on the clock (400).
+    """
+    body = request.get_json(silent=True) or {}
+    version = body.get('version')
+    if not isinstance(version, int) or isinstance(version, bool):
+        return jsonify(error="version (the draft version the pick is for) is required"), 400
+    try:
+        state, next_team = draft_registry.record(draft_id, ['pick', team, body.get('player')], expected_version=version)
+    except KeyError:
+        return jsonify(error="No such draft"), 404
+    except PickError as error:
+        return jsonify(error=str(error)), 400
+    except StaleDraft:
+        return jsonify(error="The draft changed since that version"), 409
+    draft_feed.publish(draft_id, state)
+    return jsonify(version=state['version'], pick=len(state['picks']), next_team=next_team)
+
+@app.route('/api/draft/<draft_id>/undo', methods=['POST'], endpoint='api_undo')
+@app.route('/api/draft/<draft_id>/redo', methods=['POST'], endpoint='api_redo')
+def api_undo_redo(draft_id):
+    """
+    Takes back (or replays) the draft's last event. JSON {"version": n} is required, like for picks.
+    """
+    body = request.get_json(silent=True) or {}
+    version = body.get('version')
+    if not isinstance(version, int) or isinstance(version, bool):
+        return jsonify(error="version (the draft version to step from) is required"), 400
+    step = draft_registry.undo if request.endpoint == 'api_undo' else draft_registry.redo
+    try:
+        state, event = step(draft_id, expected_version=version)
+    except KeyError:
+        return jsonify(error="No such draft"), 404
+    except PickError as error:
+        return jsonify(error=str(error)), 400
+    except StaleDraft:
+        return jsonify(error="The draft changed since that version"), 409
+    draft_feed.publish(draft_id, state)
+    return jsonify(version=state['version'], event=event[:3], head=state['head'], log_length=state['log_length'],
+                   pick=len(state['picks']), on_clock=state['on_clock'])
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Latency histograms of every route and of the stages timed within requests, in the
+    Prometheus text format, or as JSON with estimated percentiles with ?format=json.
+    """
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.snapshot())
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/profiles/<path:filename>')
+def request_profile(filename):
+    # A profile dump named in a response's X-Profile-Dump header
+    if not app.config['PROFILE_REQUESTS']:
+        return jsonify(error="Request profiling is off"), 404
+    return send_from_directory(request_profiler.directory, filename, as_attachment=True)
+
+@app.route('/ready')
+def readiness():
+    """
+    Whether the character data and the built assets have loaded and every route can be served:
+    200 once both have, 503 while either is loading (or if loading failed), with the status of
+    each and the seconds it took as JSON.
+    """
+    tasks = {'character_data': character_data.status(), 'assets': built_assets.status()}
+    statuses = [task['status'] for task in tasks.values()]
+    status = 'failed' if 'failed' in statuses else 'loading' if 'loading' in statuses else 'ready'
+    return jsonify(status=status, **tasks), 200 if status == 'ready' else 503
+
+# Load the character data and build the assets in the background while the app starts serving
+character_data.start()
+built_assets.start()
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,170 @@
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Character images are static/images/<name>.PNG, built files go to static/build/
+IMAGES_DIR = 'images'
+BUILD_DIR = 'build'
+
+MANIFEST_VERSION = 1
+
+# Edge of a thumbnail / sprite cell in pixels. Cards show players at 50px and links at 20px,
+# so this leaves some headroom for high density screens
+THUMB_SIZE = 64
+
+def manifest_path(static_dir=STATIC_DIR):
+    return os.path.join(static_dir, BUILD_DIR, 'manifest.json')
+
+def source_signature(static_dir=STATIC_DIR):
+    """
+    Returns {file name: (mtime_ns, size)} for the character images.
+    """
+    signature = {}
+    images_dir = os.path.join(static_dir, IMAGES_DIR)
+    for filename in sorted(os.listdir(images_dir)):
+        if filename.lower().endswith('.png'):
+            stat = os.stat(os.path.join(images_dir, filename))
+            signature[filename] = [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+def build_assets(static_dir=STATIC_DIR, size=THUMB_SIZE):
+    """
+    Builds static/build from static/images and returns the manifest.
+
+    Every image gets a content-hashed copy, so its URL changes whenever the file does and
+    can be cached forever. With Pillow installed the copies are size x size thumbnails, and
+    all of them are also packed into one sprite sheet with a stylesheet giving each character
+    a 'sprite-<n>' class, so a page of cards loads two files instead of one per image.
+    Without Pillow the copies are the original images and there is no sprite sheet.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    signature = source_signature(static_dir)
+    build_dir = os.path.join(static_dir, BUILD_DIR)
+    os.makedirs(os.path.join(build_dir, IMAGES_DIR), exist_ok=True)
+
+    files = {}  # Logical path (relative to static/) -> built path
+    thumbs = {}
+    for filename in signature:
+        with open(os.path.join(static_dir, IMAGES_DIR, filename), 'rb') as f:
+            data = f.read()
+        if Image is not None:
+            with Image.open(io.BytesIO(data)) as image:
+                # Stretched to a square like the .player-image / .chemistry-image CSS boxes do
+                thumb = image.convert('RGBA').resize((size, size), Image.LANCZOS)
+            thumbs[os.path.splitext(filename)[0]] = thumb
+            data = _png_bytes(thumb)
+        files[f"{IMAGES_DIR}/{filename}"] = _write_hashed(build_dir, f"{IMAGES_DIR}/{os.path.splitext(filename)[0]}", '.png', data)
+
+    sprite = None
+    if thumbs:
+        names = sorted(thumbs)
+        columns = math.ceil(math.sqrt(len(names)))
+        rows = math.ceil(len(names) / columns)
+        sheet = Image.new('RGBA', (columns * size, rows * size))
+        css = []
+        for n, name in enumerate(names):
+            column, row = n % columns, n // columns
+            sheet.paste(thumbs[name], (column * size, row * size))
+            # Percentages position the cell whatever size the element is drawn at
+            x = column * 100 / (columns - 1) if columns > 1 else 0
+            y = row * 100 / (rows - 1) if rows > 1 else 0
+            css.append(f".sprite-{n} {{ background-position: {x:g}% {y:g}%; }}")
+        sheet_path = _write_hashed(build_dir, 'sprite', '.png', _png_bytes(sheet))
+        css.insert(0, f".sprite {{ display: inline-block; background-image: url({os.path.basename(sheet_path)}); "
+                      f"background-size: {columns * 100}% {rows * 100}%; }}")
+        files['sprite.png'] = sheet_path
+        files['sprite.css'] = _write_hashed(build_dir, 'sprite', '.css', ("\n".join(css) + "\n").encode())
+        sprite = {'columns': columns, 'rows': rows, 'cells': {name: n for n, name in enumerate(names)}}
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'signature': signature,
+        'size': size if Image is not None else None,
+        'files': files,
+        'sprite': sprite,
+    }
+    _write_manifest(manifest, static_dir)
+    _remove_stale(build_dir, set(files.values()))
+    return manifest
+
+def load_manifest(static_dir=STATIC_DIR, rebuild=False):
+    """
+    Returns the asset manifest, building the assets first if they are missing, from an older
+    format, or an image changed since they were built. Returns None if they cannot be built
+    (e.g. a read-only static directory), and the app then serves the original images.
+    """
+    manifest = _read_manifest(static_dir)
+    if not rebuild and manifest is not None and manifest['signature'] == source_signature(static_dir):
+        return manifest
+    try:
+        return build_assets(static_dir, (manifest or {}).get('size') or THUMB_SIZE)
+    except OSError:
+        return None
+
+def _png_bytes(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+def _write_hashed(build_dir, stem, extension, data):
+    # Writes data to build/<stem>.<content hash><extension> and returns its path relative to static/
+    relative = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+    path = os.path.join(build_dir, relative)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return f"{BUILD_DIR}/{relative}"
+
+def _read_manifest(static_dir):
+    try:
+        with open(manifest_path(static_dir)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def _write_manifest(manifest, static_dir):
+    path = manifest_path(static_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _remove_stale(build_dir, keep):
+    # Drops files from earlier builds that the new manifest no longer points at
+    for directory, _, filenames in os.walk(build_dir):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            relative = f"{BUILD_DIR}/" + os.path.relpath(path, build_dir).replace(os.sep, '/')
+            if filename != 'manifest.json' and not filename.endswith('.tmp') and relative not in keep:
+                os.remove(path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build content-hashed thumbnails and the sprite sheet from static/images.")
+    parser.add_argument('--static-dir', default=STATIC_DIR, help="the app's static directory")
+    parser.add_argument('--size', type=int, default=THUMB_SIZE, help="thumbnail edge in pixels")
+    parser.add_argument('--check', action='store_true', help="only report whether the built assets are up to date")
+    args = parser.parse_args()
+
+    if args.check:
+        manifest = _read_manifest(args.static_dir)
+        fresh = manifest is not None and manifest['signature'] == source_signature(args.static_dir)
+        print(f"{manifest_path(args.static_dir)} is {'up to date' if fresh else 'stale'}")
+        raise SystemExit(0 if fresh else 1)
+
+    manifest = build_assets(args.static_dir, args.size)
+    kind = f"{args.size}px thumbnails and a sprite sheet" if manifest['sprite'] else "hashed copies (install Pillow for thumbnails and a sprite sheet)"
+    print(f"Built {len(manifest['files'])} assets into {os.path.join(args.static_dir, BUILD_DIR)}: {kind}")
@@ -0,0 +1,134 @@
+"""
+Cold start of the web app: how long a fresh process takes to answer its first request.
+
+Every run starts a new Python process that imports Flask, imports app.py and requests the
+index page through the test client, then waits for the character data and the built assets
+(the /ready endpoint) and renders a draft page. Reported per run and as medians:
+
+    process_ms    process start to the first response, interpreter start-up included
+    flask_ms      importing Flask, which the app cannot start without
+    startup_ms    the app's own share: importing app.py and serving the first response
+    ready_ms      importing app.py to the character data and assets being loaded (/ready answering 200)
+    draft_page_ms the first draft page, once ready
+
+The run fails (exit status 1) if the median startup_ms is over the target. --cold-cache
+copies the spreadsheets to an empty data directory, so the character data is built from the
+spreadsheets with pandas instead of read from data/.cache: the first response should be as
+fast, only ready_ms grows.
+
+    python benchmarks/cold_start.py --runs 5 --target-ms 200
+    python benchmarks/cold_start.py --cold-cache
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURES = ('process_ms', 'flask_ms', 'startup_ms', 'ready_ms', 'draft_page_ms')
+
+def run_child():
+    """
+    One cold start, in this (fresh) process. Returns the timings in seconds, the first
+    response's wall clock time for the parent to subtract its own start time from.
+    """
+    start = time.perf_counter()
+    import flask
+    flask_imported = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import app
+    response = app.app.test_client().get('/')
+    first_response = time.perf_counter()
+    first_response_wall = time.time()
+    assert response.status_code == 200, response.status_code
+    # If the data had already loaded, the index page also started the session's draft
+    ready_before_response = app.character_data.ready and app.built_assets.ready
+    app.character_data.wait()
+    app.built_assets.wait()
+    ready = time.perf_counter()
+    client = app.app.test_client()
+    client.get('/')
+    response = client.get(f"/draft/{app.TEAM_NAMES[0]}")
+    assert response.status_code == 200, response.status_code
+    return {
+        'first_response_wall': first_response_wall,
+        'flask': flask_imported - start,
+        'startup': first_response - flask_imported,
+        'ready': ready - flask_imported,
+        'draft_page': time.perf_counter() - ready,
+        'ready_before_response': ready_before_response,
+    }
+
+def run(data_dir=None):
+    # Runs a cold start in a fresh process. Returns its timings in ms
+    env = dict(os.environ, DRAFT_STORE='memory')
+    if data_dir is not None:
+        env['DATA_DIR'] = data_dir
+    started = time.time()
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], capture_output=True, text=True, cwd=ROOT, env=env)
+    for line in completed.stdout.splitlines():
+        if line.startswith('RESULT '):
+            result = json.loads(line[len('RESULT '):])
+            return {
+                'process_ms': (result['first_response_wall'] - started) * 1000,
+                'flask_ms': result['flask'] * 1000,
+                'startup_ms': result['startup'] * 1000,
+                'ready_ms': result['ready'] * 1000,
+                'draft_page_ms': result['draft_page'] * 1000,
+                'ready_before_response': result['ready_before_response'],
+            }
+    raise RuntimeError(completed.stderr[-2000:] or f"exit status {completed.returncode}")
+
+def cold_data_dir():
+    # A copy of the spreadsheets without data/.cache
+    from data_cache import SOURCES, season_files
+
+    source = os.path.join(ROOT, 'data')
+    directory = tempfile.mkdtemp(prefix='sluggers-cold-')
+    for filename in sorted(set(SOURCES.values()) | set(season_files(source))):
+        os.makedirs(os.path.dirname(os.path.join(directory, filename)), exist_ok=True)
+        shutil.copy2(os.path.join(source, filename), os.path.join(directory, filename))
+    return directory
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time from a fresh process to the web app's first response.")
+    parser.add_argument('--runs', type=int, default=5, help="cold starts to time")
+    parser.add_argument('--target-ms', type=float, default=200.0, help="most the median startup_ms may be")
+    parser.add_argument('--cold-cache', action='store_true', help="build the character data from the spreadsheets every run")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print('RESULT ' + json.dumps(run_child()))
+        raise SystemExit(0)
+
+    sys.path.insert(0, ROOT)
+    results = []
+    print(f"{'run':<6}" + ''.join(f"{measure:>15}" for measure in MEASURES))
+    for n in range(args.runs):
+        data_dir = cold_data_dir() if args.cold_cache else None
+        try:
+            result = run(data_dir)
+        finally:
+            if data_dir is not None:
+                shutil.rmtree(data_dir, ignore_errors=True)
+        results.append(result)
+        note = '  (data loaded before the first response)' if result['ready_before_response'] else ''
+        print(f"{n + 1:<6}" + ''.join(f"{result[measure]:>15.1f}" for measure in MEASURES) + note)
+    medians = {measure: statistics.median(result[measure] for result in results) for measure in MEASURES}
+    print(f"{'median':<6}" + ''.join(f"{medians[measure]:>15.1f}" for measure in MEASURES))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'runs': results, 'medians': medians, 'target_ms': args.target_ms, 'cold_cache': args.cold_cache}, f, indent=2)
+    passed = medians['startup_ms'] <= args.target_ms
+    print(f"\nstartup {medians['startup_ms']:.1f} ms (target {args.target_ms:.0f} ms): {'ok' if passed else 'over target'}")
+    if not passed:
+        raise SystemExit(1)
@@ -0,0 +1,330 @@
+"""
+Benchmarks for the scoring and draft hot paths on synthetic character pools.
+
+Generates chemistry graphs and stat tables shaped like sortedmasterchem.xlsx, Player
+Statistics.xlsx and Season Data.xlsx (rows resampled from the real sheets, chemistry in
+clusters like the real color / family groups plus random links) for every combination of
+pool size, team count and chemistry density, and times calculate_chemistry_metric,
+calculate_scores, sort_available_players, recommend_outfielders and a full draft page
+render through the app. Every configuration runs in its own process with the app reading
+the generated spreadsheets (DATA_DIR), so memory is measured per configuration: the peak
+Python allocation of one call of each hot path (tracemalloc) and the process's peak RSS.
+
+Results can be saved as a baseline and later runs compared against it; a hot path whose
+median or p95 latency or peak memory grew past the tolerance is reported as a regression
+(and the exit status is 1).
+
+    python benchmarks/hot_paths.py --pools real 100 1000 10000 --teams 8 --links 9
+    python benchmarks/hot_paths.py --save                 # write benchmarks/baselines/hot_paths.json
+    python benchmarks/hot_paths.py --compare              # compare against it
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'hot_paths.json')
+
+BENCHMARKS = ('chemistry_metric', 'calculate_scores', 'sort_available_players', 'recommend_outfielders', 'draft_page')
+
+# Picks per team in the generated drafts, like the real league's rosters
+ROUNDS = 13
+
+def config_key(config):
+    if config['pool'] == 'real':
+        return f"real teams={config['teams']}"
+    return f"pool={config['pool']} teams={config['teams']} links={config['links']} hates={config['hates']}"
+
+def synthetic_frames(size, links, hates, seed=0):
+    """
+    Returns (chem_data, player_stats, season_data) for size characters, in the layout of the
+    real spreadsheets. The real captains come first so the captain rules still apply; every
+    character has about links chemistry and hates hate partners, half of its chemistry
+    within a cluster (like the Yoshis or the Babies) and the rest random.
+    """
+    import numpy as np
+    import pandas as pd
+    from data_cache import load_data
+
+    _, stats_template, season_template = load_data(os.path.join(ROOT, 'data'))
+    rng = np.random.default_rng(seed)
+    captains = list(stats_template.loc[stats_template['Captain'] == 'Yes', 'Character'])[:size]
+    names = captains + [f"Player {n:05d}" for n in range(size - len(captains))]
+
+    chemistry = [set() for _ in range(size)]
+    hate = [set() for _ in range(size)]
+    cluster = max(2, links // 2 + 1)
+    order = rng.permutation(size)
+    for start in range(0, size, cluster):
+        members = order[start:start + cluster].tolist()
+        for a, b in itertools.combinations(members, 2):
+            chemistry[a].add(b)
+            chemistry[b].add(a)
+    def random_pairs(count, partners, avoid):
+        for a, b in rng.integers(0, size, (int(count), 2)).tolist():
+            if a != b and b not in avoid[a]:
+                partners[a].add(b)
+                partners[b].add(a)
+    random_pairs(size * max(0, links - (cluster - 1)) / 2, chemistry, hate)
+    random_pairs(size * hates / 2, hate, chemistry)
+
+    chem_data = pd.DataFrame({
+        'Character Name': names,
+        'Chemistry': [str([names[j] for j in sorted(partners)]) for partners in chemistry],
+        'Hate': [str([names[j] for j in sorted(partners)]) for partners in hate],
+        'ChemCount': [len(partners) for partners in chemistry],
+        'HateCount': [len(partners) for partners in hate],
+    })
+    chem_data['NetChem'] = chem_data['ChemCount'] - chem_data['HateCount']
+
+    # Stats: real rows resampled, numeric columns jittered within the real range
+    player_stats = stats_template.iloc[rng.integers(0, len(stats_template), size)].reset_index(drop=True)
+    player_stats['Character'] = names
+    player_stats['Captain'] = ['Yes' if name in captains else 'No' for name in names]
+    for column in player_stats.select_dtypes('number').columns:
+        low, high = stats_template[column].min(), stats_template[column].max()
+        player_stats[column] = np.clip(player_stats[column] + rng.integers(-5, 6, size), low, high)
+
+    # Season rows: one or two per character, a few characters without any (they get the fallback)
+    rows = []
+    for name in names:
+        for _ in range(rng.choice([0, 1, 1, 1, 2]) if name not in captains else 1):
+            rows.append(dict(season_template.iloc[rng.integers(0, len(season_template))], **{'First Name': name}))
+    season_data = pd.DataFrame(rows, columns=season_template.columns)
+    return chem_data, player_stats, season_data
+
+def write_frames(frames, data_dir):
+    from data_cache import SOURCES
+
+    os.makedirs(data_dir, exist_ok=True)
+    for key, frame in zip(('chem_data', 'player_stats', 'season_data'), frames):
+        frame.to_excel(os.path.join(data_dir, SOURCES[key]), index=False)
+
+def percentiles(times):
+    times = sorted(times)
+    def at(q):
+        return times[min(len(times) - 1, int(q * len(times)))] * 1000
+    return {'n': len(times), 'p50_ms': at(0.5), 'p95_ms': at(0.95), 'p99_ms': at(0.99), 'max_ms': times[-1] * 1000}
+
+def run_config(config, samples, budget, seed):
+    """
+    Runs every hot path for one configuration in this process. Returns {'setup_s', 'rss_mb', 'benchmarks'}.
+    """
+    import random
+
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    os.environ['DRAFT_STORE'] = 'memory'
+    if config['pool'] != 'real':
+        # The app reads DATA_DIR when data_cache is first imported
+        data_dir = tempfile.mkdtemp(prefix='sluggers-bench-')
+        os.environ['DATA_DIR'] = data_dir
+        write_frames(synthetic_frames(config['pool'], config['links'], config['hates'], seed), data_dir)
+    import app
+    app.character_data.wait()
+    import utils
+    from data_cache import load_data
+
+    chem_data, player_stats, season_data = load_data()
+    pool = list(app.player_pool)
+    teams = [f"Team {n + 1}" for n in range(config['teams'])]
+    rng = random.Random(seed)
+    # Build the per-frame caches the app keeps warm, so the timings are steady state
+    utils.calculate_scores(pool, [], chem_data, player_stats, season_data)
+    player_speed = app.tables.stat('Speed')
+    setup = time.perf_counter() - start
+
+    def mid_draft():
+        # A team's roster and the remaining pool at a random point of a snake draft
+        rounds = min(ROUNDS, len(pool) // len(teams))
+        drafted = rng.sample(pool, rng.randrange(0, rounds * len(teams) + 1))
+        roster = drafted[:len(drafted) // len(teams)]
+        taken = set(drafted)
+        return roster, [player for player in pool if player not in taken]
+
+    def chemistry_metric():
+        roster, remaining = mid_draft()
+        player = rng.choice(remaining)
+        return lambda: utils.calculate_chemistry_metric(roster, player, remaining, chem_data)
+
+    def calculate_scores():
+        roster, remaining = mid_draft()
+        return lambda: utils.calculate_scores(remaining, roster, chem_data, player_stats, season_data)
+
+    def sort_available_players():
+        roster, remaining = mid_draft()
+        return lambda: app.sort_available_players(remaining, roster, chem_data)
+
+    def recommend_outfielders():
+        roster, remaining = mid_draft()
+        return lambda: utils.recommend_outfielders(roster, remaining, app.fielding_solver, player_speed)
+
+    client = app.app.test_client()
+    draft = {}
+    def draft_page():
+        # Makes a legal pick for the team on the clock (untimed), then renders the next team's page
+        state = draft.get('state')
+        if state is None or not state['remaining_players']:
+            draft_id = client.post('/api/drafts', json={'teams': teams}).get_json()['draft_id']
+            with client.session_transaction() as session:
+                session['draft_id'] = draft_id
+            draft['id'] = draft_id
+        else:
+            team = state['on_clock']
+            choices = state['remaining_players']
+            if state['must_pick_captain'] and state['remaining_captains']:
+                captains = set(state['remaining_captains'])
+                choices = [player for player in choices if (player in captains) != state['teams_with_captain'][team]] or choices
+            client.post(f"/api/draft/{draft['id']}/{team}/picks", json={'player': rng.choice(choices), 'version': state['version']})
+        state = draft['state'] = client.get(f"/api/draft/{draft['id']}/state").get_json()
+        url = f"/draft/{state['on_clock']}"
+        def render():
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+        return render
+
+    makers = {
+        'chemistry_metric': chemistry_metric,
+        'calculate_scores': calculate_scores,
+        'sort_available_players': sort_available_players,
+        'recommend_outfielders': recommend_outfielders,
+        'draft_page': draft_page,
+    }
+    benchmarks = {}
+    for name in config['benchmarks']:
+        make = makers[name]
+        times = []
+        deadline = time.perf_counter() + budget
+        while len(times) < samples and (len(times) < 3 or time.perf_counter() < deadline):
+            call = make()
+            t0 = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - t0)
+        call = make()
+        tracemalloc.start()
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        benchmarks[name] = dict(percentiles(times), peak_kb=peak / 1024)
+
+    # ru_maxrss is in KB on Linux
+    return {'setup_s': setup, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'benchmarks': benchmarks}
+
+def run_child(config, samples, budget, seed):
+    # Runs a configuration in a fresh process, so memory and caches do not carry over
+    command = [sys.executable, os.path.abspath(__file__), '--child', json.dumps(config),
+               '--samples', str(samples), '--budget', str(budget), '--seed', str(seed)]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=ROOT)
+    for line in completed.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+    # E.g. out of memory: the error is reported with the results instead of stopping the run
+    return {'error': completed.stderr[-2000:] or f"exit status {completed.returncode}"}
+
+def compare(report, baseline, tolerance):
+    """
+    Returns the regressions of report against baseline: [(config, benchmark, measure, old, new)].
+    Latencies under a tenth of a millisecond are too noisy to compare.
+    """
+    regressions = []
+    for key, result in report['results'].items():
+        old_result = baseline['results'].get(key)
+        if old_result is None or 'error' in old_result:
+            continue
+        if 'error' in result:
+            regressions.append((key, 'process', 'failed', None, None))
+            continue
+        for name, stats in result['benchmarks'].items():
+            old = old_result['benchmarks'].get(name)
+            if old is None:
+                continue
+            for measure in ('p50_ms', 'p95_ms', 'peak_kb'):
+                floor = 0.1 if measure.endswith('_ms') else 64
+                if stats[measure] > max(old[measure], floor) * tolerance:
+                    regressions.append((key, name, measure, old[measure], stats[measure]))
+        if result['rss_mb'] > old_result['rss_mb'] * tolerance:
+            regressions.append((key, 'process', 'rss_mb', old_result['rss_mb'], result['rss_mb']))
+    return regressions
+
+def print_report(report, baseline=None):
+    print(f"{'benchmark':<24} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'peak KB':>9} {'vs base':>8}")
+    for key, result in report['results'].items():
+        if 'error' in result:
+            print(f"\n{key}  failed: {result['error'].strip().splitlines()[-1]}")
+            continue
+        print(f"\n{key}  (setup {result['setup_s']:.1f}s, peak RSS {result['rss_mb']:.0f} MB)")
+        old_result = (baseline or {}).get('results', {}).get(key, {}).get('benchmarks', {})
+        for name, stats in result['benchmarks'].items():
+            old = old_result.get(name)
+            ratio = f"{stats['p50_ms'] / old['p50_ms']:.2f}x" if old and old['p50_ms'] else ''
+            print(f"{name:<24} {stats['n']:>5} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+                  f"{stats['max_ms']:>9.3f} {stats['peak_kb']:>9.0f} {ratio:>8}")
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=ROOT).stdout.strip()
+    except OSError:
+        return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latency and memory benchmarks of the scoring and draft hot paths on synthetic pools.")
+    parser.add_argument('--pools', nargs='+', default=['real', '100', '1000', '10000'], help="pool sizes, 'real' for the spreadsheets in data/")
+    parser.add_argument('--teams', type=int, nargs='+', default=[8], help="team counts")
+    parser.add_argument('--links', type=int, nargs='+', default=[9], help="average chemistry partners per character")
+    parser.add_argument('--hates', type=int, default=4, help="average hate partners per character")
+    parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS), choices=BENCHMARKS, help="hot paths to run")
+    parser.add_argument('--samples', type=int, default=200, help="timed calls per hot path")
+    parser.add_argument('--budget', type=float, default=10.0, help="seconds per hot path before stopping early (at least 3 calls)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated pools and inputs")
+    parser.add_argument('--save', nargs='?', const=BASELINE, help="write the results as a baseline (default %(const)s)")
+    parser.add_argument('--compare', nargs='?', const=BASELINE, help="compare against a baseline (default %(const)s)")
+    parser.add_argument('--tolerance', type=float, default=1.25, help="slowdown / memory growth reported as a regression")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print('RESULT ' + json.dumps(run_config(json.loads(args.child), args.samples, args.budget, args.seed)))
+        raise SystemExit(0)
+
+    configs = []
+    for pool, teams, links in itertools.product(args.pools, args.teams, args.links):
+        config = {'pool': pool if pool == 'real' else int(pool), 'teams': teams, 'links': links, 'hates': args.hates, 'benchmarks': args.benchmarks}
+        if config_key(config) not in {config_key(other) for other in configs}:
+            configs.append(config)
+
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+                 'commit': _git_commit(), 'samples': args.samples, 'seed': args.seed},
+        'results': {},
+    }
+    for config in configs:
+        print(f"Running {config_key(config)} ...", file=sys.stderr, flush=True)
+        report['results'][config_key(config)] = run_child(config, args.samples, args.budget, args.seed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    for path in (args.save, args.json):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        print(f"\n{len(regressions)} regression(s) against {args.compare} (commit {baseline['meta'].get('commit')}, tolerance {args.tolerance}x)")
+        for key, name, measure, old, new in regressions:
+            print(f"  {key} {name} {measure}" + (f": {old:.3f} -> {new:.3f}" if old is not None else ""))
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,140 @@
+"""
+Load test for the draft registry.
+
+Runs full drafts in several leagues at once, one process per league acting as a separate
+app worker (like gunicorn workers) against a shared SQLite draft store, and reports pick
+throughput as the number of leagues grows. Leagues never wait on each other, so total
+throughput should grow linearly with the number of leagues up to the number of CPU cores.
+
+A contention run then has several workers race to submit picks to the same league with
+the version they read, and checks that exactly one submit per version is accepted.
+
+    python benchmarks/load_test.py --leagues 1 2 4 8 --drafts 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _client(db_path):
+    # Each process imports the app on its own, sharing only the SQLite file
+    os.environ['DRAFT_STORE'] = 'sqlite'
+    os.environ['DRAFT_DB'] = db_path
+    sys.path.insert(0, ROOT)
+    import app
+    return app.app.test_client()
+
+def _next_pick(state):
+    team = state['on_clock']
+    if state['must_pick_captain'] and state['remaining_captains']:
+        if not state['teams_with_captain'][team]:
+            return team, state['remaining_captains'][0]
+        return team, next((player for player in state['remaining_players'] if player not in state['remaining_captains']), state['remaining_players'][0])
+    return team, state['remaining_players'][0]
+
+def _run_league(db_path, drafts, barrier, results):
+    client = _client(db_path)
+    barrier.wait()
+    start = time.perf_counter()
+    picks = 0
+    for _ in range(drafts):
+        draft_id = client.post('/api/drafts', json={}).get_json()['draft_id']
+        while True:
+            state = client.get(f'/api/draft/{draft_id}/state').get_json()
+            if not state['remaining_players']:
+                break
+            team, player = _next_pick(state)
+            response = client.post(f'/api/draft/{draft_id}/{team}/picks', json={'player': player, 'version': state['version']})
+            assert response.status_code == 200, response.get_json()
+            picks += 1
+    results.put((picks, time.perf_counter() - start))
+
+def _race(db_path, draft_id, barrier, results):
+    client = _client(db_path)
+    barrier.wait()
+    accepted = rejected = 0
+    while True:
+        state = client.get(f'/api/draft/{draft_id}/state').get_json()
+        if not state['remaining_players']:
+            break
+        team, player = _next_pick(state)
+        response = client.post(f'/api/draft/{draft_id}/{team}/picks', json={'player': player, 'version': state['version']})
+        if response.status_code == 200:
+            accepted += 1
+        elif response.status_code in (400, 409):
+            rejected += 1  # Someone else got this version in first (400 if the player was already gone)
+        else:
+            raise AssertionError(response.get_json())
+    results.put((accepted, rejected))
+
+def run_leagues(db_path, leagues, drafts):
+    """
+    Runs leagues concurrent leagues of drafts full drafts each.
+    Returns (total picks, wall time in seconds).
+    """
+    barrier = multiprocessing.Barrier(leagues)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_run_league, args=(db_path, drafts, barrier, results)) for _ in range(leagues)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return sum(picks for picks, _ in outcomes), max(elapsed for _, elapsed in outcomes)
+
+def run_contention(db_path, workers):
+    """
+    workers processes race through one draft. Returns (accepted, rejected, picks in the draft).
+    """
+    client = _client(db_path)
+    draft_id = client.post('/api/drafts', json={}).get_json()['draft_id']
+    barrier = multiprocessing.Barrier(workers)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_race, args=(db_path, draft_id, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    state = client.get(f'/api/draft/{draft_id}/state').get_json()
+    return sum(a for a, _ in outcomes), sum(r for _, r in outcomes), state['pick']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concurrent-league load test for the draft registry.")
+    parser.add_argument('--leagues', type=int, nargs='+', default=[1, 2, 4, 8], help="numbers of concurrent leagues to test")
+    parser.add_argument('--drafts', type=int, default=2, help="full drafts per league")
+    parser.add_argument('--contention', type=int, default=4, help="workers racing on one league (0 to skip)")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = {'cpus': os.cpu_count(), 'runs': []}
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'drafts.sqlite3')
+        _client(db_path)  # Create the schema before the workers start
+
+        print(f"{'leagues':>8} {'picks':>8} {'seconds':>8} {'picks/s':>9} {'per league':>11} {'scaling':>8}")
+        base = None
+        for leagues in args.leagues:
+            picks, elapsed = run_leagues(db_path, leagues, args.drafts)
+            throughput = picks / elapsed
+            base = base or throughput / leagues
+            scaling = throughput / base
+            report['runs'].append({'leagues': leagues, 'picks': picks, 'seconds': elapsed, 'picks_per_second': throughput})
+            print(f"{leagues:>8} {picks:>8} {elapsed:>8.2f} {throughput:>9.0f} {throughput / leagues:>11.0f} {scaling:>7.2f}x")
+        print(f"(ideal scaling is linear up to the {os.cpu_count()} CPU cores of this machine)")
+
+        if args.contention:
+            accepted, rejected, picks = run_contention(db_path, args.contention)
+            report['contention'] = {'workers': args.contention, 'accepted': accepted, 'rejected': rejected, 'picks': picks}
+            print(f"\n{args.contention} workers racing on one league: {accepted} picks accepted, {rejected} conflicting submits rejected")
+            if accepted != picks:
+                raise SystemExit(f"accepted {accepted} submits for a draft of {picks} picks")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
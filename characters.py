@@ -0,0 +1,83 @@
+class CharacterRegistry:
+    """
+    Every character interned once to a dense integer ID, shared by the chemistry index, the draft
+    store and the app. The pool (the Player Statistics characters, in sheet order) gets IDs
+    0 to len(pool) - 1, so pool order is ID order; characters that only appear in the chemistry
+    sheet come after it.
+
+    A set of characters is a bitset (a Python int with bit i set for ID i), so membership is a
+    bit test, removing a pick clears a bit and a whole pool fits in one int. A draft's state
+    holds its remaining players and captains this way (rosters and picks stay name lists, in
+    pick order); they are turned back into names for templates, forms, the JSON API and exports.
+    """
+
+    def __init__(self, names, pool_size):
+        self.names = list(names)  # ID -> character name
+        self.ids = {name: i for i, name in enumerate(self.names)}  # character name -> ID
+        self.pool_size = pool_size
+        self.pool_mask = (1 << pool_size) - 1
+
+    @classmethod
+    def from_names(cls, pool, *others):
+        """
+        Interns the pool first, then every name of the other lists not seen yet, in order.
+        """
+        names = list(dict.fromkeys(pool))
+        pool_size = len(names)
+        seen = set(names)
+        for other in others:
+            for name in other:
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+        return cls(names, pool_size)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    @property
+    def pool(self):
+        return self.names[:self.pool_size]
+
+    def mask(self, players):
+        """
+        Bitset of the given character names. Raises KeyError for a name it has never seen.
+        """
+        ids = self.ids
+        bits = 0
+        for player in players:
+            bits |= 1 << ids[player]
+        return bits
+
+    def members(self, bits):
+        """
+        Names of the characters in a bitset, in ID (so pool) order.
+        """
+        names = self.names
+        return [names[i] for i in bit_ids(bits)]
+
+    def has(self, bits, player):
+        # Whether player is in the bitset, False for a name it has never seen
+        i = self.ids.get(player)
+        return i is not None and bits >> i & 1 == 1
+
+def bit_ids(bits):
+    """
+    Returns the IDs set in a bitset, lowest first.
+    """
+    ids = []
+    while bits:
+        low = bits & -bits
+        ids.append(low.bit_length() - 1)
+        bits ^= low
+    return ids
+
+def encode_bits(bits):
+    # A bitset as a compact JSON-safe string (hex digits)
+    return format(bits, 'x')
+
+def decode_bits(text):
+    return int(text, 16)
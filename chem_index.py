@@ -0,0 +1,156 @@
+import math
+import weakref
+import numpy as np
+from characters import bit_ids
+
+class ChemIndex:
+    """
+    Precomputed chemistry lookup built once from the sortedmasterchem sheet.
+    Every character gets an integer ID and each Chemistry / Hate list is stored
+    as a bitset (a Python int with bit i set for character ID i), so team and
+    pool comparisons become AND + popcount instead of DataFrame scans.
+    """
+
+    def __init__(self, names, chemistry, hate, has_row):
+        self.names = names  # ID -> character name
+        self.ids = {name: i for i, name in enumerate(names)}  # character name -> ID
+        self.chem_bits = chemistry  # ID -> bitset of chemistry partners
+        self.hate_bits = hate  # ID -> bitset of hated players
+        self.has_row = has_row  # ID -> True if the character has its own row in the sheet
+        self._matrices = None
+
+    @classmethod
+    def from_dataframe(cls, df, names=()):
+        """
+        Builds the index from the chemistry sheet. names are interned first, in order (e.g. a
+        CharacterRegistry's, so the index's IDs are the registry's).
+        """
+        rows = list(zip(df['Character Name'], df['Chemistry'], df['Hate']))
+
+        # Intern every name that shows up anywhere, rows first so IDs follow the sheet order
+        names = list(names)
+        ids = {name: i for i, name in enumerate(names)}
+        def intern(name):
+            if name not in ids:
+                ids[name] = len(names)
+                names.append(name)
+            return ids[name]
+
+        for name, chemistry_list, hate_list in rows:
+            intern(name)
+        for name, chemistry_list, hate_list in rows:
+            for partner in _as_list(chemistry_list) + _as_list(hate_list):
+                intern(partner)
+
+        chemistry = [0] * len(names)
+        hate = [0] * len(names)
+        has_row = [False] * len(names)
+        for name, chemistry_list, hate_list in rows:
+            i = ids[name]
+            # Like the DataFrame lookups, only the first row for a name counts
+            if has_row[i]:
+                continue
+            has_row[i] = True
+            for partner in _as_list(chemistry_list):
+                chemistry[i] |= 1 << ids[partner]
+            for partner in _as_list(hate_list):
+                hate[i] |= 1 << ids[partner]
+
+        return cls(names, chemistry, hate, has_row)
+
+    def mask(self, players):
+        """
+        Returns the bitset of the given character names. Names the index has never
+        seen cannot appear in any Chemistry / Hate list, so they are skipped.
+        """
+        bits = 0
+        for player in players:
+            i = self.ids.get(player)
+            if i is not None:
+                bits |= 1 << i
+        return bits
+
+    def matrices(self):
+        """
+        Returns dense (chemistry, hate) adjacency matrices where [i, j] is 1 if j is on i's list.
+        They are float32 so the counts stay exact while matrix products go through BLAS.
+        """
+        if self._matrices is None:
+            n = len(self.names)
+            chemistry = np.zeros((n, n), dtype=np.float32)
+            hate = np.zeros((n, n), dtype=np.float32)
+            for i in range(n):
+                chemistry[i, bit_ids(self.chem_bits[i])] = 1
+                hate[i, bit_ids(self.hate_bits[i])] = 1
+            self._matrices = (chemistry, hate)
+        return self._matrices
+
+    def chemistry_with(self, player, players_mask):
+        i = self.ids.get(player)
+        if i is None:
+            return 0
+        return (self.chem_bits[i] & players_mask).bit_count()
+
+    def hate_with(self, player, players_mask):
+        i = self.ids.get(player)
+        if i is None:
+            return 0
+        return (self.hate_bits[i] & players_mask).bit_count()
+
+    def chemistry_metric(self, current_team, player, remaining_players, k=0.9, x0=4.5, neg_chem_weight=.5):
+        """
+        Bitset version of utils.calculate_chemistry_metric, returning the same numbers.
+        """
+        i = self.ids.get(player)
+        if i is None or not self.has_row[i]:
+            print(f"Warning: Player '{player}' not found in chemistry data. Assigning default chemistry score.")
+            return 0.0
+
+        team_size = len(current_team)
+        weight_current_team = 1 / (1 + math.exp(-k * (team_size - x0)))
+        weight_available_players = 1 - weight_current_team
+        weight_unique_chem = weight_available_players
+
+        team_mask = self.mask(current_team)
+        available_mask = self.mask(remaining_players) & ~(1 << i)
+        chemistry = self.chem_bits[i]
+        hate = self.hate_bits[i]
+
+        positive_chem_current_team = (chemistry & team_mask).bit_count()
+        negative_chem_current_team = (hate & team_mask).bit_count() * neg_chem_weight
+        positive_chem_available_players = (chemistry & available_mask).bit_count()
+        negative_chem_available_players = (hate & available_mask).bit_count() * neg_chem_weight
+
+        # The DataFrame version built the team's combined chemistry from a comprehension whose
+        # isinstance filter dropped every name, so the term is the player's distinct chemistry count
+        unique_chem = chemistry.bit_count()
+
+        chemistry_metric = (
+            weight_current_team * (positive_chem_current_team - negative_chem_current_team) +
+            weight_available_players * (positive_chem_available_players - negative_chem_available_players) +
+            weight_unique_chem * (unique_chem)
+        )
+
+        return round(chemistry_metric, 2)
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, set)) else []
+
+# Indexes already built, keyed by id() of the chemistry DataFrame (DataFrames are unhashable).
+# Entries are dropped when the frame is garbage collected so a reused id() never hits a stale index.
+_indexes = {}
+
+def get_chem_index(chem_data):
+    """
+    Returns the ChemIndex for a chemistry DataFrame, building it on first use.
+    Passing a ChemIndex returns it unchanged.
+    """
+    if isinstance(chem_data, ChemIndex):
+        return chem_data
+    key = id(chem_data)
+    index = _indexes.get(key)
+    if index is None:
+        index = ChemIndex.from_dataframe(chem_data)
+        _indexes[key] = index
+        weakref.finalize(chem_data, _indexes.pop, key, None)
+    return index
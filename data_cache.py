@@ -0,0 +1,240 @@
+import argparse
+import ast
+import hashlib
+import os
+import pickle
+
+# Directory of the source spreadsheets (DATA_DIR overrides it, e.g. for benchmarks on generated data)
+DATA_DIR = os.environ.get('DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Source spreadsheets, in the order load_data returns them
+SOURCES = {
+    'chem_data': 'sortedmasterchem.xlsx',
+    'player_stats': 'Player Statistics.xlsx',
+    'season_data': 'Season Data.xlsx',
+}
+
+# Later seasons, one Season Data style spreadsheet each, read in file name order after the
+# main Season Data sheet
+SEASONS_DIR = 'seasons'
+
+# Weight of a season relative to the next newer one when the seasons are combined
+# (1 counts every season alike)
+SEASON_DECAY = float(os.environ.get('SEASON_DECAY', '1'))
+
+SNAPSHOT_VERSION = 1
+SEASONS_VERSION = 2
+
+def cache_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, '.cache', 'snapshot.pkl')
+
+def tables_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, '.cache', 'tables')
+
+def seasons_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, '.cache', 'seasons.pkl')
+
+def season_files(data_dir=DATA_DIR):
+    """
+    Returns the season spreadsheets oldest first: Season Data, then data/seasons/*.xlsx by name.
+    """
+    directory = os.path.join(data_dir, SEASONS_DIR)
+    later = sorted(
+        os.path.join(SEASONS_DIR, filename) for filename in (os.listdir(directory) if os.path.isdir(directory) else [])
+        if filename.endswith('.xlsx') and not filename.startswith('~$')
+    )
+    return [SOURCES['season_data']] + later
+
+def source_signature(data_dir=DATA_DIR):
+    """
+    Returns {file name: (mtime_ns, size)} for the source spreadsheets.
+    """
+    signature = {}
+    for filename in SOURCES.values():
+        stat = os.stat(os.path.join(data_dir, filename))
+        signature[filename] = (stat.st_mtime_ns, stat.st_size)
+    return signature
+
+def source_hashes(data_dir=DATA_DIR):
+    """
+    Returns {file name: sha256 hex digest} for the source spreadsheets.
+    """
+    hashes = {}
+    for filename in SOURCES.values():
+        with open(os.path.join(data_dir, filename), 'rb') as f:
+            hashes[filename] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+def read_sources(data_dir=DATA_DIR):
+    """
+    Reads the spreadsheets with pandas and converts Chemistry and Hate to python lists.
+    """
+    import pandas as pd
+
+    chem_data = pd.read_excel(os.path.join(data_dir, SOURCES['chem_data']))
+    player_stats = pd.read_excel(os.path.join(data_dir, SOURCES['player_stats']))
+    season_data = pd.read_excel(os.path.join(data_dir, SOURCES['season_data']))
+
+    # Convert Chemistry and Hate to python list instead of string
+    chem_data['Chemistry'] = chem_data['Chemistry'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
+    chem_data['Hate'] = chem_data['Hate'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
+
+    return chem_data, player_stats, season_data
+
+def build_snapshot(data_dir=DATA_DIR):
+    """
+    Reads the spreadsheets and writes the parsed DataFrames to the snapshot file.
+    """
+    frames = read_sources(data_dir)
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'signature': source_signature(data_dir),
+        'hashes': source_hashes(data_dir),
+        'frames': frames,
+    }
+    _write_snapshot(snapshot, data_dir)
+    return frames
+
+def load_data(data_dir=DATA_DIR, rebuild=False):
+    """
+    Returns (chem_data, player_stats, season_data) from the snapshot, rebuilding it first
+    if it is missing, from an older format, or any spreadsheet changed since it was built.
+    A spreadsheet whose mtime changed but whose contents did not (e.g. after a checkout)
+    only refreshes the stored signature.
+    """
+    if not rebuild:
+        snapshot = _read_snapshot(data_dir)
+        if snapshot is not None:
+            signature = source_signature(data_dir)
+            if snapshot['signature'] == signature:
+                return snapshot['frames']
+            if snapshot['hashes'] == source_hashes(data_dir):
+                snapshot['signature'] = signature
+                _write_snapshot(snapshot, data_dir)
+                return snapshot['frames']
+    return build_snapshot(data_dir)
+
+def load_seasons(data_dir=DATA_DIR, decay=SEASON_DECAY, rebuild=False):
+    """
+    Returns SeasonStats combining every season spreadsheet (see season_files), each weighted
+    decay times the next newer one.
+
+    Each season is grouped once into a SeasonRollup kept in the seasons cache with the
+    file's signature, so adding a season only reads the new spreadsheet and changing the
+    decay reads none.
+    """
+    from seasons import SeasonRollup, SeasonRollups
+
+    cached = {} if rebuild else _read_pickle(seasons_path(data_dir), SEASONS_VERSION) or {}
+    cached = cached.get('rollups', {})
+    rollups = SeasonRollups()
+    entries = {}
+    for filename in season_files(data_dir):
+        signature = _file_signature(data_dir, filename)
+        entry = cached.get(filename)
+        if entry is None or entry[0] != signature:
+            if filename == SOURCES['season_data']:
+                season_data = load_data(data_dir)[2]
+            else:
+                import pandas as pd
+
+                season_data = pd.read_excel(os.path.join(data_dir, filename))
+            entry = (signature, SeasonRollup.from_frame(os.path.splitext(os.path.basename(filename))[0], season_data))
+        entries[filename] = entry
+        rollups.add(entry[1])
+    if entries != cached:
+        _write_pickle(seasons_path(data_dir), {'version': SEASONS_VERSION, 'rollups': entries})
+    return rollups.aggregate(decay)
+
+def load_tables(data_dir=DATA_DIR, rebuild=False):
+    """
+    Returns the compiled CharacterTables, memory-mapped so worker processes share them,
+    compiling them from load_data() and load_seasons() first if they are missing, from an
+    older format, or any spreadsheet or the season decay changed since they were compiled.
+    """
+    from tables import CharacterTables
+
+    path = tables_path(data_dir)
+    signature = _tables_signature(data_dir)
+    if not rebuild:
+        loaded = CharacterTables.load(path)
+        if loaded is not None and loaded[1].get('signature') == signature and loaded[1].get('season_decay') == SEASON_DECAY:
+            return loaded[0]
+
+    chem_data, player_stats, _ = load_data(data_dir)
+    tables = CharacterTables.from_frames(chem_data, player_stats, load_seasons(data_dir, rebuild=rebuild))
+    tables.save(path, meta={'signature': signature, 'season_decay': SEASON_DECAY})
+    # Map the saved copy; if another process replaced it meanwhile keep the in-memory one
+    loaded = CharacterTables.load(path)
+    return loaded[0] if loaded is not None else tables
+
+def cache_status(data_dir=DATA_DIR):
+    """
+    Returns {cache path: whether it is up to date} for the snapshot, the seasons cache and the
+    compiled tables, by the same tests load_data(), load_seasons() and load_tables() use to
+    decide whether to rebuild them (a snapshot only needs the spreadsheets' contents to match).
+    """
+    from tables import CharacterTables
+
+    snapshot = _read_snapshot(data_dir)
+    seasons = _read_pickle(seasons_path(data_dir), SEASONS_VERSION)
+    rollups = (seasons or {}).get('rollups', {})
+    tables = CharacterTables.load(tables_path(data_dir))
+    return {
+        cache_path(data_dir): snapshot is not None and snapshot['hashes'] == source_hashes(data_dir),
+        seasons_path(data_dir): seasons is not None and list(rollups) == season_files(data_dir) and all(
+            entry[0] == _file_signature(data_dir, filename) for filename, entry in rollups.items()),
+        tables_path(data_dir): tables is not None and tables[1].get('signature') == _tables_signature(data_dir) and
+            tables[1].get('season_decay') == SEASON_DECAY,
+    }
+
+def _file_signature(data_dir, filename):
+    stat = os.stat(os.path.join(data_dir, filename))
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _tables_signature(data_dir):
+    # The compiled tables depend on every spreadsheet, the seasons included (lists, as in meta.json)
+    signature = {filename: list(value) for filename, value in source_signature(data_dir).items()}
+    for filename in season_files(data_dir):
+        signature[filename] = list(_file_signature(data_dir, filename))
+    return signature
+
+def _read_snapshot(data_dir):
+    return _read_pickle(cache_path(data_dir), SNAPSHOT_VERSION)
+
+def _write_snapshot(snapshot, data_dir):
+    _write_pickle(cache_path(data_dir), snapshot)
+
+def _read_pickle(path, version):
+    try:
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(value, dict) or value.get('version') != version:
+        return None
+    return value
+
+def _write_pickle(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file and swap it in so concurrent readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the cached snapshot of the data/*.xlsx spreadsheets, the season rollups and the compiled character tables.")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the source spreadsheets")
+    parser.add_argument('--check', action='store_true', help="only report whether the snapshot, season rollups and tables are up to date")
+    args = parser.parse_args()
+
+    if args.check:
+        status = cache_status(args.data_dir)
+        for path, fresh in status.items():
+            print(f"{path} is {'up to date' if fresh else 'stale'}")
+        raise SystemExit(0 if all(status.values()) else 1)
+
+    build_snapshot(args.data_dir)
+    load_tables(args.data_dir, rebuild=True)
+    print(f"Rebuilt {cache_path(args.data_dir)}, {seasons_path(args.data_dir)} and {tables_path(args.data_dir)}")
@@ -0,0 +1,228 @@
+import random
+
+class Draft:
+    """
+    Non-interactive snake draft with the same captain rules as the app and draft.py:
+    once the number of teams missing a captain equals the number of captains left,
+    a team without a captain must pick one and a team with a captain cannot.
+
+    Picks are made with pick(player); run_draft drives it with strategy functions.
+    If scores (a DraftScores) is given it is kept up to date with every pick.
+    """
+
+    def __init__(self, teams, pool, captains, chem_index=None, scores=None, rng=None):
+        self.teams = {team: list(roster) for team, roster in (teams.items() if isinstance(teams, dict) else ((team, []) for team in teams))}
+        self.pool = list(dict.fromkeys(pool))
+        self.captains = set(captains)
+        drafted = {player for roster in self.teams.values() for player in roster}
+        # Ordered dict used as an ordered set, so removing a pick is O(1) and pool order is kept
+        self.remaining = dict.fromkeys(player for player in self.pool if player not in drafted)
+        self.remaining_captains = {player for player in self.remaining if player in self.captains}
+        self.teams_with_captain = {team: any(player in self.captains for player in roster) for team, roster in self.teams.items()}
+        self.teams_missing_captain = sum(not has_captain for has_captain in self.teams_with_captain.values())
+        self.draft_order = list(self.teams)
+        self.turn = 0  # Index of the team on the clock in draft_order
+        self.picks = []  # (team, player) in draft order
+        self.scores = scores
+        self.chem_index = chem_index if chem_index is not None or scores is None else scores.table.chem_index
+        self.rng = rng if rng is not None else random.Random()
+        self.strategy_state = {}  # Scratch space for strategies that keep per-draft state
+
+    def copy(self, rng=None):
+        """
+        Independent copy of the draft's state for playing out hypothetical picks.
+        The copy does not carry the DraftScores (it is expensive to copy) or strategy state.
+        """
+        draft = Draft.__new__(Draft)
+        draft.teams = {team: list(roster) for team, roster in self.teams.items()}
+        draft.pool = self.pool
+        draft.captains = self.captains
+        draft.remaining = dict(self.remaining)
+        draft.remaining_captains = set(self.remaining_captains)
+        draft.teams_with_captain = dict(self.teams_with_captain)
+        draft.teams_missing_captain = self.teams_missing_captain
+        draft.draft_order = list(self.draft_order)
+        draft.turn = self.turn
+        draft.picks = list(self.picks)
+        draft.scores = None
+        draft.chem_index = self.chem_index
+        draft.rng = rng if rng is not None else random.Random()
+        draft.strategy_state = {}
+        return draft
+
+    @property
+    def current_team(self):
+        return self.draft_order[self.turn]
+
+    @property
+    def done(self):
+        return not self.remaining
+
+    def must_pick_captain(self):
+        return self.teams_missing_captain == len(self.remaining_captains)
+
+    def is_legal(self, team, player):
+        if player not in self.remaining:
+            return False
+        if self.must_pick_captain() and self.remaining_captains:
+            # A team without a captain must take one, a team with one cannot take another
+            return (player in self.remaining_captains) != self.teams_with_captain[team]
+        return True
+
+    def legal_picks(self, team=None):
+        """
+        Remaining players team may pick, in pool order. When the captain rule leaves no
+        legal pick (only captains left for a team that has one) every remaining player is allowed.
+        """
+        team = self.current_team if team is None else team
+        picks = [player for player in self.remaining if self.is_legal(team, player)]
+        return picks or list(self.remaining)
+
+    def pick(self, player):
+        """
+        Drafts player for the team on the clock and advances the snake order.
+        Returns the team that picks next.
+        """
+        team = self.current_team
+        if player not in self.remaining:
+            raise ValueError(f"{player} is not available")
+        if not self.is_legal(team, player) and any(self.is_legal(team, other) for other in self.remaining):
+            if self.teams_with_captain[team]:
+                raise ValueError(f"Team {team} already has a captain and cannot draft another captain")
+            raise ValueError(f"Team {team} must pick a captain")
+
+        self.teams[team].append(player)
+        del self.remaining[player]
+        if player in self.remaining_captains:
+            self.remaining_captains.discard(player)
+            if not self.teams_with_captain[team]:
+                self.teams_with_captain[team] = True
+                self.teams_missing_captain -= 1
+        self.picks.append((team, player))
+        if self.scores is not None:
+            self.scores.apply_pick(team, player)
+
+        self.turn = advance_turn(self.draft_order, self.turn)
+        return self.current_team
+
+def advance_turn(draft_order, turn):
+    """
+    Returns the turn after turn (an index in draft_order). Snake draft: after the last team the
+    order reverses, in place, and that team picks again.
+    """
+    if turn == len(draft_order) - 1:
+        draft_order.reverse()
+        return 0
+    return turn + 1
+
+def upcoming_teams(draft_order, turn, count):
+    """
+    The next count teams on the clock, starting with draft_order[turn], following the snake order.
+    """
+    order = list(draft_order)
+    teams = []
+    for _ in range(count):
+        teams.append(order[turn])
+        turn = advance_turn(order, turn)
+    return teams
+
+def run_draft(draft, strategies):
+    """
+    Plays draft to the end. strategies is one strategy for every team or a dict of team -> strategy,
+    where a strategy is called as strategy(draft, team) and returns the player to pick.
+    """
+    while not draft.done:
+        team = draft.current_team
+        strategy = strategies[team] if isinstance(strategies, dict) else strategies
+        draft.pick(strategy(draft, team))
+    return draft.teams
+
+# Pick strategies
+
+def random_pick(draft, team):
+    """
+    Picks a random legal player using the draft's rng.
+    """
+    remaining = list(draft.remaining)
+    player = remaining[int(draft.rng.random() * len(remaining))]
+    if draft.is_legal(team, player):
+        return player
+    # Only while the captain rule is in force does the legal list have to be built
+    return draft.rng.choice(draft.legal_picks(team))
+
+def best_score(draft, team):
+    """
+    Picks the legal player with the highest calculate_scores total (needs draft.scores).
+    """
+    k = 8
+    while True:
+        for player, *_ in draft.scores.top(team, k):
+            if draft.is_legal(team, player):
+                return player
+        if k >= draft.scores.remaining_count:
+            return draft.legal_picks(team)[0]
+        k *= 4
+
+def best_chemistry(draft, team):
+    """
+    Picks the legal player with the most chemistry minus hate with the team's roster,
+    breaking ties by the player's total number of chemistry partners (needs draft.chem_index).
+    """
+    chem_index = draft.chem_index
+    team_mask = chem_index.mask(draft.teams[team])
+    best_player = None
+    best_key = None
+    for player in draft.legal_picks(team):
+        i = chem_index.ids.get(player)
+        if i is None:
+            key = (0, 0)
+        else:
+            chemistry = chem_index.chem_bits[i]
+            key = ((chemistry & team_mask).bit_count() - (chem_index.hate_bits[i] & team_mask).bit_count(), chemistry.bit_count())
+        if best_key is None or key > best_key:
+            best_player, best_key = player, key
+    return best_player
+
+def by_ranking(ranking):
+    """
+    Returns a strategy that takes the first legal player of a precomputed ranking
+    (e.g. players sorted once by calculate_scores). This is the fastest strategy.
+    """
+    key = object()
+
+    def ranked_pick(draft, team):
+        remaining = draft.remaining
+        # Everything before the cursor has been drafted, so each draft scans the ranking about once
+        start = draft.strategy_state.get(key, 0)
+        while start < len(ranking) and ranking[start] not in remaining:
+            start += 1
+        draft.strategy_state[key] = start
+        for player in ranking[start:]:
+            if draft.is_legal(team, player):
+                return player
+        return draft.legal_picks(team)[0]
+    return ranked_pick
+
+def among_best(n):
+    """
+    Returns a strategy that picks at random among the n legal players with the highest
+    calculate_scores total (needs draft.scores), like a manager choosing from the top
+    recommendations.
+    """
+    def pick_among_best(draft, team):
+        k = max(8, n)
+        while True:
+            best = [player for player, *_ in draft.scores.top(team, k) if draft.is_legal(team, player)][:n]
+            if len(best) == n or k >= draft.scores.remaining_count:
+                break
+            k *= 4
+        if not best:
+            return draft.legal_picks(team)[0]
+        return best[int(draft.rng.random() * len(best))]
+    return pick_among_best
+
+STRATEGIES = {
+    'random': random_pick,
+    'best_score': best_score,
+    'best_chemistry': best_chemistry,
+}
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+
+from draft_registry import must_pick_captain
+
+class DraftFeed:
+    """
+    Live pick events for spectators of a draft.
+
+    A draft's events are its picks: event n is state['picks'][n], so a viewer only needs the
+    number of picks it has seen to catch up, and reconnecting (Last-Event-ID) resumes exactly.
+    When picks are undone the viewer gets the whole board again instead.
+    A pick made in this process wakes its viewers at once through publish(). Picks made by
+    other worker processes are found by reloading the draft from the store, at most once per
+    poll_interval per draft, however many viewers are waiting on it.
+    """
+
+    def __init__(self, load_state, characters, poll_interval=1.0):
+        self.load_state = load_state  # load_state(draft_id) -> state, or None once the draft is gone
+        self.characters = characters  # CharacterRegistry naming the state's player bitsets
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._latest = {}  # draft_id -> (state, time loaded)
+        self._viewers = {}  # draft_id -> number of open streams
+
+    def publish(self, draft_id, state):
+        """
+        Wakes the draft's viewers after this process saved a new state (None when the draft was deleted).
+        """
+        with self._condition:
+            if draft_id in self._viewers:
+                self._latest[draft_id] = (state, time.monotonic())
+            self._condition.notify_all()
+
+    def current(self, draft_id):
+        # The draft's state, reloaded from the store when the shared copy is older than poll_interval
+        with self._condition:
+            cached = self._latest.get(draft_id)
+        if cached is not None and time.monotonic() - cached[1] < self.poll_interval:
+            return cached[0]
+        state = self.load_state(draft_id)
+        with self._condition:
+            if draft_id in self._viewers:
+                self._latest[draft_id] = (state, time.monotonic())
+        return state
+
+    def wait(self, draft_id, seen, timeout):
+        """
+        Waits up to timeout seconds for the draft's picks to differ from seen, the picks sent so far.
+        Returns (state, picks), state None if the draft no longer exists.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self.current(draft_id)
+            if state is None:
+                return None, []
+            picks = state.get('picks', [])
+            remaining = deadline - time.monotonic()
+            if picks != seen or remaining <= 0:
+                return state, picks
+            with self._condition:
+                self._condition.wait(min(remaining, self.poll_interval))
+
+    def stream(self, draft_id, seen=0, heartbeat=15.0):
+        """
+        Server-sent events for the draft, starting after the first seen picks: a 'pick' event
+        per pick, with its number as the event id, an 'undo' event with the whole board_state
+        when picks the viewer has were taken back, and a 'reset' event if the draft is deleted.
+        """
+        with self._condition:
+            self._viewers[draft_id] = self._viewers.get(draft_id, 0) + 1
+        try:
+            yield "retry: 2000\n\n"
+            state = self.current(draft_id)
+            sent = None if state is None or seen > len(state.get('picks', [])) else state['picks'][:seen]
+            while True:
+                if sent is None:
+                    # The viewer has picks the draft no longer has, it needs the board as it is now
+                    state, picks = self.wait(draft_id, None, 0)
+                else:
+                    state, picks = self.wait(draft_id, sent, heartbeat)
+                if state is None:
+                    yield format_event('reset', {})
+                    return
+                if sent is None or picks[:len(sent)] != sent:
+                    sent = list(picks)
+                    yield format_event('undo', board_state(draft_id, state, self.characters), event_id=len(picks))
+                    continue
+                if len(picks) == len(sent):
+                    yield ": keep-alive\n\n"
+                for number in range(len(sent), len(picks)):
+                    team, player = picks[number]
+                    sent.append(picks[number])
+                    yield format_event('pick', pick_event(state, number, team, player), event_id=number + 1)
+        finally:
+            with self._condition:
+                self._viewers[draft_id] -= 1
+                if not self._viewers[draft_id]:
+                    del self._viewers[draft_id]
+                    self._latest.pop(draft_id, None)
+
+def pick_event(state, number, team, player):
+    """
+    The change to the board made by pick number (0-based): player leaves the pool and joins team.
+    """
+    picks = state.get('picks', [])
+    # The team on the clock after this pick is the one that made the next pick, or is on the clock now
+    next_team = picks[number + 1][0] if number + 1 < len(picks) else state.get('on_clock')
+    return {
+        'pick': number + 1,
+        'team': team,
+        'player': player,
+        'next_team': next_team,
+    }
+
+def board_state(draft_id, state, characters):
+    """
+    The initial state a live board starts from, with 'pick' the number of picks made so far,
+    the remaining players and captains by name (in pool order) and whether the team on the
+    clock must pick a captain.
+    """
+    return {
+        'draft_id': draft_id,
+        'version': state.get('version', 0),
+        'pick': len(state.get('picks', [])),
+        'event': state.get('head', 0),  # Events in the draft's log applied to this state
+        'events': state.get('log_length', 0),
+        'on_clock': state.get('on_clock'),
+        'teams': state['teams'],
+        'remaining_players': characters.members(state['remaining_players']),
+        'remaining_captains': characters.members(state['remaining_captains']),
+        'must_pick_captain': must_pick_captain(state),
+        'teams_with_captain': state['teams_with_captain'],
+        'draft_order': state['draft_order'],
+        'cf_players': state.get('cf_players', {}),
+    }
+
+def format_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
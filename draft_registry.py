@@ -0,0 +1,252 @@
+import copy
+import threading
+
+from draft_engine import advance_turn
+from draft_store import DraftConflict
+
+class PickError(ValueError):
+    """
+    A pick the draft rules do not allow. category is the flash category to show it with.
+    """
+
+    def __init__(self, message, category='error'):
+        super().__init__(message)
+        self.category = category
+
+class StaleDraft(Exception):
+    """
+    The draft changed since the client loaded it (e.g. the same pick submitted twice).
+    """
+
+# A snapshot of the state is stored every this many events, so rebuilding any earlier state
+# replays at most this many events
+SNAPSHOT_INTERVAL = 16
+
+# State keys that describe the log itself rather than the draft, not part of snapshots
+LOG_KEYS = ('version', 'head', 'log_length')
+
+class DraftRegistry:
+    """
+    Every draft (league) the app is running, each with its own teams, kept in a DraftStore.
+
+    Changes go through update(): the draft is loaded, changed and saved back only if nobody
+    saved it in between (the store's version check), retrying on a conflict. That is what
+    keeps picks consistent across worker processes. Within a process, changes to the same
+    draft also take that draft's lock, so threads queue instead of retrying, while changes
+    to different drafts go ahead in parallel.
+
+    Every pick and CF designation is also recorded as an event in the draft's append-only
+    log (record()), with a snapshot of the state every SNAPSHOT_INTERVAL events. The stored
+    state is the log replayed up to state['head'], so undo() moves the head back by rebuilding
+    from the nearest snapshot and redo() replays the next event. Recording a new event after
+    an undo drops the undone ones. state_at() rebuilds the draft as it was after any event.
+    """
+
+    def __init__(self, store, lock_stripes=64, retries=5):
+        self.store = store
+        self.retries = retries
+        # A fixed set of locks shared out by draft_id, so there is nothing to clean up per draft
+        self._locks = [threading.RLock() for _ in range(lock_stripes)]
+
+    def lock(self, draft_id):
+        return self._locks[hash(draft_id) % len(self._locks)]
+
+    def create(self, state):
+        state['version'] = 0
+        state['head'] = state['log_length'] = 0
+        return self.store.create(state, log={'snapshots': [(0, _snapshot(state))]})
+
+    def load(self, draft_id):
+        return self.store.load(draft_id)
+
+    def delete(self, draft_id):
+        with self.lock(draft_id):
+            self.store.delete(draft_id)
+
+    def update(self, draft_id, change, expected_version=None):
+        """
+        Applies change(state) to the draft and saves it, returning (state, change's result).
+        Raises KeyError if the draft does not exist, StaleDraft if it is no longer at
+        expected_version, and whatever change raises (nothing is saved then).
+        """
+        return self._update(draft_id, lambda state: (change(state), None), expected_version)
+
+    def record(self, draft_id, event, expected_version=None):
+        """
+        Applies event (['pick', team, player] or ['cf', team, player]) to the draft and appends
+        it to the log. Returns (state, apply_event's result), raising like update(). A pick must
+        be the team on the clock's.
+        """
+        def change(state):
+            # Checked here rather than in apply_pick, which also replays logged events
+            on_clock = state.get('on_clock')
+            if event[0] == 'pick' and on_clock is not None and event[1] != on_clock:
+                raise PickError(f"It is {on_clock}'s turn to pick!", 'warning')
+            log = {'events': [], 'snapshots': []}
+            if 'head' not in state:
+                # A draft from before the log, its history starts at its current state
+                state['head'] = state['log_length'] = 0
+                log['snapshots'].append((0, _snapshot(state)))
+            head = state['head']
+            recorded = list(event)
+            result = apply_event(state, recorded, self.store.registry)
+            if head < state['log_length']:
+                log['truncate'] = head  # Recording after an undo drops the undone events
+            seq = head + 1
+            log['events'].append((seq, recorded))
+            if seq % SNAPSHOT_INTERVAL == 0:
+                log['snapshots'].append((seq, _snapshot(state)))
+            state['head'] = state['log_length'] = seq
+            return result, log
+
+        return self._update(draft_id, change, expected_version)
+
+    def undo(self, draft_id, expected_version=None):
+        """
+        Takes back the draft's last event. Returns (state, the undone event).
+        """
+        def change(state):
+            head = state.get('head', 0)
+            if head == 0:
+                raise PickError("Nothing to undo!", 'warning')
+            event = self.store.events(draft_id, head - 1, head)[0]
+            _replace(state, self._rebuild(draft_id, head - 1))
+            state['head'] = head - 1
+            return event, None
+
+        return self._update(draft_id, change, expected_version)
+
+    def redo(self, draft_id, expected_version=None):
+        """
+        Replays the last undone event. Returns (state, the redone event).
+        """
+        def change(state):
+            head = state.get('head', 0)
+            if head >= state.get('log_length', 0):
+                raise PickError("Nothing to redo!", 'warning')
+            event = self.store.events(draft_id, head, head + 1)[0]
+            apply_event(state, event, self.store.registry)
+            state['head'] = head + 1
+            return event, None
+
+        return self._update(draft_id, change, expected_version)
+
+    def state_at(self, draft_id, seq):
+        """
+        The draft's state after its first seq events, rebuilt from the nearest snapshot.
+        Raises KeyError if the draft does not exist and ValueError if seq is not in its log.
+        """
+        state = self.store.load(draft_id)
+        if state is None:
+            raise KeyError(draft_id)
+        if not 0 <= seq <= state.get('log_length', 0):
+            raise ValueError(f"event {seq} is not in the draft's log")
+        if seq == state.get('head', 0):
+            return state
+        rebuilt = self._rebuild(draft_id, seq)
+        rebuilt.update({key: state[key] for key in LOG_KEYS if key in state})
+        rebuilt['head'] = seq
+        return rebuilt
+
+    def _rebuild(self, draft_id, seq):
+        # O(events since the snapshot): the latest snapshot at or before seq, plus the events after it
+        snapshot_seq, state = self.store.snapshot(draft_id, seq)
+        for event in self.store.events(draft_id, snapshot_seq, seq):
+            apply_event(state, event, self.store.registry)
+        return state
+
+    def _update(self, draft_id, change, expected_version):
+        # change(state) -> (result, log changes to save with the state, or None)
+        with self.lock(draft_id):
+            for _ in range(self.retries):
+                state = self.store.load(draft_id)
+                if state is None:
+                    raise KeyError(draft_id)
+                version = state.get('version', 0)
+                if expected_version is not None and version != expected_version:
+                    raise StaleDraft(draft_id)
+                result, log = change(state)
+                state['version'] = version + 1
+                try:
+                    self.store.save(draft_id, state, expected_version=version, log=log)
+                except DraftConflict:
+                    continue  # Another process saved first, redo the change on its state
+                return state, result
+        raise DraftConflict(draft_id)
+
+def must_pick_captain(state):
+    # Once as many teams lack a captain as there are captains left, captains are reserved for them
+    teams_missing_captain = [t for t, has_captain in state['teams_with_captain'].items() if not has_captain]
+    return len(teams_missing_captain) == state['remaining_captains'].bit_count()
+
+def apply_pick(state, team, pick, characters):
+    """
+    Drafts pick for team in state, enforcing the captain rules, and returns the team picking next.
+    The remaining players and captains are bitsets of characters' (a CharacterRegistry) IDs.
+    """
+    teams_with_captain = state['teams_with_captain']
+    draft_order = state['draft_order']
+
+    # Ensure the pick is valid
+    if team not in state['teams'] or not characters.has(state['remaining_players'], pick):
+        raise PickError("Invalid pick!")
+    bit = 1 << characters.ids[pick]
+    captain = (state['remaining_captains'] & bit) != 0
+
+    # **STRICT CAPTAIN SELECTION RULES**
+    if must_pick_captain(state):
+        # If the team does not have a captain, they MUST pick a captain
+        if not teams_with_captain[team] and not captain:
+            raise PickError("You must pick a captain!", 'warning')
+        # If the team already has a captain, they CANNOT pick another captain
+        elif teams_with_captain[team] and captain:
+            raise PickError("You already have a captain and cannot pick another!")
+
+    # Assign pick to the team
+    state['teams'][team].append(pick)
+    state['remaining_players'] &= ~bit
+    if captain:
+        teams_with_captain[team] = True
+        state['remaining_captains'] &= ~bit
+
+    # Determine the next team for the draft (snake order, like the draft engine)
+    next_team = draft_order[advance_turn(draft_order, draft_order.index(team))]
+
+    state.setdefault('picks', []).append([team, pick])
+    state['on_clock'] = next_team
+    return next_team
+
+def designate_cf(state, team, player):
+    """
+    Makes player, who must be on team's roster, team's center fielder.
+    """
+    if team not in state['teams'] or player not in state['teams'][team]:
+        raise PickError("Invalid center fielder!")
+    state.setdefault('cf_players', {})[team] = player
+
+def apply_event(state, event, characters):
+    """
+    Applies a logged event to state: ['pick', team, player, captain] or ['cf', team, player].
+    A pick event being recorded gets its captain flag filled in. Returns the team picking
+    next for a pick, None for a CF designation.
+    """
+    kind, team, player = event[:3]
+    if kind == 'pick':
+        captain = characters.has(state['remaining_captains'], player)
+        next_team = apply_pick(state, team, player, characters)
+        del event[3:]
+        event.append(int(captain))
+        return next_team
+    if kind == 'cf':
+        designate_cf(state, team, player)
+        return None
+    raise ValueError(f"Unknown draft event: {kind}")
+
+def _snapshot(state):
+    return {key: copy.deepcopy(value) for key, value in state.items() if key not in LOG_KEYS}
+
+def _replace(state, new_state):
+    # Swaps the draft part of state for new_state, keeping the log keys
+    for key in [key for key in state if key not in LOG_KEYS]:
+        del state[key]
+    state.update({key: value for key, value in new_state.items() if key not in LOG_KEYS})
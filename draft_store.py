@@ -0,0 +1,299 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+from characters import CharacterRegistry, encode_bits, decode_bits
+
+# State keys holding sets of players as CharacterRegistry ID bitsets, lists of player names,
+# and dicts of team -> player name(s)
+PLAYER_SETS = ('remaining_players', 'remaining_captains')
+TEAM_PLAYER_LISTS = ('teams',)
+TEAM_PLAYERS = ('cf_players',)
+PICK_LISTS = ('picks',)  # [[team, player], ...] in draft order
+
+class DraftConflict(Exception):
+    """
+    Raised by DraftStore.save when the stored draft is no longer at the expected version.
+    """
+
+class DraftStore:
+    """
+    Server-side storage for draft state, so the session cookie only carries the draft_id.
+
+    A state is a dict with 'teams' {team: [players]}, 'remaining_players' and
+    'remaining_captains' (bitsets of the character IDs, see CharacterRegistry),
+    'teams_with_captain' {team: bool}, 'draft_order' [teams], 'cf_players' {team: player},
+    'picks' [[team, player]] in draft order, 'on_clock' (the team picking next) and 'version'
+    (bumped by every change, for optimistic concurrency). Players are stored as their IDs in the
+    CharacterRegistry the store was created with (the pool's IDs are its positions): rosters as
+    lists of IDs and the bitsets as hex strings, so a stored draft is a small JSON document.
+    Subclasses only move those documents.
+
+    Next to the state, each draft has an event log (events [kind, team, player, ...] numbered
+    from 1) and snapshots of the state after some of the events, written together with the
+    state by save(..., log=...). See DraftRegistry for how they are used.
+    """
+
+    def __init__(self, characters):
+        # characters is a CharacterRegistry, or the pool's names
+        if not isinstance(characters, CharacterRegistry):
+            characters = CharacterRegistry.from_names(characters)
+        self.registry = characters
+        self.players = characters.pool
+        self.player_ids = characters.ids
+
+    def create(self, state, log=None):
+        draft_id = str(uuid.uuid4())
+        self.save(draft_id, state, log=log)
+        return draft_id
+
+    def load(self, draft_id):
+        """
+        Returns the draft's state, or None if the draft does not exist.
+        """
+        payload = self._get(draft_id)
+        if payload is None:
+            return None
+        return self.decode(payload)
+
+    def save(self, draft_id, state, expected_version=None, log=None):
+        """
+        Stores state. With expected_version the write only happens if the stored draft is still
+        at that version (compare-and-swap), otherwise DraftConflict is raised.
+
+        log changes the draft's event log in the same write: {'truncate': n} drops the events
+        and snapshots after event n, {'events': [(n, event)]} appends events and
+        {'snapshots': [(n, state)]} stores the state after event n.
+        """
+        if log is not None:
+            log = {
+                'truncate': log.get('truncate'),
+                'events': [(seq, self.encode_event(event)) for seq, event in log.get('events', [])],
+                'snapshots': [(seq, self.encode(snapshot)) for seq, snapshot in log.get('snapshots', [])],
+            }
+        self._put(draft_id, self.encode(state), state.get('version', 0), expected_version, log)
+
+    def events(self, draft_id, after, until):
+        """
+        Returns the draft's events after event number after, up to and including until, in order.
+        """
+        return [self.decode_event(payload) for payload in self._events(draft_id, after, until)]
+
+    def snapshot(self, draft_id, at_most):
+        """
+        Returns (n, state) for the latest snapshot taken after an event n <= at_most, or None.
+        """
+        stored = self._snapshot(draft_id, at_most)
+        if stored is None:
+            return None
+        return stored[0], self.decode(stored[1])
+
+    def delete(self, draft_id):
+        self._delete(draft_id)
+
+    def encode(self, state):
+        ids = self.player_ids
+        encoded = dict(state)
+        for key in PLAYER_SETS:
+            encoded[key] = encode_bits(state.get(key, 0))
+        for key in TEAM_PLAYER_LISTS:
+            encoded[key] = {team: [ids[player] for player in players] for team, players in state.get(key, {}).items()}
+        for key in TEAM_PLAYERS:
+            encoded[key] = {team: ids[player] for team, player in state.get(key, {}).items()}
+        for key in PICK_LISTS:
+            encoded[key] = [[team, ids[player]] for team, player in state.get(key, [])]
+        return json.dumps(encoded, separators=(',', ':'))
+
+    def decode(self, payload):
+        players = self.registry.names
+        state = json.loads(payload)
+        for key in PLAYER_SETS:
+            value = state.get(key, '0')
+            # Drafts stored before the bitsets have lists of IDs
+            state[key] = sum(1 << i for i in set(value)) if isinstance(value, list) else decode_bits(value)
+        for key in TEAM_PLAYER_LISTS:
+            state[key] = {team: [players[i] for i in ids] for team, ids in state.get(key, {}).items()}
+        for key in TEAM_PLAYERS:
+            state[key] = {team: players[i] for team, i in state.get(key, {}).items()}
+        for key in PICK_LISTS:
+            state[key] = [[team, players[i]] for team, i in state.get(key, [])]
+        return state
+
+    def encode_event(self, event):
+        kind, team, player, *rest = event
+        return json.dumps([kind, team, self.player_ids[player], *rest], separators=(',', ':'))
+
+    def decode_event(self, payload):
+        kind, team, player, *rest = json.loads(payload)
+        return [kind, team, self.registry.names[player], *rest]
+
+    def _get(self, draft_id):
+        raise NotImplementedError
+
+    def _put(self, draft_id, payload, version, expected_version, log):
+        raise NotImplementedError
+
+    def _delete(self, draft_id):
+        raise NotImplementedError
+
+    def _events(self, draft_id, after, until):
+        raise NotImplementedError
+
+    def _snapshot(self, draft_id, at_most):
+        raise NotImplementedError
+
+class MemoryDraftStore(DraftStore):
+    """
+    Keeps drafts in a dict. Only shared by the threads of a single process.
+    """
+
+    def __init__(self, characters):
+        super().__init__(characters)
+        self._drafts = {}  # draft_id -> (version, payload)
+        self._events_by_draft = {}  # draft_id -> [event payloads], event n at index n - 1
+        self._snapshots = {}  # draft_id -> {n: state payload}
+        self._lock = threading.Lock()
+
+    def _get(self, draft_id):
+        with self._lock:
+            stored = self._drafts.get(draft_id)
+        return None if stored is None else stored[1]
+
+    def _put(self, draft_id, payload, version, expected_version, log):
+        with self._lock:
+            if expected_version is not None:
+                stored = self._drafts.get(draft_id)
+                if stored is None or stored[0] != expected_version:
+                    raise DraftConflict(draft_id)
+            self._drafts[draft_id] = (version, payload)
+            if log is not None:
+                events = self._events_by_draft.setdefault(draft_id, [])
+                snapshots = self._snapshots.setdefault(draft_id, {})
+                if log['truncate'] is not None:
+                    del events[log['truncate']:]
+                    for seq in [seq for seq in snapshots if seq > log['truncate']]:
+                        del snapshots[seq]
+                for seq, event in log['events']:
+                    del events[seq - 1:]
+                    events.append(event)
+                snapshots.update(log['snapshots'])
+
+    def _delete(self, draft_id):
+        with self._lock:
+            self._drafts.pop(draft_id, None)
+            self._events_by_draft.pop(draft_id, None)
+            self._snapshots.pop(draft_id, None)
+
+    def _events(self, draft_id, after, until):
+        with self._lock:
+            return self._events_by_draft.get(draft_id, [])[after:until]
+
+    def _snapshot(self, draft_id, at_most):
+        with self._lock:
+            snapshots = self._snapshots.get(draft_id, {})
+            seqs = [seq for seq in snapshots if seq <= at_most]
+            if not seqs:
+                return None
+            return max(seqs), snapshots[max(seqs)]
+
+class SQLiteDraftStore(DraftStore):
+    """
+    Keeps drafts in a local SQLite file, shared by every worker process on the machine.
+    """
+
+    def __init__(self, characters, path):
+        super().__init__(characters)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS drafts (draft_id TEXT PRIMARY KEY, state TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 0)")
+                # Databases created before drafts were versioned
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(drafts)")]
+                if 'version' not in columns:
+                    conn.execute("ALTER TABLE drafts ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                conn.execute("CREATE TABLE IF NOT EXISTS draft_events (draft_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, "
+                             "PRIMARY KEY (draft_id, seq)) WITHOUT ROWID")
+                conn.execute("CREATE TABLE IF NOT EXISTS draft_snapshots (draft_id TEXT NOT NULL, seq INTEGER NOT NULL, state TEXT NOT NULL, "
+                             "PRIMARY KEY (draft_id, seq)) WITHOUT ROWID")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        # With WAL a commit only has to reach the log, a crash can lose the last picks but not corrupt the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _get(self, draft_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT state FROM drafts WHERE draft_id = ?", (draft_id,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def _put(self, draft_id, payload, version, expected_version, log):
+        conn = self._connect()
+        try:
+            with conn:
+                if expected_version is None:
+                    conn.execute("INSERT OR REPLACE INTO drafts (draft_id, state, version) VALUES (?, ?, ?)", (draft_id, payload, version))
+                else:
+                    cursor = conn.execute("UPDATE drafts SET state = ?, version = ? WHERE draft_id = ? AND version = ?",
+                                          (payload, version, draft_id, expected_version))
+                    if cursor.rowcount == 0:
+                        raise DraftConflict(draft_id)
+                if log is not None:
+                    if log['truncate'] is not None:
+                        conn.execute("DELETE FROM draft_events WHERE draft_id = ? AND seq > ?", (draft_id, log['truncate']))
+                        conn.execute("DELETE FROM draft_snapshots WHERE draft_id = ? AND seq > ?", (draft_id, log['truncate']))
+                    conn.executemany("INSERT OR REPLACE INTO draft_events (draft_id, seq, event) VALUES (?, ?, ?)",
+                                     [(draft_id, seq, event) for seq, event in log['events']])
+                    conn.executemany("INSERT OR REPLACE INTO draft_snapshots (draft_id, seq, state) VALUES (?, ?, ?)",
+                                     [(draft_id, seq, snapshot) for seq, snapshot in log['snapshots']])
+        finally:
+            conn.close()
+
+    def _delete(self, draft_id):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM drafts WHERE draft_id = ?", (draft_id,))
+                conn.execute("DELETE FROM draft_events WHERE draft_id = ?", (draft_id,))
+                conn.execute("DELETE FROM draft_snapshots WHERE draft_id = ?", (draft_id,))
+        finally:
+            conn.close()
+
+    def _events(self, draft_id, after, until):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT event FROM draft_events WHERE draft_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+                                (draft_id, after, until)).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def _snapshot(self, draft_id, at_most):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT seq, state FROM draft_snapshots WHERE draft_id = ? AND seq <= ? ORDER BY seq DESC LIMIT 1",
+                                (draft_id, at_most)).fetchone()
+        finally:
+            conn.close()
+
+def create_store(characters, backend='sqlite', path=None):
+    """
+    Builds the draft store for the given backend name ('sqlite' or 'memory'), for the characters
+    of a CharacterRegistry (or a list of the pool's names).
+    """
+    if backend == 'memory':
+        return MemoryDraftStore(characters)
+    if backend == 'sqlite':
+        return SQLiteDraftStore(characters, path or 'drafts.sqlite3')
+    raise ValueError(f"Unknown draft store backend: {backend}")
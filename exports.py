@@ -0,0 +1,204 @@
+import csv
+import io
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+from metrics import span
+
+# Download formats: CSV and JSON are streamed straight from the draft state,
+# xlsx files are built by a background job and kept until the draft changes
+STREAM_FORMATS = ('csv', 'json')
+FILE_FORMATS = ('xlsx',)
+
+def draft_rounds(teams):
+    """
+    Returns {'Round n': {team: player or None}}, the layout of the exported results.
+    """
+    max_picks = max((len(players) for players in teams.values()), default=0)
+    return {
+        f'Round {round_num}': {team: players[round_num - 1] if len(players) >= round_num else None for team, players in teams.items()}
+        for round_num in range(1, max_picks + 1)
+    }
+
+def export_draft_results(teams, filename='draft_results.xlsx'):
+    """
+    Writes the draft results to an Excel file: one row per team, one column per round.
+    """
+    import pandas as pd
+
+    # Convert the dictionary to a DataFrame
+    df = pd.DataFrame(draft_rounds(teams))
+
+    # Export the DataFrame to an Excel file
+    df.to_excel(filename, index=True)
+
+def iter_csv(teams):
+    """
+    Streams the results as CSV with the same rows and columns as the Excel export.
+    """
+    rounds = list(draft_rounds(teams))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([''] + rounds)
+    for team, players in teams.items():
+        writer.writerow([team] + [players[n] if n < len(players) else '' for n in range(len(rounds))])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_json(draft_id, state):
+    """
+    Streams the results as a JSON document with the rosters and every pick in order, a team at a time.
+    """
+    yield '{"draft_id":%s,"version":%d,"teams":{' % (json.dumps(draft_id), state.get('version', 0))
+    for n, (team, players) in enumerate(state['teams'].items()):
+        yield ('' if n == 0 else ',') + f"{json.dumps(team)}:{json.dumps(players)}"
+    yield '},"cf_players":%s,"picks":%s}' % (json.dumps(state.get('cf_players', {})), json.dumps(state.get('picks', [])))
+
+class ExportError(Exception):
+    """
+    A background export failed to build. The failed job is dropped, so asking again rebuilds it.
+    """
+
+class ExportJobs:
+    """
+    Builds draft result files in the background, one per (draft, version, format).
+
+    A file only depends on the draft's state at that version, so once built it is served to
+    every visitor (and every worker, the files are on disk) until the next pick changes the
+    version. Files are written under a temporary name and renamed into place, so a file that
+    exists is complete. Building a newer version removes the draft's older files, except ones a
+    request of this process is waiting to serve (they go once it has opened them), and a build
+    that finishes after a newer version's is thrown away.
+    """
+
+    def __init__(self, directory, max_workers=1):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._jobs = {}  # (draft_id, version, fmt) -> Future
+        self._waiting = Counter()  # (draft_id, version) -> requests waiting to serve that version
+        self._lock = threading.Lock()
+
+    def path(self, draft_id, version, fmt):
+        return os.path.join(self.directory, f"{draft_id}-v{version}.{fmt}")
+
+    def submit(self, draft_id, state, fmt='xlsx'):
+        """
+        Starts building the file for the draft's current version unless it exists or is being built.
+        Returns the Future of the build, or None if the file is already there.
+        """
+        version = state.get('version', 0)
+        path = self.path(draft_id, version, fmt)
+        key = (draft_id, version, fmt)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                return job
+            if os.path.exists(path):
+                return None
+            teams = {team: list(players) for team, players in state['teams'].items()}
+            job = self._executor.submit(self._build, draft_id, version, fmt, teams)
+            self._jobs[key] = job
+            job.add_done_callback(lambda _: self._finished(key))
+            return job
+
+    def wait(self, draft_id, state, fmt='xlsx', timeout=None):
+        """
+        Returns the draft's file for its current version opened for reading, building it if
+        needed and waiting up to timeout seconds. Returns None if it is still being built, or
+        if the draft changed and a newer version replaced it first. Raises ExportError if the
+        build failed.
+        """
+        version = state.get('version', 0)
+        with self._lock:
+            self._waiting[draft_id, version] += 1
+        try:
+            job = self.submit(draft_id, state, fmt)
+            if job is not None:
+                try:
+                    job.result(timeout=timeout)
+                except FuturesTimeoutError:
+                    return None
+                except Exception as error:
+                    raise ExportError(f"Building the {fmt} export of draft {draft_id} failed: {error!r}") from error
+            try:
+                # Once open, the file can be removed without cutting the download short
+                return open(self.path(draft_id, version, fmt), 'rb')
+            except FileNotFoundError:
+                return None
+        finally:
+            with self._lock:
+                self._waiting[draft_id, version] -= 1
+                if not self._waiting[draft_id, version]:
+                    del self._waiting[draft_id, version]
+            # Older files kept for this request while it waited can go now
+            newest = max(self._versions(draft_id), default=None)
+            if newest is not None and newest > version:
+                self._remove(draft_id, keep=newest)
+
+    def discard(self, draft_id):
+        """
+        Removes every file built for the draft (e.g. when it is reset).
+        """
+        self._remove(draft_id, keep=None)
+
+    def _finished(self, key):
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def _build(self, draft_id, version, fmt, teams):
+        path = self.path(draft_id, version, fmt)
+        # The temporary name keeps the extension, pandas picks the Excel writer by it
+        tmp_path = os.path.join(self.directory, f"{draft_id}-v{version}.{os.getpid()}-{threading.get_ident()}.tmp.{fmt}")
+        try:
+            if fmt == 'xlsx':
+                with span('export_draft_results'):
+                    export_draft_results(teams, tmp_path)
+            else:
+                raise ValueError(f"Unknown export format: {fmt}")
+            with self._lock:
+                # A newer version finished first (the draft changed while this one was building):
+                # this file is out of date and nothing would remove it
+                if max(self._versions(draft_id), default=version) > version:
+                    os.remove(tmp_path)
+                    return None
+                os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._remove(draft_id, keep=version)
+        return path
+
+    def _versions(self, draft_id):
+        # The versions of the draft's built files
+        prefix = f"{draft_id}-v"
+        versions = set()
+        for filename in os.listdir(self.directory):
+            if filename.startswith(prefix) and '.tmp.' not in filename:
+                version = filename[len(prefix):].split('.', 1)[0]
+                if version.isdigit():
+                    versions.add(int(version))
+        return versions
+
+    def _remove(self, draft_id, keep):
+        # Deletes the draft's files older than version keep, but not ones a request is waiting
+        # to serve, or all of them if keep is None
+        prefix = f"{draft_id}-v"
+        with self._lock:
+            waiting = {version for waiting_id, version in self._waiting if waiting_id == draft_id}
+        for filename in os.listdir(self.directory):
+            if filename.startswith(prefix) and '.tmp.' not in filename:
+                version = filename[len(prefix):].split('.', 1)[0]
+                if keep is None or (version.isdigit() and int(version) < keep and int(version) not in waiting):
+                    try:
+                        os.remove(os.path.join(self.directory, filename))
+                    except OSError:
+                        pass
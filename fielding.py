@@ -0,0 +1,282 @@
+import numpy as np
+
+# Fielding positions, in the order the solver fills them (outfield first, it is worth the most)
+POSITIONS = ('CF', 'LF', 'RF', 'SS', '2B', '3B', '1B', 'C', 'P')
+OUTFIELD = ('LF', 'CF', 'RF')
+
+# How much each Player Statistics column (0-100) counts towards a fielder's value at a position.
+# Outfielders cover the most ground, so Speed dominates there, most of all in center field
+POSITION_WEIGHTS = {
+    'CF': {'Speed': 0.6, 'Fielding': 0.3, 'Throwing Speed': 0.1},
+    'LF': {'Speed': 0.5, 'Fielding': 0.3, 'Throwing Speed': 0.2},
+    'RF': {'Speed': 0.5, 'Fielding': 0.3, 'Throwing Speed': 0.2},
+    'SS': {'Fielding': 0.5, 'Throwing Speed': 0.3, 'Speed': 0.2},
+    '2B': {'Fielding': 0.6, 'Speed': 0.2, 'Throwing Speed': 0.2},
+    '3B': {'Fielding': 0.5, 'Throwing Speed': 0.4, 'Speed': 0.1},
+    '1B': {'Fielding': 0.8, 'Throwing Speed': 0.2},
+    'C': {'Throwing Speed': 0.6, 'Fielding': 0.4},
+    'P': {'Pitching Stamina': 0.4, 'Curveball Rating': 0.3, 'Fielding': 0.3},
+}
+
+# Fielders close enough to throw to each other, where chemistry (or hate) matters
+ADJACENT = (
+    ('LF', 'CF'), ('CF', 'RF'),
+    ('LF', '3B'), ('LF', 'SS'), ('CF', 'SS'), ('CF', '2B'), ('RF', '2B'), ('RF', '1B'),
+    ('3B', 'SS'), ('SS', '2B'), ('2B', '1B'),
+    ('C', 'P'), ('C', '1B'), ('C', '3B'), ('P', 'SS'), ('P', '2B'),
+)
+
+# Value of an adjacent pair with chemistry, and cost of one that hates each other, in the
+# same units as a position value (0-1)
+CHEMISTRY_WEIGHT = 0.15
+HATE_WEIGHT = 0.15
+
+# TAKE[free, p]: the free positions bitmask left after taking position p, or 1 << len(POSITIONS)
+# (no such mask) if p is not free
+_free = np.arange(1 << len(POSITIONS))[:, None]
+_bits = 1 << np.arange(len(POSITIONS))[None, :]
+TAKE = np.where(_free & _bits, _free ^ _bits, 1 << len(POSITIONS))
+
+class FieldingSolver:
+    """
+    Finds the best defensive alignment for a roster: the assignment of players to the nine
+    positions that maximizes their position values (POSITION_WEIGHTS) plus chemistry minus
+    hate between adjacent fielders (ADJACENT). With more than nine players the rest sit on
+    the bench, with fewer some positions stay empty.
+
+    Position values for the whole pool are precomputed as a matrix, and pairwise chemistry
+    of a roster comes from the ChemIndex bitsets. The search is branch-and-bound over the
+    players, most linked first, placing each at a free position or the bench. A DP over
+    bitmasks of free positions gives, for every remaining set of players and positions, the
+    most position value they could still add ignoring chemistry, which bounds each branch
+    together with the positive pairs still to be placed. Players without any chemistry or
+    hate on the roster are placed by that DP directly. A nine-player roster solves in a few
+    milliseconds, a full 13-player one with its bench in a few tens.
+    """
+
+    def __init__(self, chem_index, players, stats):
+        # stats: {column: values aligned with players}
+        self.chem_index = chem_index
+        self.players = list(players)
+        self.rows = {player: i for i, player in enumerate(self.players)}
+        self.values = np.zeros((len(self.players), len(POSITIONS)))
+        for p, position in enumerate(POSITIONS):
+            for column, weight in POSITION_WEIGHTS[position].items():
+                self.values[:, p] += weight * np.asarray(stats[column], dtype=np.float64) / 100
+        self.values = np.round(self.values, 4)
+
+        index = {position: p for p, position in enumerate(POSITIONS)}
+        self.neighbours = [[] for _ in POSITIONS]
+        for a, b in ADJACENT:
+            self.neighbours[index[a]].append(index[b])
+            self.neighbours[index[b]].append(index[a])
+        self.neighbour_masks = [sum(1 << q for q in adjacent) for adjacent in self.neighbours]
+        # For every bitmask of free positions, the adjacent pairs with at least one of them free
+        self.open_pairs = [sum(1 for a, b in ADJACENT if (free >> index[a] | free >> index[b]) & 1) for free in range(1 << len(POSITIONS))]
+
+    @classmethod
+    def from_frame(cls, chem_index, player_stats):
+        return cls(chem_index, player_stats['Character'], {column: player_stats[column].to_numpy() for column in _stat_columns()})
+
+    @classmethod
+    def from_tables(cls, tables):
+        return cls(tables.chem_index(), tables.pool, {column: list(tables.stat(column).values()) for column in _stat_columns()})
+
+    def position_value(self, player, position):
+        row = self.rows.get(player)
+        return 0.0 if row is None else float(self.values[row, POSITIONS.index(position)])
+
+    def pair_value(self, a, b):
+        """
+        Chemistry (+) or hate (-) between two fielders next to each other, either way round.
+        """
+        chem_index = self.chem_index
+        i, j = chem_index.ids.get(a), chem_index.ids.get(b)
+        if i is None or j is None:
+            return 0.0
+        chemistry = (chem_index.chem_bits[i] >> j) & 1 or (chem_index.chem_bits[j] >> i) & 1
+        hate = (chem_index.hate_bits[i] >> j) & 1 or (chem_index.hate_bits[j] >> i) & 1
+        return CHEMISTRY_WEIGHT * chemistry - HATE_WEIGHT * hate
+
+    def solve(self, roster, fixed=None):
+        """
+        Returns the best alignment of roster as {'positions': {position: player}, 'bench': [players],
+        'pinned': [positions], 'value': position values, 'chemistry': adjacent pair total,
+        'score': their sum}. fixed {position: player} pins players to positions, e.g. a designated CF.
+        """
+        players = list(dict.fromkeys(roster))
+        positions = len(POSITIONS)
+        neighbours = self.neighbours
+        fixed = {POSITIONS.index(position): player for position, player in (fixed or {}).items() if player in players}
+        pinned_to = {player: p for p, player in fixed.items()}
+        pair_values = {(a, b): self.pair_value(a, b) for a in players for b in players if a != b}
+        partners = {player: sum(1 for b in players if pair_values.get((player, b))) for player in players}
+
+        # Pinned players first, then the players with the most chemistry / hate, so pair terms are
+        # settled early and the tail of players without any is placed by the DP alone
+        roster = sorted(players, key=lambda player: (player not in pinned_to, -partners[player]))
+        n = len(roster)
+        bench = n > positions  # With more players than positions some sit out, otherwise everyone plays
+        pairs = [[pair_values.get((a, b), 0.0) for b in roster] for a in roster]
+        tail = n
+        while tail > 0 and partners[roster[tail - 1]] == 0:
+            tail -= 1
+
+        # values[i][p], -inf where a pinned player or a pinned position rules it out
+        values = np.zeros((n, positions))
+        for i, player in enumerate(roster):
+            row = self.rows.get(player)
+            if row is not None:
+                values[i] = self.values[row]
+            if player in pinned_to:
+                values[i, [p for p in range(positions) if p != pinned_to[player]]] = -np.inf
+            else:
+                values[i, list(fixed)] = -np.inf
+
+        # Each pair's chemistry is counted when its later player is placed, so player i can add at
+        # most one chemistry per earlier partner, and no more than its position has neighbours
+        degrees = np.array([len(adjacent) for adjacent in neighbours])
+        earlier = np.array([sum(1 for value in pairs[i][:i] if value > 0) for i in range(n)])
+        bound = _best_completions(values + CHEMISTRY_WEIGHT * np.minimum(degrees[None, :], earlier[:, None]), bench)
+        exact = _best_completions(values, bench)
+        values = values.tolist()
+
+        def follow(table, i, free, assignment):
+            # Places players i.. the way table's DP does (exact for players without pair terms)
+            for k in range(i, n):
+                for p in range(positions):
+                    if free >> p & 1 and values[k][p] + table[k + 1][free ^ (1 << p)] == table[k][free]:
+                        assignment[k] = p
+                        free ^= 1 << p
+                        break
+                # Otherwise the player sits out
+            return assignment
+
+        def evaluate(assignment):
+            occupant = {p: i for i, p in enumerate(assignment) if p is not None}
+            value = sum(values[i][p] for i, p in enumerate(assignment) if p is not None)
+            chemistry = sum(pairs[occupant[a]][occupant[b]] for a in occupant for b in neighbours[a] if a < b and b in occupant)
+            return value + chemistry, value, chemistry
+
+        # Start from the best alignment ignoring chemistry, improved by swapping players (or moving
+        # one to an empty position) while that helps. A good first alignment prunes most branches
+        assignment = follow(exact, 0, (1 << positions) - 1, [None] * n)
+        current = evaluate(assignment)
+        improved = True
+        while improved:
+            improved = False
+            movable = [i for i in range(n) if roster[i] not in pinned_to]
+            empty = [p for p in range(positions) if p not in assignment and p not in fixed]
+            moves = [(a, b) for x, a in enumerate(movable) for b in movable[x + 1:]] + [(a, -1 - p) for a in movable for p in empty]
+            for a, b in moves:
+                candidate = list(assignment)
+                if b >= 0:
+                    candidate[a], candidate[b] = candidate[b], candidate[a]
+                else:
+                    candidate[a] = -1 - b
+                scored = evaluate(candidate)
+                if scored[0] > current[0] + 1e-9 and all(p is None or values[i][p] > float('-inf') for i, p in enumerate(candidate)):
+                    assignment, current, improved = candidate, scored, True
+                    break
+        found = [current[0], assignment]
+
+        # The other bound: the best value ignoring chemistry, plus a chemistry for every positive pair
+        # that can still be realized (both players still to place, or the placed one next to a free
+        # position), but no more than there are adjacent pairs with a free position left
+        positive = [(j, k) for k in range(n) for j in range(k) if pairs[k][j] > 0]
+        open_pairs = self.open_pairs
+        free_neighbours = self.neighbour_masks
+        occupant = [None] * positions
+
+        def search(i, free, total, assignment):
+            if total + bound[i][free] <= found[0] + 1e-9:
+                return
+            possible = 0
+            for j, k in positive:
+                if k >= i and (j >= i or (assignment[j] is not None and free & free_neighbours[assignment[j]])):
+                    possible += 1
+            if total + exact[i][free] + CHEMISTRY_WEIGHT * min(possible, open_pairs[free]) <= found[0] + 1e-9:
+                return
+            if i == tail:
+                found[:] = [total + bound[i][free], follow(bound, i, free, list(assignment))]
+                return
+            options = []
+            for p in range(positions):
+                if free >> p & 1 and values[i][p] > float('-inf'):
+                    gain = values[i][p] + sum(pairs[i][occupant[q]] for q in neighbours[p] if occupant[q] is not None)
+                    options.append((gain + bound[i + 1][free ^ (1 << p)], p, gain))
+            options.sort(reverse=True)
+            for _, p, gain in options:
+                occupant[p] = i
+                assignment[i] = p
+                search(i + 1, free ^ (1 << p), total + gain, assignment)
+                occupant[p] = None
+                assignment[i] = None
+            if bench and roster[i] not in pinned_to:
+                search(i + 1, free, total, assignment)
+
+        search(0, (1 << positions) - 1, 0.0, [None] * n)
+        score, value, chemistry = evaluate(found[1])
+        placed = {POSITIONS[p]: roster[i] for i, p in enumerate(found[1]) if p is not None}
+        return {
+            'positions': {position: placed[position] for position in POSITIONS if position in placed},
+            'bench': [player for player in players if player not in placed.values()],
+            'pinned': [POSITIONS[p] for p in sorted(fixed)],
+            'value': round(value, 4),
+            'chemistry': round(chemistry, 4),
+            'score': round(score, 4),
+        }
+
+    def outfield_candidates(self, alignment, remaining_players, limit=10):
+        """
+        Ranks remaining players as outfielders for a roster's alignment: each player's best
+        value at an open outfield position (any unpinned one once the outfield is full) plus
+        chemistry with the fielders around it. Returns [(player, position, value, chemistry with)]
+        best first.
+        """
+        placed = alignment['positions']
+        open_positions = ([position for position in OUTFIELD if position not in placed] or
+                          [position for position in OUTFIELD if position not in alignment['pinned']])
+        if not open_positions:
+            return []
+        neighbours = {position: [] for position in OUTFIELD}
+        for a, b in ADJACENT:
+            if a in neighbours and b in placed:
+                neighbours[a].append(placed[b])
+            if b in neighbours and a in placed:
+                neighbours[b].append(placed[a])
+        candidates = []
+        for player in remaining_players:
+            options = []
+            for position in open_positions:
+                others = neighbours[position]
+                links = [other for other in others if self.pair_value(player, other) > 0]
+                total = self.position_value(player, position) + sum(self.pair_value(player, other) for other in others)
+                options.append((total, position, links))
+            total, position, links = max(options, key=lambda option: option[0])
+            candidates.append((player, position, round(total, 4), links))
+        candidates.sort(key=lambda candidate: -candidate[2])
+        return candidates[:limit]
+
+def _best_completions(values, bench):
+    """
+    DP over bitmasks of free positions: table[i][free] is the most that players i.. (values[i][p]
+    each) can add in the positions of free, each player taking one position, or sitting out if
+    bench. With a bench every position must end up filled, without one every player plays.
+    """
+    n, positions = values.shape
+    table = np.full((n + 1, (1 << positions) + 1), -np.inf)  # The extra last column stays -inf
+    if bench:
+        table[n][0] = 0.0
+    else:
+        table[n][:-1] = 0.0
+    for i in range(n - 1, -1, -1):
+        # Taking position p from free leaves free ^ (1 << p); TAKE points at the -inf column if p is not free
+        row = np.max(table[i + 1][TAKE] + values[i], axis=1)
+        if bench:
+            row = np.maximum(row, table[i + 1][:-1])
+        table[i][:-1] = row
+    return table[:, :-1].tolist()
+
+def _stat_columns():
+    return sorted({column for weights in POSITION_WEIGHTS.values() for column in weights})
@@ -0,0 +1,139 @@
+import random
+import time
+from collections import OrderedDict
+
+from chem_index import bit_ids
+
+class LookaheadRecommender:
+    """
+    Snake-aware pick recommender. The greedy top 5 only looks at the current roster, but
+    under the snake order a team may not pick again for up to 2 * (teams - 1) turns, and
+    rivals take chemistry partners in between.
+
+    For each candidate pick this plays the draft forward from a copy of its state: rivals pick
+    one of their likely picks (their top few by team value, sampled), the team itself
+    picks greedily, and after the team's next horizon picks the roster is valued. Rollouts
+    are spread over the candidates until the time budget runs out, and each candidate gets
+    the mean value of its rollouts, an estimate of the expected team value after the
+    opponents' replies. Roster values are cached so repeated positions cost a lookup.
+
+    Team value = chemistry - hate_weight * hate + stat_weight * stat_total, with the same
+    outcomes as simulate.py (chemistry / hate summed over the roster, scaled stat total).
+    """
+
+    def __init__(self, context, hate_weight=1.0, stat_weight=1.0, candidates=8, horizon=3,
+                 opponent_choices=(0.6, 0.25, 0.15), cache_size=100000):
+        self.context = context
+        self.hate_weight = hate_weight
+        self.stat_weight = stat_weight
+        self.candidates = candidates
+        self.horizon = horizon  # Own future picks played out after the candidate, None for the whole draft
+        self.opponent_choices = opponent_choices  # Chance of a rival taking its best, 2nd best, ... pick
+        self.cache_size = cache_size
+        self._values = OrderedDict()
+
+        # Reverse adjacency, so adding a player also counts the teammates that list them
+        chem_index = context.chem_index
+        liked_by = [0] * len(chem_index.names)
+        hated_by = [0] * len(chem_index.names)
+        for i in range(len(chem_index.names)):
+            for j in bit_ids(chem_index.chem_bits[i]):
+                liked_by[j] |= 1 << i
+            for j in bit_ids(chem_index.hate_bits[i]):
+                hated_by[j] |= 1 << i
+        self.liked_by = liked_by
+        self.hated_by = hated_by
+
+    def team_value(self, roster):
+        key = frozenset(roster)
+        value = self._values.get(key)
+        if value is None:
+            outcomes = self.context.team_outcomes(roster)
+            value = outcomes['chemistry'] - self.hate_weight * outcomes['hate'] + self.stat_weight * outcomes['stat_total']
+            self._values[key] = value
+            if len(self._values) > self.cache_size:
+                self._values.popitem(last=False)
+        else:
+            self._values.move_to_end(key)
+        return value
+
+    def gain(self, roster_mask, player):
+        """
+        How much team_value goes up when player joins the roster in roster_mask.
+        """
+        chem_index = self.context.chem_index
+        i = chem_index.ids.get(player)
+        stat = self.stat_weight * self.context.stat_value.get(player, 0.0)
+        if i is None:
+            return stat
+        mask = roster_mask | (1 << i)
+        chemistry = (chem_index.chem_bits[i] & mask).bit_count() + (self.liked_by[i] & roster_mask).bit_count()
+        hate = (chem_index.hate_bits[i] & mask).bit_count() + (self.hated_by[i] & roster_mask).bit_count()
+        return chemistry - self.hate_weight * hate + stat
+
+    def ranked_picks(self, draft, team, count):
+        """
+        The team's count best legal picks by gain, best first.
+        """
+        roster_mask = self.context.chem_index.mask(draft.teams[team])
+        gains = [(self.gain(roster_mask, player), player) for player in draft.legal_picks(team)]
+        gains.sort(key=lambda item: -item[0])
+        return [player for _, player in gains[:count]]
+
+    def candidate_picks(self, draft, team):
+        """
+        Candidates worth searching: the best by gain plus the best by calculate_scores.
+        """
+        candidates = self.ranked_picks(draft, team, self.candidates)
+        legal = draft.legal_picks(team)
+        players, raw, scaled, total = self.context.table.score(legal, draft.teams[team])
+        by_score = sorted(range(len(players)), key=lambda i: -total[i])
+        for i in by_score[:self.candidates // 2]:
+            if players[i] not in candidates:
+                candidates.append(players[i])
+        return candidates
+
+    def _opponent_pick(self, draft, team, rng):
+        choices = self.ranked_picks(draft, team, len(self.opponent_choices))
+        return rng.choices(choices, weights=self.opponent_choices[:len(choices)])[0]
+
+    def rollout(self, draft, team, candidate, rng):
+        """
+        Plays one continuation after team drafts candidate and returns the team's value.
+        """
+        draft = draft.copy(rng=rng)
+        draft.pick(candidate)
+        own_picks = 0
+        while not draft.done:
+            on_clock = draft.current_team
+            if on_clock == team:
+                if self.horizon is not None and own_picks >= self.horizon:
+                    break
+                draft.pick(self.ranked_picks(draft, team, 1)[0])
+                own_picks += 1
+            else:
+                draft.pick(self._opponent_pick(draft, on_clock, rng))
+        return self.team_value(draft.teams[team])
+
+    def recommend(self, draft, budget=0.5, seed=None, max_rollouts=None):
+        """
+        Returns [(player, expected value, rollouts)] for the team on the clock, best first,
+        searching until budget seconds have passed (every candidate gets at least one rollout).
+        """
+        team = draft.current_team
+        rng = random.Random(seed)
+        candidates = self.candidate_picks(draft, team)
+        totals = {player: 0.0 for player in candidates}
+        counts = {player: 0 for player in candidates}
+        deadline = time.perf_counter() + budget
+        rollouts = 0
+        while candidates:
+            for player in candidates:
+                totals[player] += self.rollout(draft, team, player, rng)
+                counts[player] += 1
+                rollouts += 1
+            if time.perf_counter() >= deadline or (max_rollouts is not None and rollouts >= max_rollouts):
+                break
+        results = [(player, totals[player] / counts[player], counts[player]) for player in candidates]
+        results.sort(key=lambda result: -result[1])
+        return results
@@ -0,0 +1,187 @@
+import bisect
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """
+    Counts of observations per latency bucket, plus their number and sum, like a Prometheus
+    histogram. quantile() estimates a percentile as the upper bound of the bucket it falls in.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last bucket holds everything over buckets[-1]
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+class Metrics:
+    """
+    Latency histograms of the app's requests and of named stages within them (spans).
+
+    span(name) times a block and adds it to the stage's histogram; spans inside a request are
+    also kept for that request (its Server-Timing header). A span costs a few
+    microseconds, so the hot paths are always timed. Histograms are per process: with several
+    workers, each serves its own /metrics.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}  # (metric, labels) -> Histogram, labels a tuple of (name, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # The current request's spans and start time
+
+    def observe(self, metric, labels, seconds):
+        key = (metric, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name):
+        """
+        Times the block as the stage name, e.g. with metrics.span('render_template'): ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        # Adds a stage timed some other way, like a span
+        self.observe('draft_stage_seconds', (('stage', name),), seconds)
+        spans = getattr(self._local, 'spans', None)
+        if spans is not None:
+            spans.append((name, seconds))
+
+    def start_request(self):
+        self._local.start = time.perf_counter()
+        self._local.spans = []
+
+    def end_request(self, route, method, status):
+        """
+        Records the current request's latency under its route. Returns its spans as
+        [(stage, seconds)], or None if no request was started on this thread.
+        """
+        start = getattr(self._local, 'start', None)
+        spans = getattr(self._local, 'spans', None)
+        self._local.start = self._local.spans = None
+        if start is None:
+            return None
+        self.observe('draft_request_seconds', (('route', route), ('method', method), ('status', str(status))), time.perf_counter() - start)
+        return spans
+
+    def discard_request(self):
+        # Forgets the current request's spans without recording it (e.g. it raised)
+        self._local.start = self._local.spans = None
+
+    def snapshot(self):
+        """
+        {metric: [{'labels', 'count', 'sum', 'p50', 'p95', 'p99', 'buckets'}]}, the
+        percentiles estimated from the buckets.
+        """
+        with self._lock:
+            items = [(metric, labels, histogram.count, histogram.sum, list(histogram.counts))
+                     for (metric, labels), histogram in sorted(self._histograms.items())]
+        result = {}
+        for metric, labels, count, total, counts in items:
+            histogram = Histogram(self.buckets)
+            histogram.counts, histogram.count, histogram.sum = counts, count, total
+            result.setdefault(metric, []).append({
+                'labels': dict(labels),
+                'count': count,
+                'sum': total,
+                'p50': histogram.quantile(0.5),
+                'p95': histogram.quantile(0.95),
+                'p99': histogram.quantile(0.99),
+                'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], counts)),
+            })
+        return result
+
+    def render(self):
+        """
+        Every histogram in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric, series in self.snapshot().items():
+            lines.append(f"# TYPE {metric} histogram")
+            for entry in series:
+                labels = ','.join(f'{name}="{_escape(value)}"' for name, value in entry['labels'].items())
+                cumulative = 0
+                for bound, count in entry['buckets'].items():
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{labels}}} {entry['sum']:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {entry['count']}")
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def server_timing(spans):
+    """
+    A Server-Timing header value for spans, the time of stages that ran more than once added up.
+    """
+    totals = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ', '.join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in totals.items())
+
+class RequestProfiler:
+    """
+    cProfile dumps of single requests, written to directory as <time>-<endpoint>.prof (open
+    them with python -m pstats or snakeviz). Only the newest max_dumps are kept.
+    """
+
+    def __init__(self, directory, max_dumps=50):
+        self.directory = directory
+        self.max_dumps = max_dumps
+
+    def start(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop(self, profile, name):
+        """
+        Stops profile and writes it out. Returns the file name of the dump.
+        """
+        profile.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns() % 10 ** 6:06d}-{name}.prof"
+        profile.dump_stats(os.path.join(self.directory, filename))
+        dumps = sorted(entry for entry in os.listdir(self.directory) if entry.endswith('.prof'))
+        for old in dumps[:-self.max_dumps]:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+        return filename
+
+# The process's metrics, shared by the app and the modules it times
+metrics = Metrics()
+span = metrics.span
@@ -0,0 +1,268 @@
+import argparse
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+from fielding import OUTFIELD
+
+ROSTER_SIZE = 9
+
+# Hate counts this much against chemistry, like neg_chem_weight in the chemistry metric
+HATE_WEIGHT = 0.5
+
+def _first_after(ranked, count, n):
+    # The first count entries of ranked greater than n. Entries up to n are dropped from ranked
+    # for good, as the branches try candidates in increasing order
+    first = []
+    j = 0
+    while j < len(ranked) and len(first) < count:
+        if ranked[j] <= n:
+            del ranked[j]
+        else:
+            first.append(ranked[j])
+            j += 1
+    return first
+
+class RosterSearch:
+    """
+    Finds the best possible rosters in the chemistry graph: the top-k sets of ROSTER_SIZE
+    characters by team chemistry minus weighted hate (every teammate on a player's Chemistry
+    list counts one, every teammate on the Hate list counts -hate_weight, summed over the
+    roster like the simulator's team chemistry and hate).
+
+    Optional constraints: players already on the roster, players that cannot be picked (e.g.
+    already drafted by other teams), exactly one captain, and enough players of a minimum
+    speed to fill the outfield.
+
+    The search is branch-and-bound over the candidates, most linked first, picking players
+    in order. Pair values come from the ChemIndex adjacency, and the value every candidate
+    would add to the players picked so far is kept as a running vector. A branch is bounded
+    by the value so far plus the best candidates still allowed (as many as there are open
+    spots, enough of them fast), each counting its value with the picked players and half of
+    its best links (each link between two later picks is shared by both), and dropped as
+    soon as it cannot beat the k-th best roster found. The last two picks are scored as all
+    pairs at once. The captain rule runs one search per captain, best greedy roster first,
+    so the later ones mostly prune at the root. Searches over the full pool take a few tenths
+    of a second, a few hundredths once a roster has some players. Larger, denser graphs can
+    take far longer, so a search can be given a time limit, returning the best rosters found
+    by then.
+    """
+
+    def __init__(self, chem_index, players, speeds=None, hate_weight=HATE_WEIGHT):
+        self.chem_index = chem_index
+        self.players = list(players)
+        self.speeds = speeds or {}
+        self.hate_weight = hate_weight
+        chemistry, hate = chem_index.matrices()
+        # Pair values between chemistry IDs, counting both directions
+        self.weights = (chemistry + chemistry.T).astype(np.float64) - hate_weight * (hate + hate.T)
+
+    @classmethod
+    def from_tables(cls, tables, hate_weight=HATE_WEIGHT):
+        return cls(tables.chem_index(), tables.pool, tables.stat('Speed'), hate_weight)
+
+    def roster_value(self, roster):
+        """
+        Returns (chemistry, hate, score) of a roster.
+        """
+        team_mask = self.chem_index.mask(roster)
+        chemistry = sum(self.chem_index.chemistry_with(player, team_mask) for player in roster)
+        hate = sum(self.chem_index.hate_with(player, team_mask) for player in roster)
+        return chemistry, hate, chemistry - self.hate_weight * hate
+
+    def top_rosters(self, k=5, roster=(), exclude=(), captains=None, min_outfield_speed=None, size=ROSTER_SIZE, time_limit=None):
+        """
+        Returns the k best rosters of size players that keep every player in roster, as
+        [{'players', 'added', 'chemistry', 'hate', 'score', 'exact'}], best first. Players in
+        exclude are never picked. With captains, rosters hold exactly one of them (or no more
+        than roster already does). With min_outfield_speed, at least len(OUTFIELD) players have
+        that much Speed. Returns [] if no roster meets the constraints. With time_limit, the
+        search stops after that many seconds and 'exact' is False: the rosters are the best found,
+        not necessarily the best there are.
+        """
+        roster = list(dict.fromkeys(roster))
+        if len(roster) > size:
+            raise ValueError(f"The roster already has more than {size} players")
+        excluded = set(exclude) | set(roster)
+        best = []  # Min-heap of (score, -found, players) holding the k best rosters
+        found = itertools.count()
+        deadline = np.inf if time_limit is None else time.perf_counter() + time_limit
+        exact = True
+
+        if captains is None or any(player in captains for player in roster):
+            exact = self._search(roster, excluded | set(captains or ()), min_outfield_speed, size, k, best, found, deadline)
+        else:
+            # Exactly one captain: search once per captain with it on the roster and the others
+            # out, the ones with the best greedy roster first, every search pruning against the
+            # rosters found so far
+            choices = [player for player in self.players if player in captains and player not in excluded]
+            if len(roster) < size:
+                others = excluded | set(captains)
+                choices.sort(key=lambda captain: -self._greedy(roster + [captain], others, min_outfield_speed, size))
+                for captain in choices:
+                    exact = self._search(roster + [captain], others, min_outfield_speed, size, k, best, found, deadline)
+                    if not exact:
+                        break
+        return [self._result(roster, players[len(roster):], exact) for _, _, players in sorted(best, reverse=True)]
+
+    def _search(self, roster, excluded, min_outfield_speed, size, k, best, found, deadline):
+        # Adds the best rosters extending roster with players not in excluded to the heap best.
+        # Returns False if it ran out of time at deadline (a perf_counter() time) before finishing
+        slots = size - len(roster)
+        candidates = [player for player in self.players if player not in excluded and player not in roster]
+        fast_needed = 0
+        if min_outfield_speed is not None:
+            fast_needed = max(0, len(OUTFIELD) - sum(1 for player in roster if self.speeds.get(player, 0) >= min_outfield_speed))
+        if len(candidates) < slots or fast_needed > slots:
+            return True
+
+        weights = self._pair_values(candidates, candidates)
+        np.fill_diagonal(weights, 0)
+        start_gain = self._pair_values(roster, candidates).sum(axis=0)
+        start_value = float(np.triu(self._pair_values(roster, roster), 1).sum())
+
+        # Most linked candidates first, so good rosters turn up early and tighten the bound
+        positive = np.sort(np.maximum(weights, 0), axis=1)[:, ::-1]
+        potential = start_gain + positive[:, :max(slots - 1, 0)].sum(axis=1) / 2
+        order = np.argsort(-potential, kind='stable')
+        candidates = [candidates[n] for n in order]
+        weights = weights[np.ix_(order, order)]
+        start_gain = start_gain[order]
+        positive = positive[order]
+        # optimistic[r][c]: half the value of c's best r - 1 links, its most from pairs among r new picks
+        optimistic = [None] + [positive[:, :r - 1].sum(axis=1) / 2 for r in range(1, slots + 1)]
+        is_fast = [min_outfield_speed is not None and self.speeds.get(player, 0) >= min_outfield_speed for player in candidates]
+        # Fast players at or after each position
+        fast_after = np.cumsum(is_fast[::-1])[::-1].tolist() + [0]
+
+        def search(start, picks, value, gain, left, fast_left):
+            if left == 0:
+                entry = (round(value, 6), -next(found), roster + [candidates[c] for c in picks])
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+                return
+            threshold = best[0][0] if len(best) == k else -np.inf
+            if left == 2:
+                # The last two picks: score every pair at once and keep the best k
+                pairs = value + gain[start:, None] + gain[None, start:] + weights[start:, start:]
+                allowed = np.triu(np.ones(pairs.shape, dtype=bool), 1)
+                if fast_left:
+                    fast = np.array(is_fast[start:])
+                    allowed &= (fast[:, None] & fast[None, :]) if fast_left == 2 else (fast[:, None] | fast[None, :])
+                rows, columns = np.nonzero(allowed & (pairs > threshold))
+                scores = pairs[rows, columns]
+                for p in np.argsort(-scores, kind='stable')[:k].tolist():
+                    entry = (round(float(scores[p]), 6), -next(found), roster + [candidates[c] for c in picks] +
+                             [candidates[start + rows[p]], candidates[start + columns[p]]])
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                    else:
+                        break
+                return
+            bounds = gain[start:] + optimistic[left][start:]
+            ranked = np.argsort(-bounds, kind='stable').tolist()
+            # Whichever candidate comes next, the other picks add at most the best left - 1 bounds
+            survivors = np.flatnonzero(value + bounds + bounds[ranked[:left - 1]].sum() > threshold).tolist()
+            bounds = bounds.tolist()
+            # The same ranking split into fast and other candidates, for the speed constraint
+            ranked_fast = [i for i in ranked if is_fast[start + i]] if fast_left else []
+            ranked_other = [i for i in ranked if not is_fast[start + i]] if fast_left else []
+            for n in survivors:
+                if n > len(bounds) - left:
+                    break
+                c = start + n
+                next_fast_left = max(0, fast_left - is_fast[c])
+                if next_fast_left > min(left - 1, fast_after[c + 1]):
+                    continue
+                # The best left - 1 bounds after c, the best g of them fast for the best g that is
+                # enough fast players
+                if next_fast_left:
+                    fast_wanted = min(left - 1, fast_after[c + 1])
+                    other_wanted = min(left - 1, len(bounds) - n - 1 - fast_wanted)
+                    fast_sums = list(itertools.accumulate((bounds[i] for i in _first_after(ranked_fast, fast_wanted, n)), initial=0.0))
+                    other_sums = list(itertools.accumulate((bounds[i] for i in _first_after(ranked_other, other_wanted, n)), initial=0.0))
+                else:
+                    fast_sums = [0.0]
+                    other_sums = list(itertools.accumulate((bounds[i] for i in _first_after(ranked, left - 1, n)), initial=0.0))
+                rest = max(
+                    fast_sums[g] + other_sums[left - 1 - g]
+                    for g in range(next_fast_left, len(fast_sums)) if left - 1 - g < len(other_sums)
+                )
+                if value + bounds[n] + rest <= threshold:
+                    continue
+                if time.perf_counter() > deadline:
+                    return False
+                if search(c + 1, picks + [c], value + gain[c], gain + weights[c], left - 1, next_fast_left) is False:
+                    return False
+                threshold = best[0][0] if len(best) == k else -np.inf
+
+        return search(0, [], start_value, start_gain, slots, fast_needed) is not False
+
+    def _greedy(self, roster, excluded, min_outfield_speed, size):
+        # Score of the roster built by adding the player adding the most, -inf if it misses the speed constraint
+        candidates = [player for player in self.players if player not in excluded and player not in roster]
+        weights = self._pair_values(candidates, candidates)
+        gain = self._pair_values(roster, candidates).sum(axis=0)
+        value = float(np.triu(self._pair_values(roster, roster), 1).sum())
+        fast = np.array([min_outfield_speed is not None and self.speeds.get(player, 0) >= min_outfield_speed for player in candidates], dtype=bool)
+        fast_left = len(OUTFIELD) - sum(1 for player in roster if min_outfield_speed is not None and self.speeds.get(player, 0) >= min_outfield_speed)
+        available = np.ones(len(candidates), dtype=bool)
+        for left in range(size - len(roster), 0, -1):
+            allowed = available & fast if fast_left >= left else available
+            if not allowed.any():
+                return -np.inf
+            c = int(np.argmax(np.where(allowed, gain, -np.inf)))
+            value += gain[c]
+            gain += weights[c]
+            available[c] = False
+            fast_left -= fast[c]
+        return value
+
+    def _pair_values(self, rows, columns):
+        # Pair values between two lists of players, zero for anyone outside the chemistry sheet
+        ids = self.chem_index.ids
+        values = np.zeros((len(rows), len(columns)))
+        known_rows = [n for n, player in enumerate(rows) if player in ids]
+        known_columns = [n for n, player in enumerate(columns) if player in ids]
+        values[np.ix_(known_rows, known_columns)] = self.weights[np.ix_(
+            [ids[rows[n]] for n in known_rows], [ids[columns[n]] for n in known_columns])]
+        return values
+
+    def _result(self, roster, added, exact):
+        players = roster + added
+        chemistry, hate, score = self.roster_value(players)
+        return {'players': players, 'added': added, 'chemistry': chemistry, 'hate': hate, 'score': score, 'exact': exact}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Best possible rosters by team chemistry minus weighted hate.")
+    parser.add_argument('--k', type=int, default=5, help="number of rosters to show")
+    parser.add_argument('--roster', nargs='*', default=[], help="players already on the roster")
+    parser.add_argument('--exclude', nargs='*', default=[], help="players that cannot be picked (e.g. already drafted)")
+    parser.add_argument('--captain', action='store_true', help="rosters hold exactly one captain")
+    parser.add_argument('--min-outfield-speed', type=float, default=None, help="Speed every outfielder needs")
+    parser.add_argument('--time-limit', type=float, default=None, help="seconds to search before settling for the best rosters found")
+    parser.add_argument('--hate-weight', type=float, default=HATE_WEIGHT, help="how much one hate link counts against one chemistry link")
+    args = parser.parse_args()
+
+    from data_cache import load_tables
+
+    search = RosterSearch.from_tables(load_tables(), args.hate_weight)
+    captains = None
+    if args.captain:
+        import draft
+        captains = draft.captains
+
+    start = time.perf_counter()
+    rosters = search.top_rosters(args.k, args.roster, args.exclude, captains, args.min_outfield_speed, time_limit=args.time_limit)
+    elapsed = time.perf_counter() - start
+    print(f"Best {len(rosters)} rosters, found in {elapsed:.2f}s")
+    if rosters and not rosters[0]['exact']:
+        print("(out of time: the best rosters found, there may be better ones)")
+    for n, result in enumerate(rosters, 1):
+        print(f"{n}. {result['score']:g} (chemistry {result['chemistry']}, hate {result['hate']}): {', '.join(result['players'])}")
@@ -0,0 +1,482 @@
+import math
+import weakref
+import numpy as np
+from chem_index import ChemIndex, bit_ids, get_chem_index
+from seasons import get_season_stats
+
+# Metric columns in the order create_player_tuples reports them
+METRICS = ['chem_score', 'slugging', 'charge_hit_power', 'slap_hit_power', 'speed', 'home_runs', 'pitching_stamina']
+
+class ScoreTable:
+    """
+    Batch scorer for calculate_scores. Player Statistics and Season Data are joined once
+    into a stats matrix (one row per character, one column per stat metric, with the 25%
+    of average fallback already filled in), and chemistry comes from ChemIndex adjacency
+    matrices, so scoring the whole pool is a handful of NumPy operations.
+    """
+
+    def __init__(self, chem_index, names, stats):
+        self.chem_index = chem_index
+        self.names = names  # row -> character name, the last row is the fallback for unknown players
+        self.rows = {name: i for i, name in enumerate(names)}
+        self.stats = stats  # (len(names) + 1, 6) float64 matrix of METRICS[1:]
+        # Chemistry index ID of every row, -1 when the character has no chemistry row
+        self.chem_ids = np.array([
+            chem_index.ids[name] if name in chem_index.ids and chem_index.has_row[chem_index.ids[name]] else -1
+            for name in names
+        ] + [-1], dtype=np.int64)
+        chemistry, hate = chem_index.matrices()
+        self.chem_matrix = chemistry
+        self.hate_matrix = hate
+        self.chem_degree = chemistry.sum(axis=1).astype(np.int64)
+
+    @classmethod
+    def from_frames(cls, chem_data, player_stats, season_data):
+        """
+        season_data is the Season Data DataFrame, or SeasonStats aggregated over several seasons.
+        """
+        chem_index = get_chem_index(chem_data)
+        season = get_season_stats(season_data)
+        names = list(dict.fromkeys(list(player_stats['Character']) + season.characters + chem_index.names))
+
+        # Season metrics: mean slugging and total home runs over every row for the character
+        slugging = season.mean('Slugging Percentage')
+        home_runs = season.total('Home Runs')
+        # Game stats: the first row for the character, like the .values[0] lookups
+        stats = player_stats.drop_duplicates('Character').set_index('Character')
+
+        fallback = [
+            season.overall_mean('Slugging Percentage') * 0.25,
+            player_stats['Charge Hit Power'].mean() * 0.25,
+            player_stats['Slap Hit Power'].mean() * 0.25,
+            player_stats['Speed'].mean() * 0.25,
+            season.overall_mean('Home Runs') * 0.25,
+            player_stats['Pitching Stamina'].mean() * 0.25,
+        ]
+        matrix = np.tile(np.array(fallback, dtype=np.float64), (len(names) + 1, 1))
+        for row, name in enumerate(names):
+            if name in season.rows:
+                matrix[row, 0] = slugging[name]
+                matrix[row, 4] = home_runs[name]
+        rows = np.arange(len(names))
+        names_index = stats.index.get_indexer(names)
+        found = names_index >= 0
+        for column, stat in ((1, 'Charge Hit Power'), (2, 'Slap Hit Power'), (3, 'Speed'), (5, 'Pitching Stamina')):
+            matrix[rows[found], column] = stats[stat].to_numpy(dtype=np.float64)[names_index[found]]
+
+        return cls(chem_index, names, matrix)
+
+    def row_ids(self, players):
+        fallback = len(self.names)
+        return np.array([self.rows.get(player, fallback) for player in players], dtype=np.int64)
+
+    def chemistry_scores(self, players, team_players, k=0.9, x0=4.5, neg_chem_weight=.5):
+        """
+        calculate_chemistry_metric for every player at once, as a list of floats in players order.
+        """
+        chem_ids = self.chem_ids[self.row_ids(players)]
+        known = chem_ids >= 0
+        for player in np.asarray(players, dtype=object)[~known]:
+            print(f"Warning: Player '{player}' not found in chemistry data. Assigning default chemistry score.")
+
+        team_size = len(team_players)
+        weight_current_team = 1 / (1 + math.exp(-k * (team_size - x0)))
+        weight_available_players = 1 - weight_current_team
+        weight_unique_chem = weight_available_players
+
+        n = len(self.chem_index.names)
+        team_vector = np.zeros(n, dtype=np.float32)
+        team_vector[_known_ids(self.chem_index, team_players)] = 1
+        pool_vector = np.zeros(n, dtype=np.float32)
+        pool_vector[_known_ids(self.chem_index, players)] = 1
+
+        ids = chem_ids[known]
+        chemistry = self.chem_matrix[ids]
+        hate = self.hate_matrix[ids]
+        # The player itself is never one of its own available partners
+        positive_chem_current_team = (chemistry @ team_vector).astype(np.int64)
+        negative_chem_current_team = (hate @ team_vector).astype(np.int64) * neg_chem_weight
+        positive_chem_available_players = (chemistry @ pool_vector).astype(np.int64) - self.chem_matrix[ids, ids].astype(np.int64)
+        negative_chem_available_players = ((hate @ pool_vector).astype(np.int64) - self.hate_matrix[ids, ids].astype(np.int64)) * neg_chem_weight
+        unique_chem = self.chem_degree[ids]
+
+        chemistry_metric = (
+            weight_current_team * (positive_chem_current_team - negative_chem_current_team) +
+            weight_available_players * (positive_chem_available_players - negative_chem_available_players) +
+            weight_unique_chem * (unique_chem)
+        )
+
+        scores = np.zeros(len(players), dtype=np.float64)
+        # Python's round, so the two decimals match calculate_chemistry_metric exactly
+        scores[known] = [round(value, 2) for value in chemistry_metric.tolist()]
+        return scores
+
+    def score(self, players, team_players, k=0.9, x0=4.5, neg_chem_weight=.5, weights=None):
+        """
+        Scores every player in one pass. Returns (players, raw, scaled, total) where raw and scaled
+        are (len(players), len(METRICS)) matrices and total is the sum of the scaled metrics, each
+        times its weight in weights (one per METRICS, all 1 by default).
+        """
+        players = list(dict.fromkeys(players))
+        raw = np.empty((len(players), len(METRICS)), dtype=np.float64)
+        raw[:, 0] = self.chemistry_scores(players, team_players, k=k, x0=x0, neg_chem_weight=neg_chem_weight)
+        raw[:, 1:] = self.stats[self.row_ids(players)]
+        scaled = min_max_scale(raw)
+        return players, raw, scaled, weighted_total(scaled, weights)
+
+    def player_tuples(self, players, team_players, k=0.9, x0=4.5, neg_chem_weight=.5, weights=None):
+        """
+        Same (player, total_score, metric values...) tuples as create_player_tuples(min_max_scale_scores(...)).
+        """
+        if not players:
+            return []
+        players, raw, scaled, total = self.score(players, team_players, k=k, x0=x0, neg_chem_weight=neg_chem_weight, weights=weights)
+        return [(player, row_total, *row) for player, row_total, row in zip(players, total.tolist(), scaled.tolist())]
+
+def weighted_total(scaled, weights=None):
+    """
+    Total score of every row of a scaled metrics matrix: the sum of its metrics, each times its
+    weight in weights (one per METRICS). With no weights this is the plain sum of create_player_tuples.
+    """
+    total = scaled[:, 0] if weights is None else scaled[:, 0] * weights[0]
+    for column in range(1, len(METRICS)):
+        total = total + (scaled[:, column] if weights is None else scaled[:, column] * weights[column])
+    return total
+
+def min_max_scale(raw):
+    """
+    Column-wise min_max_scale_scores on a metrics matrix, rounded to 2 decimals the same way.
+    """
+    low = raw.min(axis=0)
+    high = raw.max(axis=0)
+    spread = high - low
+    constant = spread == 0
+    scaled = (raw - low) / np.where(constant, 1, spread)
+    scaled[:, constant] = 0
+    # The chemistry column holds Python floats in min_max_scale_scores, so it takes Python's round;
+    # the stat columns are NumPy scalars there and np.round gives the identical result here
+    scaled[:, 1:] = np.round(scaled[:, 1:], 2)
+    scaled[:, 0] = [round(value, 2) for value in scaled[:, 0].tolist()]
+    return scaled
+
+class DraftScores:
+    """
+    Incremental scoring state for one draft. A pick only adds a player to one roster and
+    removes them from the pool, so instead of rescoring from scratch every page this keeps
+    per-team chemistry / hate counts, the pool's chemistry counts and the stat min/max
+    bounds, and updates them with each pick's delta (O(players linked to the pick)).
+    Scores, groupings and top-k lists read from these counts and match calculate_scores
+    and sort_available_players for the same pool and roster (and the same chemistry
+    parameters and metric weights, see ScoreTable.score).
+    """
+
+    def __init__(self, table, pool, teams, k=0.9, x0=4.5, neg_chem_weight=.5, weights=None):
+        chem_index = table.chem_index
+        self.table = table
+        self.k = k
+        self.x0 = x0
+        self.neg_chem_weight = neg_chem_weight
+        self.weights = weights
+
+        # Pool positions keep the order of the initial pool, like remaining_players does
+        self.pool = list(dict.fromkeys(pool))
+        self.positions = {player: p for p, player in enumerate(self.pool)}
+        self.alive = np.ones(len(self.pool), dtype=bool)
+        self.remaining_count = len(self.pool)
+        rows = table.row_ids(self.pool)
+        self.stats = table.stats[rows]
+        chem_ids = table.chem_ids[rows]
+        self.has_chem = chem_ids >= 0
+
+        # For every chemistry ID, the pool positions that have it on their Chemistry / Hate list
+        liked_by = [[] for _ in chem_index.names]
+        hated_by = [[] for _ in chem_index.names]
+        unique_chem = np.zeros(len(self.pool), dtype=np.int64)
+        pool_mask = chem_index.mask(self.pool)
+        positive_available = np.zeros(len(self.pool), dtype=np.int64)
+        negative_available = np.zeros(len(self.pool), dtype=np.int64)
+        for p, cid in enumerate(chem_ids.tolist()):
+            if cid < 0:
+                continue
+            chemistry = chem_index.chem_bits[cid]
+            hate = chem_index.hate_bits[cid]
+            for j in bit_ids(chemistry):
+                liked_by[j].append(p)
+            for j in bit_ids(hate):
+                hated_by[j].append(p)
+            unique_chem[p] = chemistry.bit_count()
+            available = pool_mask & ~(1 << cid)
+            positive_available[p] = (chemistry & available).bit_count()
+            negative_available[p] = (hate & available).bit_count()
+        self.liked_by = [np.array(positions, dtype=np.int64) for positions in liked_by]
+        self.hated_by = [np.array(positions, dtype=np.int64) for positions in hated_by]
+        self.unique_chem = unique_chem
+        self.positive_available = positive_available
+        self.negative_available = negative_available
+
+        # Stat bounds over the pool: rows sorted by each column, with the first / last live row
+        self.stat_order = [np.argsort(self.stats[:, column], kind='stable') for column in range(self.stats.shape[1])]
+        self.stat_low = [0] * self.stats.shape[1]
+        self.stat_high = [len(self.pool) - 1] * self.stats.shape[1]
+        self._scaled_stats = None
+
+        self.rosters = {}
+        self.positive_team = {}
+        self.negative_team = {}
+        for team, players in teams.items():
+            self._add_team(team)
+            for player in players:
+                self.apply_pick(team, player)
+
+    def _add_team(self, team):
+        self.rosters[team] = []
+        self.positive_team[team] = np.zeros(len(self.pool), dtype=np.int64)
+        self.negative_team[team] = np.zeros(len(self.pool), dtype=np.int64)
+
+    def apply_pick(self, team, player):
+        """
+        Adds player to team's roster and removes them from the pool.
+        """
+        if team not in self.rosters:
+            self._add_team(team)
+        chem_index = self.table.chem_index
+        self.rosters[team].append(player)
+
+        # A team member only counts once, like the set intersections
+        cid = chem_index.ids.get(player)
+        if cid is not None and self.rosters[team].count(player) == 1:
+            self.positive_team[team][self.liked_by[cid]] += 1
+            self.negative_team[team][self.hated_by[cid]] += 1
+
+        p = self.positions.get(player)
+        if p is not None and self.alive[p]:
+            self.alive[p] = False
+            self.remaining_count -= 1
+            if cid is not None:
+                self.positive_available[self.liked_by[cid]] -= 1
+                self.negative_available[self.hated_by[cid]] -= 1
+            for column, order in enumerate(self.stat_order):
+                if order[self.stat_low[column]] == p or order[self.stat_high[column]] == p:
+                    self._scaled_stats = None
+
+    def remove_pick(self, team):
+        """
+        Takes back team's last pick, the exact reverse of apply_pick. Returns the player.
+        """
+        chem_index = self.table.chem_index
+        player = self.rosters[team].pop()
+
+        cid = chem_index.ids.get(player)
+        if cid is not None and player not in self.rosters[team]:
+            self.positive_team[team][self.liked_by[cid]] -= 1
+            self.negative_team[team][self.hated_by[cid]] -= 1
+
+        p = self.positions.get(player)
+        if p is not None and not self.alive[p] and not any(player in roster for roster in self.rosters.values()):
+            self.alive[p] = True
+            self.remaining_count += 1
+            if cid is not None:
+                self.positive_available[self.liked_by[cid]] += 1
+                self.negative_available[self.hated_by[cid]] += 1
+            # The bounds only ever move inwards, a player coming back may widen them again
+            self.stat_low = [0] * len(self.stat_order)
+            self.stat_high = [len(self.pool) - 1] * len(self.stat_order)
+            self._scaled_stats = None
+        return player
+
+    def sync(self, teams):
+        """
+        Brings the rosters to teams: picks that are no longer in them (undone) are taken back
+        and picks this state has not seen yet are applied. Returns False if a team is missing
+        from teams, and the state must be rebuilt.
+        """
+        if any(team not in teams for team in self.rosters):
+            return False
+        kept = {}
+        for team, roster in self.rosters.items():
+            players = teams[team]
+            common = 0
+            while common < min(len(roster), len(players)) and roster[common] == players[common]:
+                common += 1
+            kept[team] = common
+        # Take back before applying, a player undone from one team may have gone to another
+        for team, common in kept.items():
+            while len(self.rosters[team]) > common:
+                self.remove_pick(team)
+        for team, players in teams.items():
+            for player in players[kept.get(team, 0):]:
+                self.apply_pick(team, player)
+        return True
+
+    def remaining(self):
+        return [self.pool[p] for p in np.flatnonzero(self.alive).tolist()]
+
+    def _live_positions(self):
+        return np.flatnonzero(self.alive)
+
+    def _stat_bounds(self):
+        low = np.empty(len(self.stat_order))
+        high = np.empty(len(self.stat_order))
+        for column, order in enumerate(self.stat_order):
+            while self.stat_low[column] < len(order) - 1 and not self.alive[order[self.stat_low[column]]]:
+                self.stat_low[column] += 1
+            while self.stat_high[column] > 0 and not self.alive[order[self.stat_high[column]]]:
+                self.stat_high[column] -= 1
+            low[column] = self.stats[order[self.stat_low[column]], column]
+            high[column] = self.stats[order[self.stat_high[column]], column]
+        return low, high
+
+    def _scaled_stat_columns(self):
+        # Scaled stats only change when a pick moves a min/max bound, so they are cached until then
+        if self._scaled_stats is None:
+            low, high = self._stat_bounds()
+            spread = high - low
+            constant = spread == 0
+            scaled = (self.stats - low) / np.where(constant, 1, spread)
+            scaled[:, constant] = 0
+            self._scaled_stats = np.round(scaled, 2)
+        return self._scaled_stats
+
+    def chemistry_counts(self, team):
+        """
+        Returns (live positions, chemistry count, hate count) of every remaining player with team's roster.
+        """
+        live = self._live_positions()
+        return live, self.positive_team[team][live], self.negative_team[team][live]
+
+    def chemistry_scores(self, team, live=None):
+        if live is None:
+            live = self._live_positions()
+        team_size = len(self.rosters[team])
+        weight_current_team = 1 / (1 + math.exp(-self.k * (team_size - self.x0)))
+        weight_available_players = 1 - weight_current_team
+        weight_unique_chem = weight_available_players
+
+        known = live[self.has_chem[live]]
+        chemistry_metric = (
+            weight_current_team * (self.positive_team[team][known] - self.negative_team[team][known] * self.neg_chem_weight) +
+            weight_available_players * (self.positive_available[known] - self.negative_available[known] * self.neg_chem_weight) +
+            weight_unique_chem * (self.unique_chem[known])
+        )
+        scores = np.zeros(len(live), dtype=np.float64)
+        scores[self.has_chem[live]] = [round(value, 2) for value in chemistry_metric.tolist()]
+        return scores
+
+    def score(self, team):
+        """
+        Same (players, raw, scaled, total) as ScoreTable.score(remaining players, team's roster).
+        """
+        if team not in self.rosters:
+            self._add_team(team)
+        live = self._live_positions()
+        raw = np.empty((len(live), len(METRICS)), dtype=np.float64)
+        raw[:, 0] = self.chemistry_scores(team, live)
+        raw[:, 1:] = self.stats[live]
+        scaled = np.empty_like(raw)
+        if len(live):
+            chem = raw[:, 0]
+            low = chem.min()
+            spread = chem.max() - low
+            column = np.zeros(len(live)) if spread == 0 else (chem - low) / spread
+            scaled[:, 0] = [round(value, 2) for value in column.tolist()]
+            scaled[:, 1:] = self._scaled_stat_columns()[live]
+        return [self.pool[p] for p in live.tolist()], raw, scaled, weighted_total(scaled, self.weights)
+
+    def player_tuples(self, team):
+        """
+        Same tuples as calculate_scores(remaining players, team's roster, ...).
+        """
+        players, raw, scaled, total = self.score(team)
+        return [(player, row_total, *row) for player, row_total, row in zip(players, total.tolist(), scaled.tolist())]
+
+    def top(self, team, k):
+        """
+        The k best player tuples for team, by total score, without sorting the whole pool.
+        Ties keep pool order, like sorting the calculate_scores list.
+        """
+        players, raw, scaled, total = self.score(team)
+        order = top_k_indices(total, k)
+        return [(players[i], total[i].item(), *scaled[i].tolist()) for i in order.tolist()]
+
+    def recommendations(self, team, sort='score', filters=(), offset=0, limit=5):
+        """
+        One page of team's recommendations: (number of players passing the filters,
+        [(player, total, scaled metrics, chemistry count, hate count)]).
+
+        sort is 'score' (the calculate_scores total), a metric from METRICS, or 'chemistry'
+        (the sort_available_players order). filters is [(metric, low, high)] on the scaled
+        metrics, either bound may be None. Score and metric sorts only rank the first
+        offset + limit players; ties keep pool order.
+        """
+        players, raw, scaled, total = self.score(team)
+        live, positive, negative = self.chemistry_counts(team)
+        keep = np.ones(len(players), dtype=bool)
+        for metric, low, high in filters:
+            column = scaled[:, METRICS.index(metric)]
+            if low is not None:
+                keep &= column >= low
+            if high is not None:
+                keep &= column <= high
+        matching = np.flatnonzero(keep)
+
+        if sort == 'chemistry':
+            index = {player: i for i, player in enumerate(players)}
+            order = [i for i in (index[player] for player in self.sorted_players(team)) if keep[i]][offset:offset + limit]
+        else:
+            values = total if sort == 'score' else scaled[:, METRICS.index(sort)]
+            order = matching[top_k_indices(values[matching], offset + limit)][offset:].tolist()
+        page = [(players[i], total[i].item(), scaled[i].tolist(), int(positive[i]), int(negative[i])) for i in order]
+        return len(matching), page
+
+    def sorted_players(self, team):
+        """
+        Same order as sort_available_players(remaining players, team's roster, chem_data).
+        """
+        if team not in self.rosters:
+            self._add_team(team)
+        live, positive, negative = self.chemistry_counts(team)
+        good = positive > 0
+        hated = ~good & (negative > 0)
+        neutral = ~good & ~hated
+        groups = []
+        for group in (good, neutral, hated):
+            positions = live[group]
+            # Stable sort by chemistry descending then hate ascending, ties keep pool order
+            order = np.lexsort((negative[group], -positive[group]))
+            groups.extend(positions[order].tolist())
+        return [self.pool[p] for p in groups]
+
+def top_k_indices(values, k):
+    """
+    Indices of the k largest values, largest first, with ties in index order (a stable
+    descending sort cut to k). Uses a partial partition so only the top k get sorted.
+    """
+    n = len(values)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-values, kind='stable')
+    kth = values[np.argpartition(-values, k - 1)[k - 1]]
+    candidates = np.flatnonzero(values >= kth)
+    return candidates[np.argsort(-values[candidates], kind='stable')][:k]
+
+def _known_ids(chem_index, players):
+    return [chem_index.ids[player] for player in players if player in chem_index.ids]
+
+# Score tables already built, keyed by id() of the three source DataFrames
+_tables = {}
+
+def get_score_table(chem_data, player_stats, season_data):
+    """
+    Returns the ScoreTable for the given DataFrames, building it on first use.
+    """
+    key = (id(chem_data), id(player_stats), id(season_data))
+    table = _tables.get(key)
+    if table is None:
+        table = ScoreTable.from_frames(chem_data, player_stats, season_data)
+        _tables[key] = table
+        for frame in (player_stats, season_data):
+            weakref.finalize(frame, _tables.pop, key, None)
+        if not isinstance(chem_data, ChemIndex):
+            weakref.finalize(chem_data, _tables.pop, key, None)
+    return table
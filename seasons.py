@@ -0,0 +1,135 @@
+import weakref
+import numpy as np
+
+class SeasonRollup:
+    """
+    One season of Season Data reduced to per-character rollups: for every character the
+    sum of every numeric column and the number of values (non-NaN rows) in it, plus the same
+    over the whole sheet. Sums and counts add up across seasons, so any mean or total over
+    several seasons (weighted or not) comes from the rollups without reading the sheets again.
+    Blank cells count for neither, like pandas' mean() skipping NaN.
+    """
+
+    def __init__(self, name, characters, counts, sums, columns, column_counts, column_sums):
+        self.name = name
+        self.characters = characters  # row -> character ('First Name')
+        self.counts = counts  # (len(characters), len(columns)) values per character and column
+        self.sums = sums  # (len(characters), len(columns)) column sums per character
+        self.columns = columns
+        self.column_counts = column_counts  # Values in each column over every row of the season
+        self.column_sums = column_sums  # Sum of each column over every row of the season
+
+    @classmethod
+    def from_frame(cls, name, season_data):
+        numeric = season_data.select_dtypes('number')
+        grouped = numeric.groupby(season_data['First Name'], sort=False)
+        sums = grouped.sum()
+        return cls(
+            name,
+            list(sums.index),
+            grouped.count().reindex(sums.index).to_numpy(dtype=np.float64),
+            sums.to_numpy(dtype=np.float64),
+            list(numeric.columns),
+            numeric.count().to_numpy(dtype=np.float64),
+            np.array([numeric[column].sum() for column in numeric.columns], dtype=np.float64),
+        )
+
+class SeasonRollups:
+    """
+    The seasons ingested so far, oldest first. add() takes a new season (or replaces a
+    season of the same name); aggregate() combines them into SeasonStats, optionally
+    weighting recent seasons more.
+    """
+
+    def __init__(self, seasons=()):
+        self.seasons = list(seasons)
+
+    def add(self, rollup):
+        for n, season in enumerate(self.seasons):
+            if season.name == rollup.name:
+                self.seasons[n] = rollup
+                return
+        self.seasons.append(rollup)
+
+    def names(self):
+        return [season.name for season in self.seasons]
+
+    def aggregate(self, decay=1.0):
+        """
+        Combines every season into SeasonStats. Each season counts decay ** (seasons after it)
+        times, so decay 1 treats all rows alike and e.g. 0.5 halves a season's weight with
+        every newer one. O(characters x seasons), the sheets are never read again.
+        """
+        columns = list(dict.fromkeys(column for season in self.seasons for column in season.columns))
+        characters = list(dict.fromkeys(character for season in self.seasons for character in season.characters))
+        rows = {character: i for i, character in enumerate(characters)}
+        counts = np.zeros((len(characters), len(columns)))
+        sums = np.zeros((len(characters), len(columns)))
+        column_counts = np.zeros(len(columns))
+        column_sums = np.zeros(len(columns))
+        for age, season in enumerate(reversed(self.seasons)):
+            weight = decay ** age
+            season_rows = [rows[character] for character in season.characters]
+            season_columns = [columns.index(column) for column in season.columns]
+            counts[np.ix_(season_rows, season_columns)] += weight * season.counts
+            sums[np.ix_(season_rows, season_columns)] += weight * season.sums
+            column_counts[season_columns] += weight * season.column_counts
+            column_sums[season_columns] += weight * season.column_sums
+        return SeasonStats(characters, counts, sums, columns, column_counts, column_sums)
+
+class SeasonStats:
+    """
+    Per-character season statistics aggregated over the ingested seasons. mean() and
+    total() are dictionary lookups; overall_mean() is a column's mean over every row. Means
+    skip blank cells (NaN), a character without any value in the column gets NaN.
+    """
+
+    def __init__(self, characters, counts, sums, columns, column_counts, column_sums):
+        self.characters = characters
+        self.rows = {character: i for i, character in enumerate(characters)}
+        self.counts = counts
+        self.sums = sums
+        self.columns = columns
+        self.column_counts = column_counts
+        self.column_sums = column_sums
+
+    @classmethod
+    def from_frame(cls, season_data):
+        return SeasonRollups([SeasonRollup.from_frame('Season Data', season_data)]).aggregate()
+
+    def mean(self, column):
+        """
+        {character: mean of column over the character's rows}, e.g. mean('Slugging Percentage').
+        """
+        c = self.columns.index(column)
+        with np.errstate(invalid='ignore'):
+            values = self.sums[:, c] / self.counts[:, c]
+        return dict(zip(self.characters, values.tolist()))
+
+    def total(self, column):
+        """
+        {character: sum of column over the character's rows}, e.g. total('Home Runs').
+        """
+        return dict(zip(self.characters, self.sums[:, self.columns.index(column)].tolist()))
+
+    def overall_mean(self, column):
+        c = self.columns.index(column)
+        return float(self.column_sums[c] / self.column_counts[c]) if self.column_counts[c] else float('nan')
+
+# Aggregates already built, keyed by id() of the season DataFrame, dropped with the frame
+_stats = {}
+
+def get_season_stats(season_data):
+    """
+    Returns the SeasonStats of a Season Data DataFrame (a single season), building it on
+    first use. Passing SeasonStats returns them unchanged.
+    """
+    if isinstance(season_data, SeasonStats):
+        return season_data
+    key = id(season_data)
+    stats = _stats.get(key)
+    if stats is None:
+        stats = SeasonStats.from_frame(season_data)
+        _stats[key] = stats
+        weakref.finalize(season_data, _stats.pop, key, None)
+    return stats
@@ -0,0 +1,184 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from draft_engine import Draft, run_draft, STRATEGIES, by_ranking
+
+# Outcomes measured for every team at the end of a draft
+OUTCOMES = ['chemistry', 'hate', 'stat_total']
+
+# Per-process simulation data, set up once by _init_worker
+_context = None
+
+class SimulationContext:
+    """
+    Everything a worker needs to play drafts: the league, the chemistry index, a static
+    calculate_scores ranking for the 'ranked' strategy and per-player stat values.
+    """
+
+    def __init__(self, teams, captains, chem_data, player_stats, season_data):
+        from scoring import get_score_table, DraftScores, min_max_scale
+
+        self.teams = list(teams)
+        self.captains = list(captains)
+        self.pool = list(player_stats['Character'])
+        self.table = get_score_table(chem_data, player_stats, season_data)
+        self.chem_index = self.table.chem_index
+        self.DraftScores = DraftScores
+
+        # Static ranking: calculate_scores totals for an empty roster, best first
+        players, raw, scaled, total = self.table.score(self.pool, [])
+        self.ranking = [players[i] for i in sorted(range(len(players)), key=lambda i: -total[i])]
+
+        # Stat value of a player: the sum of the six stat metrics, each min-max scaled over the pool
+        stats = min_max_scale(raw)[:, 1:].sum(axis=1)
+        self.stat_value = dict(zip(players, stats.tolist()))
+
+    def strategy(self, name):
+        if name == 'ranked':
+            return by_ranking(self.ranking)
+        return STRATEGIES[name]
+
+    def new_draft(self, rng, with_scores, scoring=None):
+        # scoring: DraftScores keyword arguments (chemistry parameters, metric weights)
+        scores = self.DraftScores(self.table, self.pool, {team: [] for team in self.teams}, **(scoring or {})) if with_scores else None
+        return Draft(self.teams, self.pool, self.captains, chem_index=self.chem_index, scores=scores, rng=rng)
+
+    def team_outcomes(self, roster):
+        """
+        Returns {outcome: value} for a final roster. Chemistry and hate count every teammate on a
+        player's Chemistry / Hate list, summed over the roster (hate is check_hate summed over the team).
+        """
+        chem_index = self.chem_index
+        team_mask = chem_index.mask(roster)
+        return {
+            'chemistry': sum(chem_index.chemistry_with(player, team_mask) for player in roster),
+            'hate': sum(chem_index.hate_with(player, team_mask) for player in roster),
+            'stat_total': sum(self.stat_value.get(player, 0.0) for player in roster),
+        }
+
+def draft_rng(seed, draft_number):
+    """
+    The rng for one simulated draft. It depends only on the seed and the draft's number,
+    so results are the same whatever the number of workers or the chunking.
+    """
+    return random.Random(f"{seed}:{draft_number}")
+
+def simulate_drafts(context, draft_numbers, seed, strategy_names):
+    """
+    Plays the given drafts, each team using a strategy drawn at random from strategy_names.
+    Returns one list per draft, in draft_numbers order, of (strategy name, {outcome: value})
+    for every team in draft slot order.
+    """
+    strategies = {name: context.strategy(name) for name in strategy_names}
+    results = []
+    for draft_number in draft_numbers:
+        rng = draft_rng(seed, draft_number)
+        assignment = {team: rng.choice(strategy_names) for team in context.teams}
+        draft = context.new_draft(rng, with_scores='best_score' in assignment.values())
+        run_draft(draft, {team: strategies[name] for team, name in assignment.items()})
+        results.append([(assignment[team], context.team_outcomes(draft.teams[team])) for team in context.teams])
+    return results
+
+def add_draft(totals, draft_results):
+    """
+    Adds one draft from simulate_drafts to running totals {group: {outcome: [count, sum, sum of
+    squares]}} where group is ('slot', i), ('strategy', name) or ('slot_strategy', i, name).
+    """
+    for slot, (name, outcomes) in enumerate(draft_results):
+        for group in (('slot', slot), ('strategy', name), ('slot_strategy', slot, name)):
+            group_totals = totals.setdefault(group, {outcome: [0, 0.0, 0.0] for outcome in OUTCOMES})
+            for outcome, value in outcomes.items():
+                running = group_totals[outcome]
+                running[0] += 1
+                running[1] += value
+                running[2] += value * value
+    return totals
+
+def summarize(totals):
+    """
+    Turns running totals into {group: {outcome: {'n', 'mean', 'std'}}}.
+    """
+    summary = {}
+    for group, group_totals in totals.items():
+        summary[group] = {}
+        for outcome, (count, total, squares) in group_totals.items():
+            mean = total / count
+            variance = max(squares / count - mean * mean, 0.0)
+            summary[group][outcome] = {'n': count, 'mean': mean, 'std': math.sqrt(variance)}
+    return summary
+
+def _init_worker():
+    global _context
+    import draft
+    _context = SimulationContext(draft.teams, draft.captains, draft.chem_data, draft.player_stats, draft.season_data)
+
+def _run_chunk(draft_numbers, seed, strategy_names):
+    return simulate_drafts(_context, draft_numbers, seed, strategy_names)
+
+def run_simulation(num_drafts, seed=0, strategy_names=('random', 'best_chemistry', 'ranked'), workers=None, chunk_size=None):
+    """
+    Runs num_drafts drafts across a process pool and returns the summary from summarize().
+    The drafts are added to the totals one at a time in draft order, so the floating point sums
+    (and the summary) are identical for any number of workers or chunk size.
+    """
+    strategy_names = list(strategy_names)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, math.ceil(num_drafts / (workers * 4)))
+    chunks = [range(start, min(start + chunk_size, num_drafts)) for start in range(0, num_drafts, chunk_size)]
+
+    totals = {}
+    if workers == 1:
+        _init_worker()
+        for chunk in chunks:
+            for draft_results in _run_chunk(chunk, seed, strategy_names):
+                add_draft(totals, draft_results)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            # map() yields the chunks in submission order, which is draft order
+            for chunk_results in executor.map(_run_chunk, chunks, [seed] * len(chunks), [strategy_names] * len(chunks)):
+                for draft_results in chunk_results:
+                    add_draft(totals, draft_results)
+    return summarize(totals)
+
+def print_summary(summary, teams):
+    def row(label, outcomes):
+        cells = [f"{outcomes[outcome]['mean']:8.2f} ±{outcomes[outcome]['std']:6.2f}" for outcome in OUTCOMES]
+        print(f"{label:<20} {outcomes[OUTCOMES[0]]['n']:>8} " + " ".join(cells))
+
+    header = f"{'':<20} {'teams':>8} " + " ".join(f"{outcome:>16}" for outcome in OUTCOMES)
+    print("\nBy draft slot:")
+    print(header)
+    for slot, team in enumerate(teams):
+        if ('slot', slot) in summary:
+            row(f"{slot + 1}. {team}", summary[('slot', slot)])
+    print("\nBy strategy:")
+    print(header)
+    for group in sorted(group for group in summary if group[0] == 'strategy'):
+        row(group[1], summary[group])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of full snake drafts with randomized strategies.")
+    parser.add_argument('--drafts', type=int, default=1000, help="number of drafts to simulate")
+    parser.add_argument('--seed', type=int, default=0, help="base seed, the same seed always gives the same drafts")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--strategies', nargs='+', default=['random', 'best_chemistry', 'ranked'],
+                        choices=sorted(STRATEGIES) + ['ranked'], help="strategies drawn at random for every team")
+    parser.add_argument('--json', help="also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = run_simulation(args.drafts, seed=args.seed, strategy_names=args.strategies, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    import draft
+    print(f"Simulated {args.drafts} drafts in {elapsed:.2f}s ({args.drafts / elapsed:.0f} drafts/s)")
+    print_summary(summary, list(draft.teams))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([{'group': list(group), 'outcomes': outcomes} for group, outcomes in sorted(summary.items(), key=lambda item: str(item[0]))], f, indent=2)
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class Speculator:
+    """
+    Computes draft page rankings for the teams picking next on a background thread while the
+    team on the clock is still deciding, so the redirect after a pick renders from a warm cache.
+
+    A team's ranking only depends on its own roster and the pool, and the picks in between only
+    remove players from the pool, so a result is keyed by a hash of (draft, team, roster) and
+    stays usable as long as that roster is unchanged and the pool has only shrunk: the drafted
+    players are filtered out of it. Anything else (the team picked, the draft was reset) makes
+    the result stale and it is thrown away.
+    """
+
+    def __init__(self, compute, max_workers=1, max_entries=256):
+        self.compute = compute  # compute(roster, pool) -> ranked list of pool players
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='speculate')
+        self._results = OrderedDict()  # (draft_id, state hash) -> (pool set, Future)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def state_hash(team, roster):
+        return hashlib.sha1(json.dumps([team, list(roster)]).encode()).hexdigest()
+
+    def speculate(self, draft_id, team, roster, pool):
+        """
+        Starts computing team's ranking over pool unless a usable one is already cached or running.
+        """
+        key = (draft_id, self.state_hash(team, roster))
+        pool_set = frozenset(pool)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and pool_set <= cached[0]:
+                return
+            future = self._executor.submit(self.compute, list(roster), list(pool))
+            self._results[key] = (pool_set, future)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def get(self, draft_id, team, roster, remaining):
+        """
+        Returns team's cached ranking restricted to remaining, or None if there is no usable result.
+        Waits for a computation that is still running, it is already part way done.
+        """
+        key = (draft_id, self.state_hash(team, roster))
+        remaining_set = set(remaining)
+        with self._lock:
+            cached = self._results.pop(key, None)
+        if cached is None:
+            return None
+        pool_set, future = cached
+        if not remaining_set <= pool_set:
+            return None
+        try:
+            ranking = future.result()
+        except Exception:
+            return None
+        return [player for player in ranking if player in remaining_set]
+
+    def discard(self, draft_id):
+        """
+        Drops every result for a draft (e.g. when it is reset).
+        """
+        with self._lock:
+            for key in [key for key in self._results if key[0] == draft_id]:
+                del self._results[key]
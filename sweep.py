@@ -0,0 +1,286 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_cache import DATA_DIR, SEASON_DECAY, SOURCES, season_files
+from draft_engine import run_draft, among_best
+from roster_search import HATE_WEIGHT, ROSTER_SIZE
+from scoring import METRICS
+from simulate import SimulationContext, draft_rng
+
+# Scoring parameters swept: calculate_chemistry_metric's k, x0 and neg_chem_weight, and the
+# weight of every metric in the total score (in METRICS order). These are the app's defaults
+DEFAULTS = {'k': 0.9, 'x0': 4.5, 'neg_chem_weight': 0.5, 'weights': [1.0] * len(METRICS)}
+
+# Ranges random search draws from (every metric weight from the same range)
+RANGES = {'k': (0.1, 2.0), 'x0': (1.0, 9.0), 'neg_chem_weight': (0.0, 1.5), 'weights': (0.0, 2.0)}
+
+# Every team picks at random among its best few recommendations, so drafts differ
+TOP_PICKS = 3
+
+# League outcomes measured for every setting, the mean over its drafts
+OUTCOMES = ['quality', 'balance', 'worst_team', 'chemistry', 'hate', 'stat_total']
+
+# Part of every cache key: bump it when evaluate() measures something different (2: results
+# summed in draft order)
+CACHE_VERSION = 2
+
+# Per-process simulation data, set up once by _init_worker
+_context = None
+
+def sweep_cache_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, '.cache', 'sweep.jsonl')
+
+def data_fingerprint(data_dir=DATA_DIR):
+    """
+    Hash of the spreadsheets' contents and the season decay, so cached results are only
+    reused for the same data.
+    """
+    digest = hashlib.sha256(str(SEASON_DECAY).encode())
+    for filename in list(SOURCES.values()) + season_files(data_dir)[1:]:
+        with open(os.path.join(data_dir, filename), 'rb') as f:
+            digest.update(filename.encode() + hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def normalize(params):
+    """
+    The full parameter set (missing ones at their defaults), rounded so the same setting always
+    hashes the same.
+    """
+    params = dict(DEFAULTS, **params)
+    weights = [round(float(weight), 4) for weight in params['weights']]
+    if len(weights) != len(METRICS):
+        raise ValueError(f"weights needs {len(METRICS)} values, one per metric ({', '.join(METRICS)})")
+    return {'k': round(float(params['k']), 4), 'x0': round(float(params['x0']), 4),
+            'neg_chem_weight': round(float(params['neg_chem_weight']), 4), 'weights': weights}
+
+def param_hash(params, settings):
+    """
+    Cache key of a setting: the parameters plus everything else the result depends on
+    (number of drafts, seed, data fingerprint).
+    """
+    key = json.dumps({'params': normalize(params), 'settings': settings, 'version': CACHE_VERSION}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def grid(ks, x0s, neg_chem_weights, weights):
+    """
+    Every combination of the given values, as a list of parameter dicts.
+    """
+    return [normalize({'k': k, 'x0': x0, 'neg_chem_weight': neg, 'weights': w})
+            for k, x0, neg, w in itertools.product(ks, x0s, neg_chem_weights, weights)]
+
+def random_points(count, seed=0, ranges=RANGES):
+    """
+    count settings drawn uniformly from ranges, the same ones for the same seed.
+    """
+    rng = random.Random(f"sweep:{seed}")
+    points = []
+    for _ in range(count):
+        points.append(normalize({
+            'k': rng.uniform(*ranges['k']),
+            'x0': rng.uniform(*ranges['x0']),
+            'neg_chem_weight': rng.uniform(*ranges['neg_chem_weight']),
+            'weights': [rng.uniform(*ranges['weights']) for _ in METRICS],
+        }))
+    return points
+
+def evaluate(context, params, draft_numbers, seed):
+    """
+    Plays the given drafts with every team following recommendations scored with params
+    (picking among its TOP_PICKS best) and returns {outcome: value} for every draft, in
+    draft_numbers order.
+
+    Teams are judged by their starting nine, their first ROSTER_SIZE picks (the whole pool is
+    drafted, so full rosters always add up to the same league). A team's quality is the nine's
+    stat value (the six stat metrics, each min-max scaled over the pool) plus their chemistry
+    minus HATE_WEIGHT per hate, per player. quality is the league's mean, balance the standard
+    deviation between its teams (lower is fairer) and worst_team the lowest team quality.
+    """
+    strategy = among_best(TOP_PICKS)
+    scoring = normalize(params)
+    results = []
+    for draft_number in draft_numbers:
+        # The same drafts for every setting (common random numbers), so settings differ by their picks only
+        draft = context.new_draft(draft_rng(seed, draft_number), with_scores=True, scoring=scoring)
+        run_draft(draft, strategy)
+
+        nines = [roster[:ROSTER_SIZE] for roster in draft.teams.values()]
+        teams = [context.team_outcomes(nine) for nine in nines]
+        sizes = [max(len(nine), 1) for nine in nines]
+        qualities = [(team['stat_total'] + team['chemistry'] - HATE_WEIGHT * team['hate']) / size for team, size in zip(teams, sizes)]
+        mean = sum(qualities) / len(qualities)
+        results.append({
+            'quality': mean,
+            'balance': math.sqrt(sum((quality - mean) ** 2 for quality in qualities) / len(qualities)),
+            'worst_team': min(qualities),
+            'chemistry': sum(team['chemistry'] for team in teams) / len(teams),
+            'hate': sum(team['hate'] for team in teams) / len(teams),
+            'stat_total': sum(team['stat_total'] for team in teams) / len(teams),
+        })
+    return results
+
+def rank(results, balance_weight=1.0):
+    """
+    Sorts results [{'params', 'result'}] best first by quality - balance_weight * balance,
+    adding that as 'objective'.
+    """
+    for entry in results:
+        entry['objective'] = entry['result']['quality'] - balance_weight * entry['result']['balance']
+    return sorted(results, key=lambda entry: -entry['objective'])
+
+def load_cache(path):
+    # {hash: entry} of every setting evaluated so far; a line cut short by an interrupted run is skipped
+    cache = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                cache[entry['hash']] = entry
+    except OSError:
+        pass
+    return cache
+
+def append_cache(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+
+def _init_worker():
+    global _context
+    import draft
+    _context = SimulationContext(draft.teams, draft.captains, draft.chem_data, draft.player_stats, draft.season_data)
+
+def _run_chunk(params, draft_numbers, seed):
+    return evaluate(_context, params, draft_numbers, seed)
+
+def run_sweep(points, drafts, seed=0, workers=None, cache_path=None, data_dir=DATA_DIR, progress=None):
+    """
+    Evaluates every setting in points over drafts simulated drafts across a process pool and
+    returns [{'hash', 'params', 'settings', 'result', 'cached'}] in points order. Settings already
+    in the cache are not simulated again, new results are appended as soon as they finish.
+    """
+    cache_path = cache_path or sweep_cache_path(data_dir)
+    settings = {'drafts': drafts, 'seed': seed, 'top_picks': TOP_PICKS, 'data': data_fingerprint(data_dir)}
+    cache = load_cache(cache_path)
+    entries = {}
+    todo = []
+    for params in points:
+        key = param_hash(params, settings)
+        if key in cache:
+            entries[key] = dict(cache[key], cached=True)
+        elif key not in entries and key not in {todo_key for todo_key, _ in todo}:
+            todo.append((key, normalize(params)))
+
+    if todo:
+        workers = workers or os.cpu_count() or 1
+        # Enough chunks per setting to keep every worker busy when there are only a few settings
+        chunks_per_point = max(1, min(drafts, math.ceil(workers * 2 / len(todo))))
+        chunk_size = math.ceil(drafts / chunks_per_point)
+        chunks = [range(start, min(start + chunk_size, drafts)) for start in range(0, drafts, chunk_size)]
+        pending = {key: len(chunks) for key, _ in todo}
+        chunk_results = {key: [None] * len(chunks) for key, _ in todo}
+        params_of = dict(todo)
+
+        def finished(key, n, results):
+            chunk_results[key][n] = results
+            pending[key] -= 1
+            if pending[key] == 0:
+                # Summed one draft at a time in draft order (not in the order the chunks finished),
+                # so the floating point result is the same for any scheduling or number of workers
+                draft_results = [values for results in chunk_results.pop(key) for values in results]
+                result = {outcome: sum(values[outcome] for values in draft_results) / len(draft_results) for outcome in OUTCOMES}
+                entry = {'hash': key, 'params': params_of[key], 'settings': settings, 'result': result}
+                append_cache(cache_path, entry)
+                entries[key] = dict(entry, cached=False)
+                if progress is not None:
+                    progress(len(entries), len(points), entry)
+
+        if workers == 1:
+            _init_worker()
+            for key, params in todo:
+                for n, chunk in enumerate(chunks):
+                    finished(key, n, _run_chunk(params, chunk, seed))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                futures = {executor.submit(_run_chunk, params, chunk, seed): (key, n) for key, params in todo for n, chunk in enumerate(chunks)}
+                for future in as_completed(futures):
+                    finished(*futures[future], future.result())
+
+    seen = set()
+    ordered = []
+    for params in points:
+        key = param_hash(params, settings)
+        if key not in seen:
+            seen.add(key)
+            ordered.append(entries[key])
+    return ordered
+
+def print_ranking(ranked, top):
+    default = normalize(DEFAULTS)
+    print(f"{'#':>3} {'objective':>9} {'quality':>8} {'balance':>8} {'worst':>7} {'chem':>6} {'hate':>5} {'stats':>6}  "
+          f"{'k':>5} {'x0':>5} {'neg':>5}  weights ({', '.join(METRICS)})")
+    for n, entry in enumerate(ranked, 1):
+        if n > top and entry['params'] != default:
+            continue
+        result = entry['result']
+        params = entry['params']
+        marker = '  (defaults)' if params == default else ''
+        print(f"{n:>3} {entry['objective']:>9.3f} {result['quality']:>8.3f} {result['balance']:>8.3f} {result['worst_team']:>7.3f} "
+              f"{result['chemistry']:>6.1f} {result['hate']:>5.1f} {result['stat_total']:>6.2f}  "
+              f"{params['k']:>5g} {params['x0']:>5g} {params['neg_chem_weight']:>5g}  "
+              f"{' '.join(f'{weight:g}' for weight in params['weights'])}{marker}")
+
+def _weights(text):
+    values = [float(value) for value in text.split(',')]
+    if len(values) != len(METRICS):
+        raise argparse.ArgumentTypeError(f"expected {len(METRICS)} comma-separated weights ({', '.join(METRICS)})")
+    return values
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep the chemistry parameters and metric weights of the pick recommendations over simulated drafts.")
+    parser.add_argument('--k', type=float, nargs='+', default=[DEFAULTS['k']], help="chemistry weight curve steepness values")
+    parser.add_argument('--x0', type=float, nargs='+', default=[DEFAULTS['x0']], help="roster sizes where the team's chemistry starts to count most")
+    parser.add_argument('--neg-chem-weight', type=float, nargs='+', default=[DEFAULTS['neg_chem_weight']], help="how much hate counts against chemistry")
+    parser.add_argument('--weights', type=_weights, nargs='+', default=[DEFAULTS['weights']],
+                        help=f"metric weights, {len(METRICS)} comma-separated values each ({', '.join(METRICS)})")
+    parser.add_argument('--random', type=int, default=0, help="random settings to draw instead of the grid")
+    parser.add_argument('--drafts', type=int, default=200, help="simulated drafts per setting")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the drafts and the random settings")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--balance-weight', type=float, default=1.0, help="how much imbalance between teams counts against quality")
+    parser.add_argument('--top', type=int, default=10, help="settings to show")
+    parser.add_argument('--json', help="also write the ranked results to this JSON file")
+    args = parser.parse_args()
+
+    if args.random:
+        points = [normalize(DEFAULTS)] + random_points(args.random, args.seed)
+    else:
+        points = grid(args.k, args.x0, args.neg_chem_weight, args.weights)
+        if normalize(DEFAULTS) not in points:
+            points.insert(0, normalize(DEFAULTS))
+
+    def progress(done, total, entry):
+        print(f"  {done}/{total} k={entry['params']['k']:g} x0={entry['params']['x0']:g} neg={entry['params']['neg_chem_weight']:g}: "
+              f"quality {entry['result']['quality']:.3f}, balance {entry['result']['balance']:.3f}", flush=True)
+
+    start = time.perf_counter()
+    results = run_sweep(points, args.drafts, seed=args.seed, workers=args.workers, progress=progress)
+    elapsed = time.perf_counter() - start
+    cached = sum(entry['cached'] for entry in results)
+    print(f"Evaluated {len(results)} settings ({len(results) - cached} simulated, {cached} from the cache) "
+          f"of {args.drafts} drafts each in {elapsed:.1f}s\n")
+    ranked = rank(results, args.balance_weight)
+    print_ranking(ranked, args.top)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(ranked, f, indent=2)
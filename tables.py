@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from characters import CharacterRegistry
+from chem_index import ChemIndex
+
+TABLES_VERSION = 3
+
+# Arrays of a compiled table set, one .npy file each
+ARRAYS = (
+    'names',          # Character ID -> name, the pool first (the CharacterRegistry's IDs, also the chemistry IDs)
+    'chem_packed',    # (n, ceil(n / 8)) uint8, bit j of row i set if j is on i's Chemistry list
+    'hate_packed',    # Same for the Hate lists
+    'has_row',        # Chemistry ID -> character has its own row in the chemistry sheet
+    'chem_matrix',    # Dense float32 copies of the adjacency for the BLAS scoring path
+    'hate_matrix',
+    'score_names',    # ScoreTable row -> character name
+    'score_stats',    # (len(score_names) + 1, 6) ScoreTable stat matrix, last row is the fallback
+    'pool',           # Player Statistics characters, in sheet order
+    'player_stats',   # (len(pool), len(stat_columns)) numeric Player Statistics columns
+)
+
+class CharacterTables:
+    """
+    The static character data compiled to flat arrays: character IDs, packed Chemistry / Hate
+    adjacency, the scoring stat matrix and the numeric Player Statistics columns.
+
+    A compiled set is a directory of .npy files that load() memory-maps read-only, so every
+    worker process on the machine shares the same pages and starting a worker parses nothing.
+    registry(), chem_index() and score_table() wrap the mapped arrays in the usual
+    CharacterRegistry / ChemIndex / ScoreTable, which share one set of character IDs.
+    """
+
+    def __init__(self, arrays, stat_columns):
+        self.arrays = arrays
+        self.stat_columns = stat_columns  # Column names of the player_stats array
+        self.pool = arrays['pool'].tolist()
+        self._registry = None
+        self._chem_index = None
+        self._score_table = None
+
+    @classmethod
+    def from_frames(cls, chem_data, player_stats, season_data):
+        from scoring import ScoreTable
+
+        # The pool is interned first, so a character's chemistry ID is its registry ID
+        chem_index = ChemIndex.from_dataframe(chem_data, names=dict.fromkeys(player_stats['Character']))
+        table = ScoreTable.from_frames(chem_index, player_stats, season_data)
+        n = len(chem_index.names)
+        numeric = player_stats.select_dtypes('number')
+        arrays = {
+            'names': np.array(chem_index.names, dtype=str),
+            'chem_packed': _pack(chem_index.chem_bits, n),
+            'hate_packed': _pack(chem_index.hate_bits, n),
+            'has_row': np.array(chem_index.has_row, dtype=bool),
+            'chem_matrix': table.chem_matrix,
+            'hate_matrix': table.hate_matrix,
+            'score_names': np.array(table.names, dtype=str),
+            'score_stats': table.stats,
+            'pool': np.array(list(player_stats['Character']), dtype=str),
+            'player_stats': numeric.to_numpy(dtype=np.float64),
+        }
+        return cls(arrays, list(numeric.columns))
+
+    def save(self, path, meta=None):
+        """
+        Writes the table set to the directory path, replacing any previous set there.
+        Workers still mapping the old files keep reading them until they reload.
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        # Build in a fresh directory and point the path at it with a symlink swap, so readers
+        # always see a complete set
+        build = os.path.join(parent, f".{os.path.basename(path)}-{uuid.uuid4().hex}")
+        os.makedirs(build)
+        for name in ARRAYS:
+            np.save(os.path.join(build, f"{name}.npy"), np.ascontiguousarray(self.arrays[name]))
+        with open(os.path.join(build, 'meta.json'), 'w') as f:
+            json.dump({'version': TABLES_VERSION, 'stat_columns': self.stat_columns, **(meta or {})}, f)
+
+        link = f"{path}.{os.getpid()}.tmp"
+        os.symlink(os.path.basename(build), link)
+        previous = os.path.realpath(path) if os.path.islink(path) else None
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        os.replace(link, path)
+        if previous and previous != os.path.realpath(path):
+            shutil.rmtree(previous, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Maps a saved table set. Returns (tables, meta), or None if it is missing or from an older format.
+        """
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            if meta.get('version') != TABLES_VERSION:
+                return None
+            arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None) for name in ARRAYS}
+        except (OSError, ValueError):
+            return None
+        return cls(arrays, meta['stat_columns']), meta
+
+    def registry(self):
+        if self._registry is None:
+            self._registry = CharacterRegistry(self.chem_index().names, len(dict.fromkeys(self.pool)))
+        return self._registry
+
+    def chem_index(self):
+        if self._chem_index is None:
+            arrays = self.arrays
+            index = ChemIndex(
+                arrays['names'].tolist(),
+                _unpack(arrays['chem_packed']),
+                _unpack(arrays['hate_packed']),
+                arrays['has_row'].tolist(),
+            )
+            index._matrices = (arrays['chem_matrix'], arrays['hate_matrix'])
+            self._chem_index = index
+        return self._chem_index
+
+    def score_table(self):
+        if self._score_table is None:
+            from scoring import ScoreTable
+
+            self._score_table = ScoreTable(self.chem_index(), self.arrays['score_names'].tolist(), self.arrays['score_stats'])
+        return self._score_table
+
+    def stat(self, column):
+        """
+        {character: value} of a numeric Player Statistics column, e.g. stat('Speed').
+        """
+        values = self.arrays['player_stats'][:, self.stat_columns.index(column)]
+        return dict(zip(self.pool, values.tolist()))
+
+def _pack(bitsets, n):
+    # Python int bitsets -> rows of little-endian packed bits
+    width = (n + 7) // 8
+    return np.array([list(bits.to_bytes(width, 'little')) for bits in bitsets], dtype=np.uint8).reshape(len(bitsets), width)
+
+def _unpack(packed):
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
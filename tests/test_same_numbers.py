@@ -0,0 +1,170 @@
+"""
+Regression tests: the chemistry index, the batch scorer and the incremental draft scores give
+exactly the numbers of the original DataFrame code, on the real spreadsheets in data/.
+
+The _old_* functions are the original implementations (utils.calculate_chemistry_metric and
+app.calculate_scores / sort_available_players before the index), kept here as the reference.
+
+    python -m pytest tests
+"""
+import math
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chem_index import get_chem_index
+from data_cache import load_data
+from scoring import DraftScores, get_score_table
+from utils import create_player_tuples, min_max_scale_scores
+
+@pytest.fixture(scope='module')
+def frames():
+    return load_data(os.path.join(ROOT, 'data'))
+
+def _old_chemistry_metric(current_team, player, remaining_players, df, k=0.9, x0=4.5, neg_chem_weight=.5):
+    available_players = list(set(remaining_players) - set([player]))
+    team_size = len(current_team)
+    weight_current_team = 1 / (1 + math.exp(-k * (team_size - x0)))
+    weight_available_players = 1 - weight_current_team
+    weight_unique_chem = weight_available_players
+
+    player_row = df[df['Character Name'] == player]
+    if player_row.empty:
+        return 0.0
+    player_row = player_row.iloc[0]
+
+    chemistry_list = player_row['Chemistry'] if isinstance(player_row['Chemistry'], (list, set)) else []
+    hate_list = player_row['Hate'] if isinstance(player_row['Hate'], (list, set)) else []
+
+    positive_chem_current_team = len(set(chemistry_list).intersection(current_team))
+    negative_chem_current_team = len(set(hate_list).intersection(current_team)) * neg_chem_weight
+    positive_chem_available_players = len(set(chemistry_list).intersection(available_players))
+    negative_chem_available_players = len(set(hate_list).intersection(available_players)) * neg_chem_weight
+    unique_chem = len(set(chemistry_list) - set([item for string in current_team for item in df.loc[df['Character Name'] == string, 'Chemistry'].values[0] if isinstance(item, (list, set))]))
+
+    chemistry_metric = (
+        weight_current_team * (positive_chem_current_team - negative_chem_current_team) +
+        weight_available_players * (positive_chem_available_players - negative_chem_available_players) +
+        weight_unique_chem * (unique_chem)
+    )
+    return round(chemistry_metric, 2)
+
+def _old_calculate_scores(players, team_players, chem_data, player_stats, season_data):
+    if not players:
+        return []
+
+    scores = {}
+    for player in players:
+        chem_score = _old_chemistry_metric(team_players, player, players, chem_data)
+        stats = player_stats.loc[player_stats['Character'] == player]
+        season_stats = season_data.loc[season_data['First Name'] == player]
+
+        if season_stats.empty:
+            slugging = season_data['Slugging Percentage'].mean() * 0.25
+            home_runs = season_data['Home Runs'].mean() * 0.25
+        else:
+            slugging = season_stats['Slugging Percentage'].mean()
+            home_runs = season_stats['Home Runs'].sum()
+
+        if stats.empty:
+            charge_hit_power = player_stats['Charge Hit Power'].mean() * 0.25
+            slap_hit_power = player_stats['Slap Hit Power'].mean() * 0.25
+            speed = player_stats['Speed'].mean() * 0.25
+            pitching_stamina = player_stats['Pitching Stamina'].mean() * 0.25
+        else:
+            charge_hit_power = stats['Charge Hit Power'].values[0]
+            slap_hit_power = stats['Slap Hit Power'].values[0]
+            speed = stats['Speed'].values[0]
+            pitching_stamina = stats['Pitching Stamina'].values[0]
+
+        scores[player] = {
+            'chem_score': chem_score,
+            'slugging': slugging,
+            'charge_hit_power': charge_hit_power,
+            'slap_hit_power': slap_hit_power,
+            'speed': speed,
+            'home_runs': home_runs,
+            'pitching_stamina': pitching_stamina,
+        }
+
+    return create_player_tuples(min_max_scale_scores(scores))
+
+def _old_sort_available_players(remaining_players, current_team, chem_data):
+    groups = ([], [], [])  # Good chemistry, neutral, hated
+    for player in remaining_players:
+        player_chem_data = chem_data.loc[chem_data['Character Name'] == player]
+        if not player_chem_data.empty:
+            chemistry_list = player_chem_data['Chemistry'].values[0] if isinstance(player_chem_data['Chemistry'].values[0], (list, set)) else []
+            hate_list = player_chem_data['Hate'].values[0] if isinstance(player_chem_data['Hate'].values[0], (list, set)) else []
+        else:
+            chemistry_list = []
+            hate_list = []
+        positive_chem = len(set(chemistry_list).intersection(current_team))
+        negative_chem = len(set(hate_list).intersection(current_team))
+        group = 0 if positive_chem > 0 else 2 if negative_chem > 0 else 1
+        groups[group].append((player, positive_chem, negative_chem))
+    for group in groups:
+        group.sort(key=lambda x: (x[1], -x[2]), reverse=True)
+    return [player for group in groups for player, _, _ in group]
+
+def _mid_draft(rng, pool, chem_names, team_size):
+    # A roster of chemistry sheet characters (the old code needs their rows) and the rest of the pool
+    roster = rng.sample([player for player in pool if player in chem_names], team_size)
+    taken = set(roster) | set(rng.sample(pool, rng.randrange(len(pool) // 2)))
+    return roster, [player for player in pool if player not in taken]
+
+def test_chemistry_metric_matches_dataframe_code(frames):
+    chem_data, player_stats, _ = frames
+    chem_index = get_chem_index(chem_data)
+    pool = list(player_stats['Character'])
+    chem_names = set(chem_data['Character Name'])
+    rng = random.Random(1)
+    for team_size in range(10):
+        roster, remaining = _mid_draft(rng, pool, chem_names, team_size)
+        for player in rng.sample(remaining, 20):
+            for k, x0, neg_chem_weight in ((0.9, 4.5, .5), (0.3, 2.0, 1.2)):
+                expected = _old_chemistry_metric(roster, player, remaining, chem_data, k, x0, neg_chem_weight)
+                assert chem_index.chemistry_metric(roster, player, remaining, k=k, x0=x0, neg_chem_weight=neg_chem_weight) == expected
+
+def test_score_table_matches_calculate_scores(frames):
+    chem_data, player_stats, season_data = frames
+    table = get_score_table(chem_data, player_stats, season_data)
+    pool = list(player_stats['Character'])
+    chem_names = set(chem_data['Character Name'])
+    rng = random.Random(2)
+    for team_size in (0, 3, 8):
+        roster, remaining = _mid_draft(rng, pool, chem_names, team_size)
+        assert table.player_tuples(remaining, roster) == _old_calculate_scores(remaining, roster, chem_data, player_stats, season_data)
+
+def test_draft_scores_match_full_recompute(frames):
+    chem_data, player_stats, season_data = frames
+    table = get_score_table(chem_data, player_stats, season_data)
+    pool = list(player_stats['Character'])
+    teams = ['A', 'B', 'C', 'D']
+    rng = random.Random(3)
+    scores = DraftScores(table, pool, {team: [] for team in teams})
+    rosters = {team: [] for team in teams}
+    remaining = list(pool)
+    for step in range(60):
+        team = teams[step % len(teams)]
+        if step % 7 == 6 and rosters[team]:
+            # Take a pick back now and then, like undo
+            player = rosters[team].pop()
+            assert scores.remove_pick(team) == player
+            remaining = [p for p in pool if p in set(remaining) | {player}]
+        else:
+            player = rng.choice(remaining)
+            scores.apply_pick(team, player)
+            rosters[team].append(player)
+            remaining.remove(player)
+
+        fresh = DraftScores(table, pool, rosters)
+        for other in teams:
+            assert scores.sorted_players(other) == fresh.sorted_players(other)
+            assert scores.player_tuples(other) == fresh.player_tuples(other)
+        assert scores.sorted_players(team) == _old_sort_available_players(remaining, rosters[team], chem_data)
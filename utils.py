@@ -1,5 +1,5 @@
-import math
 import ast
+from chem_index import get_chem_index
 
 def min_max_scale_scores(scores):
     # Extract all metric names
@@ -26,62 +26,44 @@ def min_max_scale_scores(scores):
     return scaled_scores
 
 def calculate_chemistry_metric(current_team, player, remaining_players, df, k=0.9, x0=4.5, neg_chem_weight=.5):
-    # Generate available players
-    available_players = remaining_players
-    available_players = list(set(remaining_players) - set([player]))
-
-    # Calculate the weight based on the size of the current team
-    team_size = len(current_team)
-    weight_current_team = 1 / (1 + math.exp(-k * (team_size - x0)))
-    weight_available_players = 1 - weight_current_team
-    weight_unique_chem = weight_available_players
-
-    # Get the player's row from the dataframe
-    player_row = df[df['Character Name'] == player]
-    
-    # Check if the player exists in the DataFrame
-    if player_row.empty:
-        # Handle missing player (e.g., assign a default chemistry score)
-        print(f"Warning: Player '{player}' not found in chemistry data. Assigning default chemistry score.")
-        return 0.0  # Default chemistry score for missing players
-
-    player_row = player_row.iloc[0]  # Safe to access now
-
-    # Ensure Chemistry is a list or set
-    chemistry_list = player_row['Chemistry'] if isinstance(player_row['Chemistry'], (list, set)) else []
-    hate_list = player_row['Hate'] if isinstance(player_row['Hate'], (list, set)) else []
-
-    # Calculate positive and negative chemistry connections with the current team
-    positive_chem_current_team = len(set(chemistry_list).intersection(current_team))
-    negative_chem_current_team = len(set(hate_list).intersection(current_team)) * neg_chem_weight
-
-    # Calculate positive and negative chemistry connections with the available players
-    positive_chem_available_players = len(set(chemistry_list).intersection(available_players))
-    negative_chem_available_players = len(set(hate_list).intersection(available_players)) * neg_chem_weight
-
-    # Calculate the number of unique chemistry connections the player would add to the current team
-    unique_chem = len(set(chemistry_list) - set([item for string in current_team for item in df.loc[df['Character Name'] == string, 'Chemistry'].values[0] if isinstance(item, (list, set))]))
-
-    # Calculate the chemistry metric
-    chemistry_metric = (
-        weight_current_team * (positive_chem_current_team - negative_chem_current_team) +
-        weight_available_players * (positive_chem_available_players - negative_chem_available_players) +
-        weight_unique_chem * (unique_chem)
-    )
-
-    # Store the chemistry metric for the player
-    chemistry_metric = round(chemistry_metric, 2)
-
-    return chemistry_metric
-
-def create_player_tuples(scores):
+    # df can be the chemistry DataFrame or a ChemIndex; the index is built once per DataFrame and
+    # the metric is computed from its bitsets instead of scanning the DataFrame for every player
+    return get_chem_index(df).chemistry_metric(current_team, player, remaining_players, k=k, x0=x0, neg_chem_weight=neg_chem_weight)
+
+def calculate_scores(players, team_players, chem_data, player_stats, season_data):
+    """
+    Returns (player, total score, metric values...) for every player, scored for team_players.
+    """
+    # If there are no remaining players, return an empty list
+    if not players:
+        return []
+
+    # Every metric for the whole pool is computed in one pass over the pre-joined stats table
+    from scoring import get_score_table
+    return get_score_table(chem_data, player_stats, season_data).player_tuples(players, team_players)
+
+def recommend_outfielders(team_players, remaining_players, fielding_solver, player_speed, cf_player=None):
+    """
+    Recommends outfielders for the team's best fielding alignment (with the designated CF pinned):
+    the 10 remaining players with the best outfield value plus chemistry with the fielders around
+    the outfield position they would fill. Returns (player, speed, chemistry text) tuples.
+    """
+    alignment = fielding_solver.solve(team_players, fixed={'CF': cf_player} if cf_player else None)
+    return [
+        (player, player_speed.get(player), f"(Chemistry with {', '.join(links)})" if links else "")
+        for player, position, value, links in fielding_solver.outfield_candidates(alignment, remaining_players)
+    ]
+
+def create_player_tuples(scores, weights=None):
     # Define the metrics to extract
     metrics = ['chem_score', 'slugging', 'charge_hit_power', 'slap_hit_power', 'speed', 'home_runs', 'pitching_stamina']
+    # Weight of each metric in the total, in the same order (all 1 by default)
+    weights = weights or [1] * len(metrics)
 
     player_tuples = []
     for player, stats in scores.items():
-        # Calculate total score (sum of all metrics, modify as needed)
-        total_score = (stats['chem_score'] * 1) + (stats['slugging'] * 1) + (stats['charge_hit_power'] * 1) + (stats['slap_hit_power'] * 1) + (stats['speed'] * 1) + (stats['home_runs'] * 1) + (stats['pitching_stamina'] * 1)
+        # Calculate total score (weighted sum of all metrics)
+        total_score = sum(stats[metric] * weight for metric, weight in zip(metrics, weights))
 
         # Extract values for required metrics, defaulting to 0 if missing
         values = [stats.get(metric, 0) for metric in metrics]
@@ -95,22 +77,38 @@ def get_chemistry_links(player, team_players, chem_data):
     """
     Returns a list of players on the team that the given player has chemistry with.
     """
-    player_chem_data = chem_data.loc[chem_data['Character Name'] == player]
-    if not player_chem_data.empty:
-        chemistry_list = player_chem_data['Chemistry'].values[0] if player_chem_data['Chemistry'].values[0] else []
-        # Find intersection between chemistry list and team players
-        chemistry_links = [team_player for team_player in team_players if team_player in chemistry_list]
-        return chemistry_links
-    return []
+    chem_index = get_chem_index(chem_data)
+    i = chem_index.ids.get(player)
+    if i is None or not chem_index.has_row[i]:
+        return []
+    return _links(chem_index, chem_index.chem_bits[i], team_players)
 
 def get_hate_links(player, team_players, chem_data):
     """
     Returns a list of players on the team that the given player hates or is hated by.
     """
-    player_chem_data = chem_data.loc[chem_data['Character Name'] == player]
-    if not player_chem_data.empty:
-        hate_list = player_chem_data['Hate'].values[0] if player_chem_data['Hate'].values[0] else []
-        # Find intersection between hate list and team players
-        hate_links = [team_player for team_player in team_players if team_player in hate_list]
-        return hate_links
-    return []
\ No newline at end of file
+    chem_index = get_chem_index(chem_data)
+    i = chem_index.ids.get(player)
+    if i is None or not chem_index.has_row[i]:
+        return []
+    return _links(chem_index, chem_index.hate_bits[i], team_players)
+
+def chemistry_annotations(players, team_players, chem_data):
+    """
+    Returns (player, chemistry links, hate links) for every player, the same links as
+    get_chemistry_links / get_hate_links, with one index lookup per player.
+    """
+    chem_index = get_chem_index(chem_data)
+    annotations = []
+    for player in players:
+        i = chem_index.ids.get(player)
+        if i is None or not chem_index.has_row[i]:
+            annotations.append((player, [], []))
+        else:
+            annotations.append((player, _links(chem_index, chem_index.chem_bits[i], team_players), _links(chem_index, chem_index.hate_bits[i], team_players)))
+    return annotations
+
+def _links(chem_index, bits, team_players):
+    # Team players whose bit is set, in roster order
+    ids = chem_index.ids
+    return [team_player for team_player in team_players if team_player in ids and bits >> ids[team_player] & 1]
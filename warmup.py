@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+
+class Warmup:
+    """
+    Runs load() once on a background thread, for things the app needs for most requests but not
+    to start serving (the character data, and numpy with it, and the built assets).
+
+    wait() blocks until load() has finished and raises again whatever it raised; status() is
+    what the readiness endpoint reports. Forking waits for load() to finish first (e.g. a
+    preforking server that imports the app before starting its workers): the thread does not
+    survive the fork and could leave a module half imported, the workers get the loaded data.
+    """
+
+    def __init__(self, load):
+        self.load = load
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self._started = None
+        self.seconds = None
+        self.error = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(before=self._before_fork)
+
+    def start(self):
+        # Starts loading in the background, once
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._started = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self.load()
+        except BaseException as error:
+            self.error = error
+        self.seconds = time.perf_counter() - self._started
+        self._done.set()
+
+    def _before_fork(self):
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._done.wait()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout=None):
+        """
+        Waits for load() (starting it if start() was never called). Returns False if it is still
+        running after timeout seconds, and raises what load() raised if it failed.
+        """
+        self.start()
+        if not self._done.wait(timeout):
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+    def status(self):
+        """
+        {'status': 'loading' | 'ready' | 'failed', 'seconds'} (the time it has taken so far),
+        plus 'error' when it failed.
+        """
+        if not self._done.is_set():
+            seconds = None if self._started is None else time.perf_counter() - self._started
+            return {'status': 'loading', 'seconds': seconds}
+        if self.error is not None:
+            return {'status': 'failed', 'seconds': self.seconds, 'error': repr(self.error)}
+        return {'status': 'ready', 'seconds': self.seconds}